@@ -0,0 +1,54 @@
+"""
+Compares the text and mmap parsing paths on a sales file
+
+Usage: python benchmarks/bench_parsers.py [path] [repeats]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import parse_transactions, stream_sales_data  # noqa: E402
+from utils.mmap_parser import parse_transactions_mmap  # noqa: E402
+
+
+def best_time(func, repeats):
+    """
+    Returns the fastest of several timed runs and the last result
+    """
+    best = None
+    result = None
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/sales_data.txt"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size_mb = os.path.getsize(path) / 1e6
+
+    text_time, text_rows = best_time(
+        lambda: parse_transactions(stream_sales_data(path)), repeats
+    )
+    mmap_time, mmap_rows = best_time(lambda: parse_transactions_mmap(path), repeats)
+
+    same = [tx.to_dict() for tx in text_rows] == [tx.to_dict() for tx in mmap_rows]
+
+    print(f"File: {path} ({size_mb:,.1f} MB, {len(text_rows):,} rows)")
+    for name, elapsed in (("text", text_time), ("mmap", mmap_time)):
+        print(
+            f"{name:5} {elapsed:8.3f}s | {len(text_rows) / elapsed:12,.0f} rows/s"
+            f" | {size_mb / elapsed:8.1f} MB/s"
+        )
+    print(f"Speedup: {text_time / mmap_time:.2f}x | Identical output: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Generates synthetic sales files in the data/sales_data.txt format
+
+Usage: python benchmarks/generate_data.py OUTPUT --rows 1e6 [--seed 42]
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"
+
+# (ProductID, ProductName, typical unit price)
+PRODUCTS = [
+    ("P101", "Laptop", 45000),
+    ("P102", "Mouse", 500),
+    ("P103", "Keyboard", 1500),
+    ("P104", "Monitor", 12000),
+    ("P105", "Webcam", 3000),
+    ("P106", "Headphones", 2500),
+    ("P107", "USB Cable", 250),
+    ("P108", "External Hard Drive", 4000),
+    ("P109", "Wireless Mouse", 1000),
+    ("P110", "Laptop Charger", 1800),
+]
+
+# Name variants with embedded commas, as seen in the real exports
+NAME_VARIANTS = {
+    "Laptop": "Laptop,Premium",
+    "Mouse": "Mouse,Wireless",
+    "Monitor": "Monitor,LED",
+    "Webcam": "Webcam,HD",
+}
+
+REGIONS = ["North", "South", "East", "West"]
+
+BATCH_SIZE = 10000
+
+
+def _clean_row(rng, number, start, days, customers):
+    product_id, name, price = rng.choice(PRODUCTS)
+    day = start + timedelta(days=rng.randrange(days))
+    price = max(1, int(rng.gauss(price, price * 0.2)))
+
+    return [
+        f"T{number:06d}",
+        day.isoformat(),
+        product_id,
+        name,
+        str(rng.randint(1, 10)),
+        str(price),
+        f"C{rng.randrange(1, customers + 1):04d}",
+        rng.choice(REGIONS),
+    ]
+
+
+def _make_dirty(rng, fields):
+    """
+    Applies one of the defects the parser and validator must handle
+    Returns: line text (without newline)
+    """
+    defect = rng.randrange(8)
+
+    if defect == 0:
+        fields[5] = f"{int(fields[5]):,}"  # thousands separator in price
+    elif defect == 1:
+        fields[3] = NAME_VARIANTS.get(fields[3], fields[3] + ",Pro")
+    elif defect == 2:
+        fields[4] = "0"  # zero quantity
+    elif defect == 3:
+        fields[0] = "X" + fields[0][1:]  # bad TransactionID
+    elif defect == 4:
+        fields[6] = ""  # missing CustomerID
+    elif defect == 5:
+        fields[7] = ""  # missing Region
+    elif defect == 6:
+        return "|".join(fields[:6])  # wrong field count
+    else:
+        return ""  # blank line
+
+    return "|".join(fields)
+
+
+def generate_sales_file(
+    path, rows, seed=42, dirty_ratio=0.05, customers=None, days=365, encoding="utf-8"
+):
+    """
+    Writes a seeded synthetic sales file
+    About `dirty_ratio` of the rows carry a defect (comma separators, zero
+    quantities, bad or missing IDs, short rows, blank lines)
+    The same seed and arguments always produce the same file
+    """
+    rng = random.Random(seed)
+    customers = customers or max(100, min(rows // 20, 1000000))
+    start = date(2024, 1, 1)
+
+    with open(path, "w", encoding=encoding, newline="\n") as file:
+        file.write(HEADER)
+
+        batch = []
+        for number in range(1, rows + 1):
+            fields = _clean_row(rng, number, start, days, customers)
+
+            if rng.random() < dirty_ratio:
+                batch.append(_make_dirty(rng, fields))
+            else:
+                batch.append("|".join(fields))
+
+            if len(batch) >= BATCH_SIZE:
+                file.write("\n".join(batch) + "\n")
+                batch.clear()
+
+        if batch:
+            file.write("\n".join(batch) + "\n")
+
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=float, default=1e5, help="e.g. 1e5 ... 1e8")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dirty-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    generate_sales_file(args.output, int(args.rows), args.seed, args.dirty_ratio)
+    print(f"Wrote {int(args.rows):,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
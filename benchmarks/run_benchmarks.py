@@ -0,0 +1,256 @@
+"""
+Times and memory-profiles every stage of the sales pipeline
+
+Usage: python benchmarks/run_benchmarks.py --rows 1e5 [--output results.json]
+       python benchmarks/run_benchmarks.py --input data.txt --baseline old.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_data import PRODUCTS, generate_sales_file  # noqa: E402
+from main import generate_sales_report  # noqa: E402
+from utils import data_processor  # noqa: E402
+from utils.api_handler import (  # noqa: E402
+    create_product_mapping,
+    enrich_sales_data,
+    save_enriched_data,
+)
+from utils.file_handler import (  # noqa: E402
+    DECOMPRESSORS,
+    load_valid_transactions,
+    parse_transactions,
+    read_sales_data,
+    validate_and_filter,
+)
+from utils.mmap_parser import parse_transactions_mmap  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def synthetic_catalog():
+    """
+    Returns API-shaped products for the generated ProductIDs, so enrichment
+    can be benchmarked without the network
+    """
+    return [
+        {
+            "id": int(product_id[1:]),
+            "title": name,
+            "category": "electronics",
+            "brand": "Generic",
+            "rating": 4.5,
+        }
+        for product_id, name, _ in PRODUCTS
+    ]
+
+
+def measure(name, func, rows, memory=True, repeats=3):
+    """
+    Runs one stage and records wall time, CPU time and peak traced memory
+    Timings are the best of `repeats` runs; memory is measured in a separate
+    run so tracing does not skew the timings
+    Returns: (stage result dict, value returned by the last run)
+    """
+    wall = cpu = None
+    for _ in range(repeats):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        cpu_elapsed = time.process_time() - cpu_start
+
+        if wall is None or elapsed < wall:
+            wall, cpu = elapsed, cpu_elapsed
+
+    result = {
+        "stage": name,
+        "rows": rows,
+        "wall_s": round(wall, 6),
+        "cpu_s": round(cpu, 6),
+        "rows_per_s": round(rows / wall, 1) if wall else None,
+    }
+
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_bytes"] = peak
+
+    print(
+        f" {name:28} {wall:9.3f}s  cpu {cpu:9.3f}s"
+        + (f"  peak {result['peak_bytes'] / 1e6:9.1f} MB" if memory else "")
+    )
+    return result, value
+
+
+def compressed_copy(path, workdir, compression):
+    """
+    Writes a copy of the input compressed with one of DECOMPRESSORS
+    Returns: path of the copy
+    """
+    target = os.path.join(workdir, f"{os.path.basename(path)}.{compression}")
+    with open(path, "rb") as source, DECOMPRESSORS[compression](target, "wb") as file:
+        shutil.copyfileobj(source, file, 1024 * 1024)
+    return target
+
+
+def run_pipeline(path, workdir, memory=True, repeats=3):
+    """
+    Benchmarks each pipeline stage on one input file
+    Returns: list of stage result dicts
+    """
+    results = []
+
+    def stage(name, func, rows):
+        result, value = measure(name, func, rows, memory, repeats)
+        results.append(result)
+        return value
+
+    raw = stage("read_sales_data", lambda: read_sales_data(path), 0)
+    results[-1]["rows"] = len(raw)
+
+    parsed = stage("parse_transactions", lambda: parse_transactions(raw), len(raw))
+    stage("parse_transactions_mmap", lambda: parse_transactions_mmap(path), len(raw))
+
+    # Throughput of reading the same rows from each compressed format;
+    # mb_per_s is measured against the uncompressed size
+    input_bytes = os.path.getsize(path)
+    for compression in DECOMPRESSORS:
+        copy = compressed_copy(path, workdir, compression)
+        for name, func in (
+            ("read_sales_data", read_sales_data),
+            ("parse_transactions_mmap", parse_transactions_mmap),
+        ):
+            stage(f"{name}[{compression}]", lambda: func(copy), len(raw))
+            results[-1]["compressed_bytes"] = os.path.getsize(copy)
+            results[-1]["mb_per_s"] = round(input_bytes / 1e6 / results[-1]["wall_s"], 1)
+        os.remove(copy)
+
+    valid, _, _ = stage(
+        "validate_and_filter", lambda: validate_and_filter(parsed), len(parsed)
+    )
+    stage("load_valid_transactions", lambda: load_valid_transactions(path), len(raw))
+    rows = len(valid)
+
+    for name in (
+        "calculate_total_revenue",
+        "region_wise_sales",
+        "top_selling_products",
+        "customer_analysis",
+        "daily_sales_trend",
+        "find_peak_sales_day",
+        "low_performing_products",
+        "aggregate_sales",
+    ):
+        func = getattr(data_processor, name)
+        stage(name, lambda: func(valid), rows)
+
+    mapping = create_product_mapping(synthetic_catalog())
+    enriched_file = os.path.join(workdir, "enriched_sales_data.txt")
+    enriched = stage(
+        "enrich_sales_data",
+        lambda: enrich_sales_data(valid, mapping, enriched_file),
+        rows,
+    )
+    stage(
+        "save_enriched_data",
+        lambda: save_enriched_data(enriched, enriched_file),
+        rows,
+    )
+    stage(
+        "generate_sales_report",
+        lambda: generate_sales_report(
+            valid, enriched, os.path.join(workdir, "sales_report.txt")
+        ),
+        rows,
+    )
+
+    return results
+
+
+def compare(results, baseline_file, tolerance):
+    """
+    Prints per-stage wall time ratios against a previous results file
+    Returns: names of stages slower than the baseline by more than `tolerance`
+    """
+    with open(baseline_file, "r", encoding="utf-8") as file:
+        baseline = {r["stage"]: r for r in json.load(file)["stages"]}
+
+    regressions = []
+    print("\nCOMPARISON WITH BASELINE")
+    for result in results:
+        old = baseline.get(result["stage"])
+        if not old or not old["wall_s"]:
+            continue
+
+        ratio = result["wall_s"] / old["wall_s"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(result["stage"])
+        print(f" {result['stage']:28} {ratio:6.2f}x{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--input", help="existing sales file (default: generate one)")
+    parser.add_argument("--rows", type=float, default=1e5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results JSON path")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc runs")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.input
+        if not path:
+            path = os.path.join(workdir, "sales_data.txt")
+            print(f"Generating {int(args.rows):,} rows (seed {args.seed})...")
+            generate_sales_file(path, int(args.rows), args.seed)
+
+        print(f"Benchmarking {path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+        results = run_pipeline(path, workdir, not args.no_memory, args.repeat)
+        input_bytes = os.path.getsize(path)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "input": args.input,
+        "rows": int(args.rows) if not args.input else None,
+        "seed": args.seed if not args.input else None,
+        "repeat": args.repeat,
+        "input_bytes": input_bytes,
+        "stages": results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
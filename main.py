@@ -1,119 +1,471 @@
-from utils.file_handler import (
-    read_sales_data,
-    parse_transactions,
-    validate_and_filter,
-)
+from utils.file_handler import new_filter_summary, scan_transactions
 from utils.data_processor import (
+    DISTINCT_MODES,
+    ROLLUP_FILE,
+    RollupHistory,
+    aggregate_sales,
     calculate_total_revenue,
     region_wise_sales,
     top_selling_products,
-    customer_analysis,
+    top_customers,
     daily_sales_trend,
     find_peak_sales_day,
     low_performing_products,
 )
 from utils.api_handler import (
-    fetch_all_products,
+    CATALOG_DEADLINE,
+    CatalogFetch,
     create_product_mapping,
+    append_enriched_data,
     enrich_sales_data,
 )
+from utils.incremental import incremental_update, save_checkpoint
+from utils.parallel import aggregate_rows, expand_inputs, load_sales_parts
+from utils.metrics import METRICS_DIR, RunMetrics
+from utils.sketches import HyperLogLog
+from utils.output import OUTPUT_DIR, REPORT_FILE, write_text
+from utils.slices import (
+    aggregate_slices,
+    load_slices,
+    make_slice,
+    parse_slice,
+    region_slices,
+)
 from datetime import datetime
+import argparse
+import os
 
+REPORT_DIR = os.path.join(OUTPUT_DIR, "reports")
 
-def generate_sales_report(transactions, enriched_transactions, output_file="C:/Users/xcite/Documents/sales-analytics-system/output/sales_report.txt"):
-    from utils.data_processor import (
-        region_wise_sales,
-        top_selling_products,
-        customer_analysis,
-        daily_sales_trend,
-        find_peak_sales_day,
-        low_performing_products,
-    )
+# Default input; a directory or glob of sales files is also accepted
+SALES_DATA = "data/sales_data.txt"
 
+# "full" downloads the whole catalog; "lookup" fetches only referenced products
+CATALOG_MODES = ("full", "lookup")
+
+
+def generate_sales_report(transactions, enriched_transactions, output_file=REPORT_FILE, enrichment_summary=None, customer_capacity=None, compression=None, distinct="exact"):
+    """
+    Writes the sales report
+    `transactions` may also be a prebuilt SalesAggregate, a RollupCube or a
+    columnar TransactionTable; `enrichment_summary`
+    ({"matched": n, "failed": n}) overrides the counts taken from
+    `enriched_transactions`. `customer_capacity` ranks customers with a
+    bounded-memory Space-Saving summary and prints its error bounds;
+    distinct="hll" estimates unique customers with HyperLogLog sketches
+    The report is written atomically; a .gz/.xz name or `compression`
+    compresses it
+    """
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    total_revenue = calculate_total_revenue(transactions)
-    total_txn = len(transactions)
+    # One pass over the transactions feeds every section below
+    aggregate = aggregate_sales(transactions, customer_capacity, distinct)
+
+    total_revenue = calculate_total_revenue(aggregate)
+    total_txn = aggregate.transaction_count
     avg_order = total_revenue / total_txn if total_txn else 0
 
-    dates = sorted(tx["Date"] for tx in transactions)
-    date_range = f"{dates[0]} to {dates[-1]}" if dates else "N/A"
-
-    region_stats = region_wise_sales(transactions)
-    top_products = top_selling_products(transactions)
-    customers = customer_analysis(transactions)
-    top_customers = list(customers.items())[:5]
-    daily_trend = daily_sales_trend(transactions)
-
-    peak_day, peak_rev, peak_cnt = find_peak_sales_day(transactions)
-    low_products = low_performing_products(transactions)
-
-    enriched_ok = [tx for tx in enriched_transactions if tx["API_Match"]]
-    enriched_fail = [tx for tx in enriched_transactions if not tx["API_Match"]]
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("=" * 44 + "\n")
-        f.write("           SALES ANALYTICS REPORT\n")
-        f.write(f"     Generated: {now}\n")
-        f.write(f"     Records Processed: {len(transactions)}\n")
-        f.write("=" * 44 + "\n\n")
-
-        f.write("OVERALL SUMMARY\n")
-        f.write("-" * 44 + "\n")
-        f.write(f"Total Revenue:        ₹{total_revenue:,.2f}\n")
-        f.write(f"Total Transactions:   {total_txn}\n")
-        f.write(f"Average Order Value:  ₹{avg_order:,.2f}\n")
-        f.write(f"Date Range:           {date_range}\n\n")
-
-        f.write("REGION-WISE PERFORMANCE\n")
-        f.write("-" * 44 + "\n")
-        for r, d in region_stats.items():
-            f.write(f"{r}: ₹{d['total_sales']:,.2f} ({d['percentage']}%) | Txn: {d['transaction_count']}\n")
-        f.write("\n")
-
-        f.write("TOP 5 PRODUCTS\n")
-        f.write("-" * 44 + "\n")
-        for i, (n, q, rev) in enumerate(top_products, 1):
-            f.write(f"{i}. {n} | Qty: {q} | ₹{rev:,.2f}\n")
-        f.write("\n")
-
-        f.write("TOP 5 CUSTOMERS\n")
-        f.write("-" * 44 + "\n")
-        for i, (cid, d) in enumerate(top_customers, 1):
-            f.write(f"{i}. {cid} | ₹{d['total_spent']:,.2f} | Orders: {d['purchase_count']}\n")
-        f.write("\n")
-
-        f.write("DAILY SALES TREND\n")
-        f.write("-" * 44 + "\n")
-        for date, d in daily_trend.items():
-            f.write(f"{date}: ₹{d['revenue']:,.2f} | Txn: {d['transaction_count']} | Customers: {d['unique_customers']}\n")
-        f.write("\n")
-
-        f.write("API ENRICHMENT SUMMARY\n")
-        f.write("-" * 44 + "\n")
-        f.write(f"Enriched Records: {len(enriched_ok)}\n")
-        f.write(f"Failed Enrichment: {len(enriched_fail)}\n")
-
-
-def main():
+    date_range = (
+        f"{aggregate.min_date} to {aggregate.max_date}" if total_txn else "N/A"
+    )
+
+    region_stats = region_wise_sales(aggregate)
+    top_products = top_selling_products(aggregate)
+    best_customers = top_customers(aggregate, 5)
+    daily_trend = daily_sales_trend(aggregate)
+
+    peak_day, peak_rev, peak_cnt = find_peak_sales_day(aggregate)
+    low_products = low_performing_products(aggregate)
+
+    if enrichment_summary is None:
+        matched = sum(1 for tx in enriched_transactions if tx["API_Match"])
+        enrichment_summary = {
+            "matched": matched,
+            "failed": len(enriched_transactions) - matched,
+        }
+
+    # Assemble the whole report in memory and write it in one go
+    parts = []
+    write = parts.append
+
+    write("=" * 44 + "\n")
+    write("           SALES ANALYTICS REPORT\n")
+    write(f"     Generated: {now}\n")
+    write(f"     Records Processed: {total_txn}\n")
+    write("=" * 44 + "\n\n")
+
+    write("OVERALL SUMMARY\n")
+    write("-" * 44 + "\n")
+    write(f"Total Revenue:        ₹{total_revenue:,.2f}\n")
+    write(f"Total Transactions:   {total_txn}\n")
+    write(f"Average Order Value:  ₹{avg_order:,.2f}\n")
+    write(f"Date Range:           {date_range}\n\n")
+
+    write("REGION-WISE PERFORMANCE\n")
+    write("-" * 44 + "\n")
+    for r, d in region_stats.items():
+        write(f"{r}: ₹{d['total_sales']:,.2f} ({d['percentage']}%) | Txn: {d['transaction_count']}\n")
+    write("\n")
+
+    write("TOP 5 PRODUCTS\n")
+    write("-" * 44 + "\n")
+    for i, (n, q, rev) in enumerate(top_products, 1):
+        write(f"{i}. {n} | Qty: {q} | ₹{rev:,.2f}\n")
+    write("\n")
+
+    write("TOP 5 CUSTOMERS\n")
+    write("-" * 44 + "\n")
+    for i, (cid, d) in enumerate(best_customers, 1):
+        if "spent_error" in d:
+            write(f"{i}. {cid} | ₹{d['total_spent']:,.2f} (max overestimate ₹{d['spent_error']:,.2f}) | Orders: ~{d['purchase_count']}\n")
+        else:
+            write(f"{i}. {cid} | ₹{d['total_spent']:,.2f} | Orders: {d['purchase_count']}\n")
+    if total_txn and not best_customers:
+        write("(Customer detail is not kept in the rollup cube)\n")
+    if not aggregate.exact_customers:
+        write(
+            f"(Approximate: spend overestimated by at most ₹{aggregate.customer_spend.max_error():,.2f}; "
+            f"orders by at most {aggregate.customer_orders.error_bound():,.0f} "
+            f"with {aggregate.customer_orders.confidence():.0%} confidence)\n"
+        )
+    write("\n")
+
+    write("DAILY SALES TREND\n")
+    write("-" * 44 + "\n")
+    approximate = "~" if aggregate.distinct == "hll" else ""
+    for date, d in daily_trend.items():
+        write(f"{date}: ₹{d['revenue']:,.2f} | Txn: {d['transaction_count']} | Customers: {approximate}{d['unique_customers']}\n")
+    if approximate and daily_trend:
+        error = HyperLogLog(aggregate.hll_precision).relative_error()
+        write(f"(Customers are HyperLogLog estimates, typical error ±{error:.1%})\n")
+    write("\n")
+
+    write("API ENRICHMENT SUMMARY\n")
+    write("-" * 44 + "\n")
+    write(f"Enriched Records: {enrichment_summary['matched']}\n")
+    write(f"Failed Enrichment: {enrichment_summary['failed']}\n")
+
+    write_text(output_file, "".join(parts), compression)
+
+
+def _start_catalog(catalog_mode, transactions=None):
+    """
+    Starts the background product fetch
+    A full catalog fetch starts right away; a lookup has to wait for the
+    transactions whose products it requests, so it returns None until then
+    """
+    if catalog_mode == "full":
+        return CatalogFetch()
+    if transactions is None:
+        return None
+    return CatalogFetch(product_ids={tx["ProductID"] for tx in transactions})
+
+
+def _load_valid(metrics, source, workers=None):
+    """
+    Reads, parses and validates the sales data as one stage
+    Rows the loaders drop while parsing are counted in the same summary as
+    validation rejects, and the full parsed list is not kept
+    Returns: (valid transactions, filter summary, sources) - sources lists
+    (filename, start, end), the slice of the valid rows from each file
+    """
+    print("[1/10] Reading sales data...")
+    print("[2/10] Parsing and cleaning data...")
+    with metrics.stage("load") as stage:
+        summary = new_filter_summary()
+        valid = []
+        sources = []
+        for filename, parsed in load_sales_parts(source, workers, summary["rejects"]):
+            start = len(valid)
+            valid.extend(scan_transactions(parsed, summary=summary))
+            sources.append((filename, start, len(valid)))
+        stage["rows"] = summary["total_input"]
+    print(f"✓ Parsed {summary['total_input']} records\n")
+    return valid, summary, sources
+
+
+def run_incremental(
+    metrics,
+    source=SALES_DATA,
+    catalog_deadline=CATALOG_DEADLINE,
+    catalog_mode="full",
+    distinct="exact",
+    customer_capacity=None,
+):
+    """
+    Processes only the lines appended since the last run
+    The saved aggregate state is updated and the report regenerated from it;
+    the new enriched rows are appended to the enriched data file
+    """
+    files = expand_inputs(source)
+    if len(files) != 1:
+        raise ValueError("Incremental mode needs a single sales file")
+
+    catalog = _start_catalog(catalog_mode)
+
+    print("[1/10] Reading new sales data...")
+    with metrics.stage("incremental_update") as stage:
+        state = incremental_update(
+            files[0], customer_capacity=customer_capacity, distinct=distinct
+        )
+        new = state["new_transactions"]
+        stage["rows"] = len(new)
+    print(f"✓ {len(new)} new valid records | Invalid so far: {state['invalid']}\n")
+
+    print("[6/10] Fetching product data from API...")
+    with metrics.stage("fetch_products") as stage:
+        if new:
+            catalog = catalog or _start_catalog(catalog_mode, new)
+            products = catalog.result(catalog_deadline)
+        else:
+            products = []
+        stage["rows"] = len(products)
+    print(f" Fetched {len(products)} products\n")
+
+    print("[7/10] Enriching new sales data...")
+    with metrics.stage("enrich", rows=len(new)):
+        mapping = create_product_mapping(products)
+        enriched = enrich_sales_data(new, mapping, filename=None)
+        # The recorded size drops rows appended by a run that never checkpointed
+        state["extra"]["enriched_size"] = append_enriched_data(
+            enriched, size=state["extra"].get("enriched_size")
+        )
+        summary = state["extra"].setdefault("enrichment", {"matched": 0, "failed": 0})
+        for tx in enriched:
+            summary["matched" if tx["API_Match"] else "failed"] += 1
+    print(" Enrichment complete\n")
+
+    print("[9/10] Generating report...")
+    with metrics.stage("report", rows=state["aggregate"].transaction_count):
+        generate_sales_report(state["aggregate"], enriched, enrichment_summary=summary)
+        save_checkpoint(state)
+    print(" Report saved to: output/sales_report.txt\n")
+
+
+def _expand_slices(slices, per_region, regions):
+    """
+    Adds the per-region slices if requested, and the unfiltered "all" slice
+    """
+    slices = list(slices)
+    if per_region:
+        slices += region_slices(regions)
+    if not any(spec["name"] == "all" for spec in slices):
+        slices.insert(0, make_slice())
+    return slices
+
+
+def _rollup_slices(metrics, slices, per_region, rollup_file):
+    """
+    Answers region and date-range slices from the persisted rollup history
+    Amount bands are not a cube dimension, so those slices are skipped
+    """
+    print("[1/10] Loading rollup cube...")
+    with metrics.stage("load_rollup"):
+        history = RollupHistory.load(rollup_file)
+        cube = history.cube()
+    print(
+        f"✓ Loaded rollup of {len(history.sources)} files "
+        f"with {len(cube.dates())} days\n"
+    )
+
+    slices = _expand_slices(slices, per_region, cube.regions())
+
+    print(f"[8/10] Aggregating {len(slices)} slices from the rollup...")
+    results = {}
+    with metrics.stage("aggregate_slices", rows=len(slices)):
+        for spec in slices:
+            if spec["min_amount"] is not None or spec["max_amount"] is not None:
+                print(f" Skipping slice '{spec['name']}': amount bands need the raw data")
+                continue
+
+            selection = (spec["region"], spec["start_date"], spec["end_date"])
+            results[spec["name"]] = (
+                cube.aggregate(*selection),
+                cube.enrichment_summary(*selection),
+            )
+    print(" Aggregation complete\n")
+    return results
+
+
+def run_batch(
+    metrics,
+    slices,
+    per_region=False,
+    report_dir=REPORT_DIR,
+    compression=None,
+    source=SALES_DATA,
+    from_rollup=False,
+    rollup_file=ROLLUP_FILE,
+    workers=None,
+    catalog_deadline=CATALOG_DEADLINE,
+    catalog_mode="full",
+    distinct="exact",
+    customer_capacity=None,
+    rollup_distinct=None,
+):
+    """
+    Writes one report per slice without prompting
+    The data is loaded, validated and enriched once, each file is rolled up
+    into a date x region x product cube merged into the history saved at
+    `rollup_file`, and all slices are then aggregated together in a single
+    pass. With `from_rollup` the raw data is not read at all: slices are
+    answered from the saved history
+    `source` may name several files (see utils.parallel.expand_inputs)
+    `distinct` ("exact" or "hll") sets how the reports count unique
+    customers and `customer_capacity` ranks customers in each slice with a
+    bounded-memory summary. The rollup history keeps the mode it was built
+    with; `rollup_distinct` picks it for a new one (default "exact"). The
+    rollup is a side output: if it cannot be updated, the reports are still
+    written
+    With `workers` above 1 the unfiltered report is aggregated from the
+    loaded rows across that many processes (see utils.parallel.aggregate_rows),
+    even for a single file
+    """
+    if from_rollup:
+        results = _rollup_slices(metrics, slices, per_region, rollup_file)
+    else:
+        catalog = _start_catalog(catalog_mode)
+
+        valid, summary, sources = _load_valid(metrics, source, workers)
+
+        print("[4/10] Validating transactions...")
+        print(f" Valid: {len(valid)} | Invalid: {summary['invalid']}\n")
+        catalog = catalog or _start_catalog(catalog_mode, valid)
+
+        slices = _expand_slices(slices, per_region, summary["regions"])
+
+        print("[6/10] Fetching product data from API...")
+        with metrics.stage("fetch_products") as stage:
+            products = catalog.result(catalog_deadline)
+            stage["rows"] = len(products)
+        print(f" Fetched {len(products)} products\n")
+
+        print("[7/10] Enriching sales data...")
+        with metrics.stage("enrich", rows=len(valid)):
+            mapping = create_product_mapping(products)
+            enrich_sales_data(valid, mapping)
+        print(" Enrichment complete\n")
+
+        print(f"[8/10] Aggregating {len(slices)} slices...")
+        changed = []
+        try:
+            with metrics.stage("rollup", rows=len(valid)):
+                # Each file replaces its own cube, so the saved history keeps growing
+                history = RollupHistory.load(rollup_file, rollup_distinct)
+                changed = [
+                    history.add(filename, valid[start:end])
+                    for filename, start, end in sources
+                ]
+                # Rewriting an unchanged history would only cost time
+                if any(changed):
+                    history.save(rollup_file)
+        except (OSError, ValueError) as e:
+            print(f" Rollup not updated: {e}")
+            rollup_file = None
+        unfiltered = None
+        if workers is not None and workers > 1:
+            with metrics.stage("parallel_aggregate", rows=len(valid)):
+                unfiltered = aggregate_rows(
+                    valid, workers, distinct, customer_capacity
+                )
+        with metrics.stage("aggregate_slices", rows=len(valid)):
+            results = aggregate_slices(
+                valid, slices, distinct, customer_capacity, unfiltered
+            )
+        if any(changed):
+            print(f" Aggregation complete; rollup saved to {rollup_file}\n")
+        elif rollup_file:
+            print(" Aggregation complete; rollup already up to date\n")
+        else:
+            print(" Aggregation complete\n")
+
+    print("[9/10] Generating reports...")
+    suffix = {"gzip": ".gz", "xz": ".xz"}.get(compression, "")
+    with metrics.stage("report", rows=len(results)):
+        for name, (aggregate, enrichment) in results.items():
+            output_file = os.path.join(report_dir, f"sales_report_{name}.txt{suffix}")
+            generate_sales_report(
+                aggregate, (), output_file, enrichment, compression=compression
+            )
+            print(f" {name}: {aggregate.transaction_count} records -> {output_file}")
+    print()
+
+
+def main(
+    incremental=False,
+    metrics_dir=METRICS_DIR,
+    trace_memory=False,
+    batch=None,
+    source=SALES_DATA,
+    workers=None,
+    catalog_deadline=CATALOG_DEADLINE,
+    catalog_mode="full",
+    distinct="exact",
+    customer_capacity=None,
+    rollup_distinct=None,
+):
+    """
+    Runs the full pipeline
+    Per-stage timings, memory and throughput are written to metrics_dir as
+    JSON and Prometheus text; see utils.metrics.register_hook for live access
+    `batch` (keyword arguments for run_batch) runs without prompting
+    `source` is a sales file, a directory or a glob; several files are
+    parsed concurrently by `workers` processes and merged into one dataset.
+    `workers` above 1 also shards the report aggregation, even of one file
+    The product catalog downloads in the background meanwhile; enrichment
+    waits for it until `catalog_deadline` seconds after the fetch started at
+    most. catalog_mode="lookup" fetches only the validated rows' products
+    `distinct`, `customer_capacity` and `rollup_distinct` choose how
+    customers are counted and ranked (see run_batch)
+    """
+    metrics = RunMetrics(trace_memory=trace_memory)
+
     try:
         print("=" * 40)
         print("SALES ANALYTICS SYSTEM")
         print("=" * 40)
 
-        print("[1/10] Reading sales data...")
-        raw = read_sales_data("data/sales_data.txt")
-        print(f"✓ Successfully read {len(raw)} transactions\n")
+        if incremental or batch is not None:
+            if incremental:
+                run_incremental(
+                    metrics,
+                    source,
+                    catalog_deadline,
+                    catalog_mode,
+                    distinct,
+                    customer_capacity,
+                )
+            else:
+                run_batch(
+                    metrics,
+                    source=source,
+                    workers=workers,
+                    catalog_deadline=catalog_deadline,
+                    catalog_mode=catalog_mode,
+                    distinct=distinct,
+                    customer_capacity=customer_capacity,
+                    rollup_distinct=rollup_distinct,
+                    **batch,
+                )
+            print("[10/10] Process Complete!")
+            print("=" * 40)
+            metrics.finish()
+            return
+
+        catalog = _start_catalog(catalog_mode)
 
-        print("[2/10] Parsing and cleaning data...")
-        parsed = parse_transactions(raw)
-        print(f"✓ Parsed {len(parsed)} records\n")
+        # Validation also collects the regions, amount and date range
+        valid, summary, _ = _load_valid(metrics, source, workers)
 
         print("[3/10] Filter Options Available:")
-        regions = sorted(set(tx["Region"] for tx in parsed))
-        amounts = [tx["Quantity"] * tx["UnitPrice"] for tx in parsed]
-        print("Regions:", ", ".join(regions))
-        print(f"Amount Range: ₹{min(amounts):,.0f} - ₹{max(amounts):,.0f}")
+        catalog = catalog or _start_catalog(catalog_mode, valid)
+        print("Regions:", ", ".join(sorted(summary["regions"])))
+        if summary["lowest_amount"] is not None:
+            print(
+                f"Amount Range: ₹{summary['lowest_amount']:,.0f} - ₹{summary['highest_amount']:,.0f}"
+            )
+        if summary["first_date"] is not None:
+            print(f"Date Range: {summary['first_date']} to {summary['last_date']}")
 
         apply = input("Do you want to filter data? (y/n): ").lower()
         region = min_amt = max_amt = None
@@ -122,38 +474,166 @@ def main():
             region = input("Region: ").strip() or None
             min_amt = input("Min Amount: ").strip()
             max_amt = input("Max Amount: ").strip()
+        min_amt = float(min_amt) if min_amt else None
+        max_amt = float(max_amt) if max_amt else None
 
         print("\n[4/10] Validating transactions...")
-        valid, invalid, _ = validate_and_filter(
-            parsed,
-            region=region,
-            min_amount=float(min_amt) if min_amt else None,
-            max_amount=float(max_amt) if max_amt else None,
-        )
-        print(f" Valid: {len(valid)} | Invalid: {invalid}\n")
+        if region or min_amt is not None or max_amt is not None:
+            with metrics.stage("filter", rows=len(valid)):
+                valid = list(
+                    scan_transactions(
+                        valid, region=region, min_amount=min_amt, max_amount=max_amt
+                    )
+                )
+            print(f" Records after filters: {len(valid)}")
+        rejects = ", ".join(f"{k}: {n}" for k, n in summary["rejects"].items() if n)
+        print(f" Valid: {len(valid)} | Invalid: {summary['invalid']}")
+        print(f" Rejected by reason: {rejects or 'none'}\n")
 
         print("[5/10] Analyzing sales data...")
         print(" Analysis complete\n")
 
         print("[6/10] Fetching product data from API...")
-        products = fetch_all_products()
+        with metrics.stage("fetch_products") as stage:
+            products = catalog.result(catalog_deadline)
+            stage["rows"] = len(products)
         print(f" Fetched {len(products)} products\n")
 
         print("[7/10] Enriching sales data...")
-        mapping = create_product_mapping(products)
-        enriched = enrich_sales_data(valid, mapping)
+        with metrics.stage("enrich", rows=len(valid)):
+            mapping = create_product_mapping(products)
+            enriched = enrich_sales_data(valid, mapping)
         print(" Enrichment complete\n")
 
+        report_data = valid
+        if workers is not None and workers > 1:
+            with metrics.stage("parallel_aggregate", rows=len(valid)):
+                report_data = aggregate_rows(
+                    valid, workers, distinct, customer_capacity
+                )
+
         print("[9/10] Generating report...")
-        generate_sales_report(valid, enriched)
+        with metrics.stage("report", rows=len(valid)):
+            generate_sales_report(
+                report_data,
+                enriched,
+                customer_capacity=customer_capacity,
+                distinct=distinct,
+            )
         print(" Report saved to: output/sales_report.txt\n")
 
         print("[10/10] Process Complete!")
         print("=" * 40)
+        metrics.finish()
 
     except Exception as e:
-        print(" Error occurred:", e)
+        failed = [s["stage"] for s in metrics.stages if s["status"] == "failed"]
+        where = f" in stage '{failed[-1]}'" if failed else ""
+        print(f" Error occurred{where}:", e)
+        metrics.finish("failed")
+
+    finally:
+        try:
+            json_path, _ = metrics.write(metrics_dir)
+            print(f" Metrics saved to: {json_path}")
+        except OSError as e:
+            print(f" Failed to write metrics: {e}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sales analytics pipeline")
+    parser.add_argument(
+        "--input", default=SALES_DATA, metavar="PATH",
+        help="sales file, directory or glob such as 'data/daily/*.txt.gz'",
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="processes used to parse several input files (default: all cores); "
+        "when set above 1, report aggregation is also split across them, "
+        "even for a single file",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only process lines appended since the last run",
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="write reports without prompting (one per slice)",
+    )
+    parser.add_argument(
+        "--slice", action="append", default=[], metavar="SPEC",
+        help='e.g. "region=North,min_amount=1000" (repeatable; implies --batch)',
+    )
+    parser.add_argument(
+        "--slices", metavar="FILE", help="JSON list of slice specs (implies --batch)"
+    )
+    parser.add_argument(
+        "--per-region", action="store_true",
+        help="add one slice per region (implies --batch)",
+    )
+    parser.add_argument(
+        "--from-rollup", action="store_true",
+        help="answer slices from the saved rollup cube (implies --batch)",
+    )
+    parser.add_argument("--report-dir", default=REPORT_DIR)
+    parser.add_argument("--compress", choices=("gzip", "xz"))
+    parser.add_argument(
+        "--catalog-deadline", type=float, default=CATALOG_DEADLINE, metavar="SECONDS",
+        help="stop waiting for the product catalog this long after the fetch "
+        "starts and write unenriched output",
+    )
+    parser.add_argument(
+        "--catalog", choices=CATALOG_MODES, default="full",
+        help="'lookup' fetches only the products in the data, one request each, "
+        "through a persistent LRU cache",
+    )
+    parser.add_argument(
+        "--distinct", choices=DISTINCT_MODES, default="exact",
+        help="count unique customers in the reports exactly or with "
+        "HyperLogLog sketches",
+    )
+    parser.add_argument(
+        "--rollup-distinct", choices=DISTINCT_MODES,
+        help="counting mode for a new rollup history (default: exact); an "
+        "existing one keeps its own",
+    )
+    parser.add_argument(
+        "--customer-capacity", type=int, metavar="N",
+        help="rank customers approximately, tracking at most N of them",
+    )
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        slices = [parse_slice(text) for text in args.slice]
+        if args.slices:
+            slices += load_slices(args.slices)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    batch = None
+    if args.batch or slices or args.per_region or args.from_rollup:
+        batch = {
+            "slices": slices,
+            "per_region": args.per_region,
+            "report_dir": args.report_dir,
+            "compression": args.compress,
+            "from_rollup": args.from_rollup,
+        }
+
+    return {
+        "incremental": args.incremental,
+        "trace_memory": args.trace_memory,
+        "batch": batch,
+        "source": args.input,
+        "workers": args.workers,
+        "catalog_deadline": args.catalog_deadline,
+        "catalog_mode": args.catalog,
+        "distinct": args.distinct,
+        "rollup_distinct": args.rollup_distinct,
+        "customer_capacity": args.customer_capacity,
+    }
 
 
 if __name__ == "__main__":
-    main()
+    main(**parse_args())
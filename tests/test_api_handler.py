@@ -0,0 +1,307 @@
+"""
+Tests for utils/api_handler.py against a local stub of the DummyJSON API
+
+Usage: python -m pytest tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.api_handler import (  # noqa: E402
+    ProductCache,
+    fetch_all_products,
+    fetch_products_by_id,
+    load_catalog_cache,
+)
+
+
+class StubCatalog:
+    """
+    Serves /products?limit&skip pages and /products/{id} lookups for ids
+    1..total on a free local port, recording every request
+    Unknown ids answer 404, `fail` makes every request answer 500, a
+    request carrying the current ETag in If-None-Match answers 304, and
+    pages hold at most `max_limit` products when it is set
+    """
+
+    def __init__(self, total=30, delay=0.0):
+        self.total = total
+        self.delay = delay
+        self.fail = False
+        self.max_limit = None
+        self.etag = '"v1"'
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}/products"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def product(self, number):
+        return {
+            "id": number,
+            "title": f"Product {number}",
+            "category": f"category-{number % 3}",
+            "brand": f"Brand {number}",
+            "rating": 4.0 + number / 100,
+            "description": "not cached",
+        }
+
+    def paths(self):
+        return [path for path, _, _ in self.requests]
+
+    def respond(self, path, query, headers):
+        """
+        Returns: (status, body dict or None)
+        """
+        if self.fail:
+            return 500, None
+        if headers.get("If-None-Match") == self.etag:
+            return 304, None
+
+        name = path.rstrip("/").rsplit("/", 1)[-1]
+        if name.isdigit():
+            number = int(name)
+            if 1 <= number <= self.total:
+                return 200, self.product(number)
+            return 404, {"message": f"Product with id '{number}' not found"}
+
+        limit = int(query.get("limit", ["30"])[0]) or self.total
+        limit = min(limit, self.max_limit or limit)
+        skip = int(query.get("skip", ["0"])[0])
+        numbers = range(skip + 1, min(self.total, skip + limit) + 1)
+        products = [self.product(number) for number in numbers]
+        return 200, {"products": products, "total": self.total, "skip": skip}
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                with stub.lock:
+                    stub.requests.append((url.path, query, dict(self.headers)))
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    status, body = stub.respond(url.path, query, self.headers)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("ETag", stub.etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+class StubTestCase(unittest.TestCase):
+    total = 30
+
+    def setUp(self):
+        self.stub = StubCatalog(self.total)
+        self.addCleanup(self.stub.close)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+
+class FetchProductsByIdTest(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_file = os.path.join(self.cache_dir, "product_lookup.json")
+
+    def fetch(self, product_ids, **options):
+        options.setdefault("cache_file", self.cache_file)
+        return fetch_products_by_id(product_ids, api_url=self.stub.url, **options)
+
+    def test_requests_only_referenced_ids(self):
+        products = self.fetch(["P007", "P003", "P007", "X"])
+
+        self.assertEqual(sorted(self.stub.paths()), ["/products/3", "/products/7"])
+        self.assertEqual([p["id"] for p in products], [3, 7])
+        self.assertNotIn("description", products[0])
+
+    def test_cache_hits_make_no_requests(self):
+        self.fetch(["P1", "P2"])
+        self.stub.requests.clear()
+
+        products = self.fetch(["P2", "P1"])
+
+        self.assertEqual(self.stub.requests, [])
+        self.assertEqual([p["id"] for p in products], [1, 2])
+
+    def test_unknown_ids_are_cached(self):
+        products = self.fetch(["P5", "P999"])
+        self.assertEqual([p["id"] for p in products], [5])
+
+        self.stub.requests.clear()
+        self.assertEqual([p["id"] for p in self.fetch(["P999", "P5"])], [5])
+        self.assertEqual(self.stub.requests, [])
+        self.assertIsNone(ProductCache.load(self.cache_file).get(999)["product"])
+
+    def test_evicts_least_recently_used(self):
+        self.fetch(["P1", "P2"], max_entries=2)
+        # An all-hit lookup still refreshes the saved recency order
+        self.fetch(["P1"], max_entries=2)
+        self.fetch(["P3"], max_entries=2)
+
+        cache = ProductCache.load(self.cache_file, 2)
+        self.assertEqual(list(cache.entries), [1, 3])
+
+        self.stub.requests.clear()
+        self.fetch(["P2"], max_entries=2)
+        self.assertEqual(self.stub.paths(), ["/products/2"])
+
+    def test_stale_entries_fall_back_when_api_fails(self):
+        self.fetch(["P4", "P6"])
+        self.stub.fail = True
+        self.stub.requests.clear()
+
+        products = self.fetch(["P4", "P6", "P8"], ttl=0)
+
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual([p["id"] for p in products], [4, 6])
+
+    def test_stale_entries_are_refreshed(self):
+        self.fetch(["P4"])
+        self.stub.requests.clear()
+
+        self.fetch(["P4"], ttl=0)
+
+        self.assertEqual(self.stub.paths(), ["/products/4"])
+
+
+class CatalogCacheTest(StubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_file = os.path.join(self.cache_dir, "product_catalog.json")
+
+    def fetch(self, **options):
+        options.setdefault("cache_file", self.cache_file)
+        return fetch_all_products(api_url=self.stub.url, page_size=10, **options)
+
+    def test_fresh_cache_makes_no_requests(self):
+        products = self.fetch()
+        self.stub.requests.clear()
+
+        self.assertEqual(self.fetch(), products)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_saves_validators(self):
+        self.fetch()
+
+        cache = load_catalog_cache(self.cache_file)
+        self.assertEqual(cache["etag"], '"v1"')
+        self.assertEqual(len(cache["products"]), self.total)
+
+    def test_stale_cache_is_revalidated(self):
+        products = self.fetch()
+        before = load_catalog_cache(self.cache_file)["fetched_at"]
+        self.stub.requests.clear()
+
+        self.assertEqual(self.fetch(ttl=0), products)
+
+        # One conditional request answered 304; no pages were refetched
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(self.stub.requests[0][2]["If-None-Match"], '"v1"')
+        self.assertGreater(load_catalog_cache(self.cache_file)["fetched_at"], before)
+
+    def test_changed_catalog_is_refetched(self):
+        self.fetch()
+        self.stub.etag = '"v2"'
+        self.stub.total = 25
+        self.stub.requests.clear()
+
+        products = self.fetch(ttl=0)
+
+        self.assertEqual(len(products), 25)
+        self.assertEqual(load_catalog_cache(self.cache_file)["etag"], '"v2"')
+
+    def test_stale_cache_falls_back_when_api_fails(self):
+        products = self.fetch()
+        self.stub.fail = True
+
+        self.assertEqual(self.fetch(ttl=0), products)
+
+    def test_no_cache_file(self):
+        self.assertEqual(len(self.fetch(cache_file=None)), self.total)
+        self.assertFalse(os.listdir(self.cache_dir))
+        self.stub.fail = True
+        self.assertEqual(self.fetch(cache_file=None), [])
+
+
+class ConcurrentCatalogFetchTest(StubTestCase):
+    total = 95
+
+    def fetch(self, **options):
+        return fetch_all_products(api_url=self.stub.url, cache_file=None, **options)
+
+    def skips(self):
+        return [int(query["skip"][0]) for _, query, _ in self.stub.requests]
+
+    def test_pages_fetched_concurrently_in_order(self):
+        self.stub.delay = 0.05
+
+        products = self.fetch(page_size=10, workers=4)
+
+        self.assertEqual([p["id"] for p in products], list(range(1, self.total + 1)))
+        self.assertEqual(sorted(self.skips()), list(range(0, self.total, 10)))
+        self.assertGreater(self.stub.peak_in_flight, 1)
+        self.assertLessEqual(self.stub.peak_in_flight, 4)
+
+    def test_single_worker(self):
+        self.stub.delay = 0.01
+
+        products = self.fetch(page_size=10, workers=1)
+
+        self.assertEqual(len(products), self.total)
+        self.assertEqual(self.stub.peak_in_flight, 1)
+
+    def test_capped_page_size(self):
+        self.stub.max_limit = 20
+
+        products = self.fetch(page_size=50)
+
+        self.assertEqual([p["id"] for p in products], list(range(1, self.total + 1)))
+        self.assertEqual(sorted(self.skips()), list(range(0, self.total, 20)))
+
+    def test_single_page(self):
+        products = self.fetch(page_size=100)
+
+        self.assertEqual(len(products), self.total)
+        self.assertEqual(self.skips(), [0])
+
+    def test_empty_catalog(self):
+        self.stub.total = 0
+        self.assertEqual(self.fetch(page_size=10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Tests that the columnar TransactionTable path matches the row-at-a-time one
+
+Usage: python -m pytest tests
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.columnar import np  # noqa: E402
+from utils.data_processor import SalesAggregate, aggregate_sales  # noqa: E402
+
+if np is not None:
+    from utils.columnar import TransactionTable  # noqa: E402
+
+
+def make_transactions(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "TransactionID": f"T{i:05d}",
+            "Date": f"2024-12-{rng.randint(1, 31):02d}",
+            "ProductID": f"P{rng.randint(101, 110)}",
+            "ProductName": f"Product {rng.randint(101, 110)}",
+            "Quantity": rng.randint(1, 10),
+            "UnitPrice": round(rng.uniform(100, 5000), 2),
+            "CustomerID": f"C{rng.randint(1, 40):03d}",
+            "Region": rng.choice(("North", "South", "East", "West")),
+        }
+        for i in range(count)
+    ]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class AggregateTableTest(unittest.TestCase):
+    def setUp(self):
+        self.transactions = make_transactions(2000)
+        self.table = TransactionTable(self.transactions)
+
+    def test_matches_row_aggregate(self):
+        for distinct in ("exact", "hll"):
+            expected = SalesAggregate(distinct=distinct).update(self.transactions)
+            actual = aggregate_sales(self.table, distinct=distinct)
+
+            self.assertIsInstance(actual, SalesAggregate)
+            self.assertEqual(actual.to_dict(), expected.to_dict())
+
+    def test_rankings_match(self):
+        expected = aggregate_sales(self.transactions)
+        actual = aggregate_sales(self.table)
+
+        self.assertEqual(actual.top_selling_products(), expected.top_selling_products())
+        self.assertEqual(actual.top_customers(), expected.top_customers())
+        self.assertEqual(actual.region_wise_sales(), expected.region_wise_sales())
+        self.assertEqual(actual.daily_sales_trend(), expected.daily_sales_trend())
+
+    def test_approximate_customers(self):
+        actual = aggregate_sales(self.table, customer_capacity=100)
+
+        self.assertFalse(actual.exact_customers)
+        # Capacity covers every customer, so the ranking and spend are exact
+        expected = aggregate_sales(self.table).top_customers()
+        self.assertEqual(
+            [(c, d["total_spent"]) for c, d in actual.top_customers()],
+            [(c, d["total_spent"]) for c, d in expected],
+        )
+
+    def test_empty_table(self):
+        aggregate = aggregate_sales(TransactionTable())
+
+        self.assertEqual(aggregate.transaction_count, 0)
+        self.assertEqual(aggregate.to_dict(), SalesAggregate().to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+"""
+Tests for the append-only incremental updates in utils/incremental.py
+
+Usage: python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from functools import partial
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import utils.incremental  # noqa: E402
+from utils.api_handler import append_enriched_data  # noqa: E402
+from utils.data_processor import aggregate_sales  # noqa: E402
+from utils.incremental import incremental_update, save_checkpoint  # noqa: E402
+from utils.metrics import RunMetrics  # noqa: E402
+
+from test_columnar import make_transactions  # noqa: E402
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+
+def sales_lines(transactions):
+    fields = HEADER.split("|")
+    return ["|".join(str(tx[field]) for field in fields) for tx in transactions]
+
+
+class IncrementalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.filename = self.path("sales.txt")
+        self.checkpoint_file = self.path("checkpoint.json")
+        self.rows = make_transactions(120)
+        with open(self.filename, "w", encoding="utf-8") as file:
+            file.write(HEADER + "\n")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def append(self, transactions, newline=True):
+        text = "\n".join(sales_lines(transactions))
+        with open(self.filename, "a", encoding="utf-8") as file:
+            file.write(text + ("\n" if newline and text else ""))
+
+    def update(self, save=True, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = incremental_update(self.filename, self.checkpoint_file, **options)
+        if save:
+            save_checkpoint(state, self.checkpoint_file)
+        return state
+
+    def ids(self, transactions):
+        return [tx["TransactionID"] for tx in transactions]
+
+
+class IncrementalUpdateTest(IncrementalTestCase):
+    def test_resumes_from_checkpoint(self):
+        self.append(self.rows[:70])
+        first = self.update()
+        self.assertEqual(self.ids(first["new_transactions"]), self.ids(self.rows[:70]))
+
+        again = self.update()
+        self.assertEqual(again["new_transactions"], [])
+        self.assertEqual(again["offset"], first["offset"])
+
+        self.append(self.rows[70:])
+        state = self.update()
+        self.assertEqual(self.ids(state["new_transactions"]), self.ids(self.rows[70:]))
+        self.assertEqual(
+            state["aggregate"].to_dict(), aggregate_sales(self.rows).to_dict()
+        )
+
+    def test_parses_only_appended_lines(self):
+        self.append(self.rows[:70])
+        offset = self.update()["offset"]
+        self.append(self.rows[70:72])
+
+        with mock.patch.object(
+            utils.incremental,
+            "stream_byte_range",
+            wraps=utils.incremental.stream_byte_range,
+        ) as stream:
+            state = self.update()
+
+        stream.assert_called_once_with(
+            self.filename, offset, os.path.getsize(self.filename), "utf-8"
+        )
+        self.assertEqual(
+            self.ids(state["new_transactions"]), self.ids(self.rows[70:72])
+        )
+
+    def test_partial_last_line_waits(self):
+        self.append(self.rows[:70])
+        self.update()
+        self.append(self.rows[70:72], newline=False)
+
+        self.assertEqual(self.ids(self.update()["new_transactions"]), ["T00070"])
+
+        with open(self.filename, "a", encoding="utf-8") as file:
+            file.write("\n")
+        self.assertEqual(self.ids(self.update()["new_transactions"]), ["T00071"])
+
+    def test_rebuilds_when_prefix_changes(self):
+        self.append(self.rows[:70])
+        self.update()
+
+        # Same size, different content in the processed prefix
+        with open(self.filename, "r+b") as file:
+            file.seek(len(HEADER) + 2)
+            file.write(b"9")
+        self.append(self.rows[70:72])
+
+        state = self.update()
+        self.assertEqual(len(state["new_transactions"]), 72)
+        self.assertEqual(state["aggregate"].transaction_count, 72)
+        self.assertEqual(state["new_transactions"][0]["TransactionID"], "T90000")
+
+    def test_rebuilds_when_options_change(self):
+        self.append(self.rows[:70])
+        self.update()
+
+        for options in ({"distinct": "hll"}, {"customer_capacity": 10}):
+            with self.subTest(**options):
+                state = self.update(**options)
+                self.assertEqual(len(state["new_transactions"]), 70)
+                self.assertEqual(state["aggregate"].transaction_count, 70)
+
+
+class RunIncrementalTest(IncrementalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enriched_file = self.path("enriched.txt")
+
+        catalog = mock.Mock()
+        catalog.result.return_value = []
+        patches = (
+            mock.patch.object(main, "CatalogFetch", return_value=catalog),
+            mock.patch.object(
+                main,
+                "incremental_update",
+                partial(incremental_update, checkpoint_file=self.checkpoint_file),
+            ),
+            mock.patch.object(
+                main,
+                "save_checkpoint",
+                partial(save_checkpoint, checkpoint_file=self.checkpoint_file),
+            ),
+            mock.patch.object(
+                main,
+                "append_enriched_data",
+                partial(append_enriched_data, filename=self.enriched_file),
+            ),
+            mock.patch.object(
+                main,
+                "generate_sales_report",
+                partial(
+                    main.generate_sales_report, output_file=self.path("report.txt")
+                ),
+            ),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_incremental(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.run_incremental(RunMetrics(), self.filename)
+
+    def enriched_lines(self):
+        with open(self.enriched_file, encoding="utf-8") as file:
+            return file.read().splitlines()
+
+    def test_enriched_file_grows_with_appends(self):
+        self.append(self.rows[:70])
+        self.run_incremental()
+        self.assertEqual(len(self.enriched_lines()), 71)
+
+        self.append(self.rows[70:72])
+        self.run_incremental()
+        self.assertEqual(len(self.enriched_lines()), 73)
+
+        self.run_incremental()
+        lines = self.enriched_lines()
+        self.assertEqual(len(lines), 73)
+        self.assertEqual(
+            [line.split("|", 1)[0] for line in lines[1:]], self.ids(self.rows[:72])
+        )
+
+    def test_unsaved_run_is_truncated(self):
+        self.append(self.rows[:70])
+        self.run_incremental()
+        self.append(self.rows[70:72])
+
+        # Enriched rows are appended, then the run fails before checkpointing
+        failing = mock.patch.object(
+            main, "save_checkpoint", side_effect=OSError("disk full")
+        )
+        with failing, self.assertRaises(OSError):
+            self.run_incremental()
+        self.assertEqual(len(self.enriched_lines()), 73)
+
+        self.run_incremental()
+        lines = self.enriched_lines()
+        self.assertEqual(len(lines), 73)
+        self.assertEqual(
+            [line.split("|", 1)[0] for line in lines[1:]], self.ids(self.rows[:72])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
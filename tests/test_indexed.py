@@ -0,0 +1,83 @@
+"""
+Tests that IndexedDataset queries match a plain filter over the rows
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.indexed import IndexedDataset  # noqa: E402
+from utils.records import Transaction  # noqa: E402
+
+from test_columnar import make_transactions  # noqa: E402
+
+QUERIES = (
+    {},
+    {"region": "North"},
+    {"min_amount": 5000},
+    {"max_amount": 2000, "region": "West"},
+    {"start_date": "2024-12-05", "end_date": "2024-12-09"},
+    {"region": "East", "min_amount": 10000, "end_date": "2024-12-03"},
+    {"customer": "C007", "product": "Product 103"},
+    {"date": "2024-12-31", "min_amount": 0},
+    {"region": "Nowhere"},
+)
+
+
+def matches(tx, region=None, min_amount=None, max_amount=None, date=None,
+            customer=None, product=None, start_date=None, end_date=None):
+    amount = tx["Quantity"] * tx["UnitPrice"]
+    return (
+        (not region or tx["Region"] == region)
+        and (not date or tx["Date"] == date)
+        and (not customer or tx["CustomerID"] == customer)
+        and (not product or tx["ProductName"] == product)
+        and (min_amount is None or amount >= min_amount)
+        and (max_amount is None or amount <= max_amount)
+        and (not start_date or tx["Date"] >= start_date)
+        and (not end_date or tx["Date"] <= end_date)
+    )
+
+
+class IndexedDatasetTest(unittest.TestCase):
+    def setUp(self):
+        rows = make_transactions(2000)
+        self.datasets = (
+            IndexedDataset(rows),
+            IndexedDataset(Transaction(**tx) for tx in rows),
+        )
+
+    def test_queries_match_filter_in_input_order(self):
+        for dataset in self.datasets:
+            for filters in QUERIES:
+                with self.subTest(records=type(dataset.transactions[0]), **filters):
+                    expected = [
+                        position
+                        for position, tx in enumerate(dataset.transactions)
+                        if matches(tx, **filters)
+                    ]
+                    self.assertEqual(dataset.positions(**filters), expected)
+
+    def test_aggregate_is_cached(self):
+        dataset = self.datasets[0]
+        aggregate = dataset.aggregate(region="South", min_amount=1000)
+
+        self.assertIs(dataset.aggregate(min_amount=1000, region="South"), aggregate)
+        self.assertEqual(
+            aggregate.transaction_count,
+            len(dataset.query(region="South", min_amount=1000)),
+        )
+
+    def test_amount_range(self):
+        dataset = self.datasets[0]
+        amounts = [tx["Quantity"] * tx["UnitPrice"] for tx in dataset.transactions]
+
+        self.assertEqual(dataset.amount_range(), (min(amounts), max(amounts)))
+        self.assertEqual(IndexedDataset([]).amount_range(), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Tests for the metrics files written by utils/metrics.py
+
+Usage: python -m pytest tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import PROMETHEUS_FILE, RunMetrics  # noqa: E402
+
+
+def run(run_id, rows=10):
+    metrics = RunMetrics(run_id)
+    with metrics.stage("load", rows=rows):
+        pass
+    metrics.finish()
+    return metrics
+
+
+class MetricsWriteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_prometheus_file_is_stable(self):
+        _, first = run("20240101_000000_000000_1").write(self.directory)
+        _, second = run("20240102_000000_000000_1", rows=20).write(self.directory)
+
+        self.assertEqual(first, second)
+        self.assertEqual(os.path.basename(second), PROMETHEUS_FILE)
+        with open(second, encoding="utf-8") as file:
+            text = file.read()
+        self.assertNotIn("run_id", text)
+        self.assertIn('sales_pipeline_stage_rows{stage="load",status="ok"} 20', text)
+        self.assertIn("sales_pipeline_run_success 1", text)
+
+    def test_json_runs_are_pruned(self):
+        # A per-run .prom file left by an earlier version is removed too
+        open(os.path.join(self.directory, "run_old.prom"), "w").close()
+
+        for day in range(1, 6):
+            json_path, _ = run(f"202401{day:02d}_000000_000000_1").write(
+                self.directory, keep=3
+            )
+
+        with open(json_path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["run_id"], "20240105_000000_000000_1")
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            [
+                "run_20240103_000000_000000_1.json",
+                "run_20240104_000000_000000_1.json",
+                "run_20240105_000000_000000_1.json",
+                PROMETHEUS_FILE,
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
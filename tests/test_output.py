@@ -0,0 +1,78 @@
+"""
+Tests for the atomic writers in utils/output.py
+
+Usage: python -m pytest tests
+"""
+import gzip
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.output import _UMASK, atomic_open, write_text  # noqa: E402
+
+
+class AtomicOpenTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "report.txt")
+
+    def test_writers_use_separate_temp_files(self):
+        with atomic_open(self.path) as first, atomic_open(self.path) as second:
+            self.assertNotEqual(first.name, second.name)
+            for file in (first, second):
+                name = os.path.basename(file.name)
+                self.assertTrue(name.startswith(".report.txt."))
+                self.assertTrue(name.endswith(".tmp"))
+            first.write("first\n")
+            second.write("second\n")
+
+        with open(self.path, encoding="utf-8") as file:
+            self.assertIn(file.read(), ("first\n", "second\n"))
+        self.assertEqual(os.listdir(self.directory), ["report.txt"])
+
+    def test_concurrent_writers(self):
+        def write(number):
+            for _ in range(20):
+                write_text(self.path, f"{number}\n" * 1000)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(self.path, encoding="utf-8") as file:
+            lines = set(file.read().splitlines())
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(os.listdir(self.directory), ["report.txt"])
+
+    def test_failure_keeps_existing_file(self):
+        write_text(self.path, "kept\n")
+
+        with self.assertRaises(RuntimeError):
+            with atomic_open(self.path) as file:
+                file.write("partial")
+                raise RuntimeError("interrupted")
+
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "kept\n")
+        self.assertEqual(os.listdir(self.directory), ["report.txt"])
+
+    def test_permissions_and_compression(self):
+        path = self.path + ".gz"
+        write_text(path, "compressed\n")
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~_UMASK)
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "compressed\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for the sharded aggregation in utils/parallel.py
+
+Usage: python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_processor import aggregate_sales  # noqa: E402
+from utils.file_handler import (  # noqa: E402
+    parse_transactions,
+    scan_transactions,
+    stream_sales_data,
+)
+from utils.parallel import (  # noqa: E402
+    aggregate_rows,
+    expand_inputs,
+    parallel_aggregate,
+)
+
+from test_columnar import make_transactions  # noqa: E402
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+
+class ParallelAggregateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.filename = os.path.join(directory, "sales.txt")
+
+        lines = [HEADER]
+        for tx in make_transactions(3000):
+            lines.append("|".join(str(tx[field]) for field in HEADER.split("|")))
+        lines.insert(100, "T99999|2024-12-01|P101|Broken|x|1|C001|North")
+        with open(self.filename, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+        rows = parse_transactions(stream_sales_data(self.filename))
+        self.valid = list(scan_transactions(rows))
+
+    def test_shards_match_single_pass(self):
+        expected = aggregate_sales(self.valid)
+
+        for workers in (1, 3):
+            aggregate, _ = parallel_aggregate(self.filename, workers)
+
+            self.assertEqual(aggregate.transaction_count, expected.transaction_count)
+            self.assertEqual(aggregate.customer_analysis(), expected.customer_analysis())
+            self.assertEqual(aggregate.daily_sales_trend(), expected.daily_sales_trend())
+            self.assertEqual(
+                aggregate.top_selling_products(), expected.top_selling_products()
+            )
+            self.assertEqual(list(aggregate.regions), list(expected.regions))
+
+    def test_filters_and_hll(self):
+        expected = aggregate_sales(
+            [tx for tx in self.valid if tx["Region"] == "North"], distinct="hll"
+        )
+
+        aggregate, _ = parallel_aggregate(
+            self.filename, 3, region="North", distinct="hll"
+        )
+
+        self.assertEqual(aggregate.region_wise_sales(), expected.region_wise_sales())
+        self.assertEqual(aggregate.daily_sales_trend(), expected.daily_sales_trend())
+
+
+class AggregateRowsTest(unittest.TestCase):
+    def setUp(self):
+        self.transactions = make_transactions(3000)
+
+    def test_chunks_match_single_pass(self):
+        for distinct in ("exact", "hll"):
+            expected = aggregate_sales(self.transactions, distinct=distinct)
+
+            for workers in (1, 3):
+                with self.subTest(distinct=distinct, workers=workers):
+                    aggregate = aggregate_rows(self.transactions, workers, distinct)
+
+                    # Only float sums of chunks may differ, in the last digits
+                    self.assertEqual(
+                        aggregate.transaction_count, expected.transaction_count
+                    )
+                    self.assertEqual(
+                        aggregate.customer_analysis(), expected.customer_analysis()
+                    )
+                    self.assertEqual(
+                        aggregate.daily_sales_trend(), expected.daily_sales_trend()
+                    )
+                    self.assertEqual(
+                        aggregate.region_wise_sales(), expected.region_wise_sales()
+                    )
+                    self.assertEqual(
+                        aggregate.top_selling_products(),
+                        expected.top_selling_products(),
+                    )
+
+    def test_empty_rows(self):
+        self.assertEqual(aggregate_rows([], 3).transaction_count, 0)
+
+
+class ExpandInputsTest(unittest.TestCase):
+    def test_skips_outputs_and_temp_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        names = (
+            "day1.txt",
+            "day2.txt.gz",
+            "enriched_sales_data.txt",
+            "enriched_sales_data.col",
+            "day3.txt.tmp",
+            ".hidden.txt",
+        )
+        for name in names:
+            open(os.path.join(directory, name), "w").close()
+        os.mkdir(os.path.join(directory, "archive"))
+
+        expected = [os.path.join(directory, name) for name in names[:2]]
+        self.assertEqual(expand_inputs(directory), expected)
+        self.assertEqual(expand_inputs(os.path.join(directory, "*")), expected)
+
+        # A file named outright is always kept
+        enriched = os.path.join(directory, "enriched_sales_data.txt")
+        self.assertEqual(expand_inputs(enriched), [enriched])
+
+
+if __name__ == "__main__":
+    unittest.main()
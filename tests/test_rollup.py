@@ -0,0 +1,277 @@
+"""
+Tests for the rollup cube and history, and that --from-rollup reports
+match reports built from the rows
+
+Usage: python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from functools import partial
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import utils.parallel  # noqa: E402
+from utils.api_handler import enrich_sales_data  # noqa: E402
+from utils.data_processor import (  # noqa: E402
+    RollupCube,
+    RollupHistory,
+    SalesAggregate,
+)
+from utils.metrics import RunMetrics  # noqa: E402
+from utils.slices import aggregate_slices, parse_slice  # noqa: E402
+from utils.snapshot import load_transactions  # noqa: E402
+
+from test_columnar import make_transactions  # noqa: E402
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+SELECTIONS = (
+    (None, None, None),
+    ("North", None, None),
+    (None, "2024-12-05", "2024-12-12"),
+    ("West", "2024-12-20", None),
+    ("East", None, "2024-12-03"),
+    ("Nowhere", None, None),
+)
+
+
+def make_rows(count=1500, seed=11):
+    rows = make_transactions(count, seed)
+    for index, tx in enumerate(rows):
+        tx["API_Match"] = index % 3 != 0
+    return rows
+
+
+def select(rows, region, start_date, end_date):
+    return [
+        tx
+        for tx in rows
+        if (not region or tx["Region"] == region)
+        and (not start_date or tx["Date"] >= start_date)
+        and (not end_date or tx["Date"] <= end_date)
+    ]
+
+
+def report_sections(path):
+    """
+    Returns the report text without its timestamp and customer ranking,
+    which the cube does not keep
+    """
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    lines = [line for line in text.splitlines() if "Generated" not in line]
+    start = lines.index("TOP 5 CUSTOMERS")
+    end = lines.index("DAILY SALES TREND")
+    return lines[:start] + lines[end:]
+
+
+class RollupCubeTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = make_rows()
+        self.cube = RollupCube().update(self.rows)
+
+    def assertSameAggregate(self, actual, expected):
+        self.assertEqual(actual.transaction_count, expected.transaction_count)
+        self.assertEqual(
+            actual.calculate_total_revenue(), expected.calculate_total_revenue()
+        )
+        self.assertEqual(actual.region_wise_sales(), expected.region_wise_sales())
+        self.assertEqual(actual.top_selling_products(), expected.top_selling_products())
+        self.assertEqual(
+            actual.low_performing_products(100), expected.low_performing_products(100)
+        )
+        self.assertEqual(actual.daily_sales_trend(), expected.daily_sales_trend())
+        self.assertEqual(
+            actual.region_unique_customers(), expected.region_unique_customers()
+        )
+        self.assertEqual(actual.min_date, expected.min_date)
+        self.assertEqual(actual.max_date, expected.max_date)
+
+    def test_aggregate_matches_rows(self):
+        for selection in SELECTIONS:
+            with self.subTest(selection=selection):
+                rows = select(self.rows, *selection)
+                expected = SalesAggregate().update(rows)
+                self.assertSameAggregate(self.cube.aggregate(*selection), expected)
+
+                matched = sum(1 for tx in rows if tx["API_Match"])
+                self.assertEqual(
+                    self.cube.enrichment_summary(*selection),
+                    {"matched": matched, "failed": len(rows) - matched},
+                )
+
+    def test_merge_matches_single_cube(self):
+        half = len(self.rows) // 2
+        merged = RollupCube().update(self.rows[:half])
+        merged.merge(RollupCube().update(self.rows[half:]))
+
+        for selection in SELECTIONS:
+            with self.subTest(selection=selection):
+                self.assertSameAggregate(
+                    merged.aggregate(*selection), self.cube.aggregate(*selection)
+                )
+
+    def test_date_ranges_use_day_order(self):
+        rows = make_rows(20)
+        dates = ("2024-12-9", "2024-12-10", "2025-01-02", "2024-11-30")
+        for tx, date in zip(rows, dates * 5):
+            tx["Date"] = date
+        cube = RollupCube().update(rows)
+
+        self.assertEqual(
+            cube.dates(), ["2024-11-30", "2024-12-9", "2024-12-10", "2025-01-02"]
+        )
+        self.assertEqual(cube.aggregate(start_date="2024-12-09").transaction_count, 15)
+        self.assertEqual(
+            cube.aggregate(None, "2024-12-01", "2024-12-31").transaction_count, 10
+        )
+
+    def test_round_trip(self):
+        loaded = RollupCube.from_dict(self.cube.to_dict())
+        self.assertEqual(loaded.to_dict(), self.cube.to_dict())
+
+    def test_hll_counts_are_close(self):
+        cube = RollupCube(distinct="hll").update(self.rows)
+        expected = SalesAggregate().update(self.rows).daily_sales_trend()
+
+        for date, data in cube.aggregate().daily_sales_trend().items():
+            exact = expected[date]["unique_customers"]
+            error = abs(data["unique_customers"] - exact)
+            self.assertLessEqual(error, max(2, exact * 0.1))
+
+
+class RollupHistoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.rollup_file = os.path.join(directory, "rollup.json.gz")
+        self.rows = make_rows()
+
+    def test_defaults_to_exact(self):
+        self.assertEqual(RollupHistory().distinct, "exact")
+        self.assertEqual(RollupHistory.load(self.rollup_file).distinct, "exact")
+
+    def test_rerun_does_not_double_count(self):
+        history = RollupHistory()
+        self.assertTrue(history.add("day1.txt", self.rows[:500], fingerprint=[1, 1]))
+        self.assertTrue(history.add("day2.txt", self.rows[500:], fingerprint=[2, 2]))
+        self.assertFalse(history.add("day1.txt", self.rows[:500], fingerprint=[1, 1]))
+
+        self.assertEqual(history.cube().row_count, len(self.rows))
+
+        # A changed file replaces its own cube
+        self.assertTrue(history.add("day1.txt", self.rows[:100], fingerprint=[1, 2]))
+        self.assertEqual(history.cube().row_count, 100 + len(self.rows) - 500)
+
+    def test_save_and_load(self):
+        history = RollupHistory()
+        history.add("day1.txt", self.rows, fingerprint=[1, 1])
+        history.save(self.rollup_file)
+
+        loaded = RollupHistory.load(self.rollup_file)
+        self.assertEqual(loaded.to_dict(), history.to_dict())
+        self.assertFalse(loaded.add("day1.txt", self.rows, fingerprint=[1, 1]))
+
+
+class FromRollupReportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.rows = make_rows()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def run_quietly(self, func, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+
+    def test_reports_match_row_reports(self):
+        rollup_file = self.path("rollup.json.gz")
+        history = RollupHistory()
+        history.add("day1.txt", self.rows[:700], fingerprint=[1, 1])
+        history.add("day2.txt", self.rows[700:], fingerprint=[2, 2])
+        history.save(rollup_file)
+
+        slices = [
+            parse_slice("name=early,end_date=2024-12-10"),
+            parse_slice("name=north_late,region=North,start_date=2024-12-15"),
+        ]
+        from_rollup = self.run_quietly(
+            main._rollup_slices, RunMetrics(), slices, True, rollup_file
+        )
+        regions = {tx["Region"] for tx in self.rows}
+        expanded = main._expand_slices(slices, True, regions)
+        from_rows = aggregate_slices(self.rows, expanded)
+
+        self.assertEqual(sorted(from_rollup), sorted(from_rows))
+        for name in from_rows:
+            with self.subTest(slice=name):
+                for source, results in (("cube", from_rollup), ("rows", from_rows)):
+                    aggregate, enrichment = results[name]
+                    self.run_quietly(
+                        main.generate_sales_report,
+                        aggregate,
+                        (),
+                        self.path(f"{source}_{name}.txt"),
+                        enrichment,
+                    )
+                self.assertEqual(
+                    report_sections(self.path(f"cube_{name}.txt")),
+                    report_sections(self.path(f"rows_{name}.txt")),
+                )
+
+    def test_batch_skips_saving_an_unchanged_history(self):
+        sales_file = self.path("sales.txt")
+        with open(sales_file, "w", encoding="utf-8") as file:
+            file.write(HEADER + "\n")
+            for tx in self.rows:
+                fields = HEADER.split("|")
+                file.write("|".join(str(tx[field]) for field in fields) + "\n")
+
+        rollup_file = self.path("rollup.json.gz")
+        catalog = mock.Mock()
+        catalog.result.return_value = []
+        patches = (
+            mock.patch.object(main, "CatalogFetch", return_value=catalog),
+            mock.patch.object(
+                main, "enrich_sales_data", partial(enrich_sales_data, filename=None)
+            ),
+            mock.patch.object(
+                utils.parallel,
+                "load_transactions",
+                partial(load_transactions, cache_dir=self.path("snapshots")),
+            ),
+        )
+        with contextlib.ExitStack() as stack:
+            for patch in patches:
+                stack.enter_context(patch)
+
+            batch = partial(
+                main.run_batch,
+                RunMetrics(),
+                [],
+                report_dir=self.path("reports"),
+                source=sales_file,
+                rollup_file=rollup_file,
+            )
+            self.run_quietly(batch)
+            saved = os.stat(rollup_file).st_mtime_ns
+            os.utime(rollup_file, ns=(saved - 10**9, saved - 10**9))
+
+            self.run_quietly(batch)
+            self.assertEqual(os.stat(rollup_file).st_mtime_ns, saved - 10**9)
+
+        history = RollupHistory.load(rollup_file)
+        self.assertEqual(history.cube().row_count, len(self.rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the HyperLogLog sketch in utils/sketches.py
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.sketches  # noqa: E402
+from utils.sketches import HyperLogLog  # noqa: E402
+
+
+def make_sketch(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def densified(sketch):
+    dense = sketch.copy()
+    if dense.sparse is not None:
+        dense._densify()
+    return dense
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_small_sets_stay_sparse(self):
+        sketch = make_sketch(f"C{i}" for i in range(50))
+
+        self.assertIsNotNone(sketch.sparse)
+        self.assertLessEqual(abs(len(sketch) - 50), 2)
+        self.assertEqual(sketch.count(), densified(sketch).count())
+
+    def test_large_sets_become_dense(self):
+        sketch = make_sketch(f"C{i}" for i in range(20000))
+
+        self.assertIsNone(sketch.sparse)
+        self.assertLessEqual(abs(len(sketch) - 20000), 20000 * 0.05)
+
+    def test_merge_matches_union(self):
+        sizes = ((0, 40), (40, 90), (90, 5000), (3000, 9000))
+        sketches = [make_sketch(f"C{i}" for i in range(*size)) for size in sizes]
+        expected = make_sketch(f"C{i}" for i in range(9000))
+
+        for first in sketches:
+            for second in sketches:
+                merged = first.copy().merge(second)
+                dense = densified(first).merge(densified(second))
+                self.assertEqual(densified(merged).registers, dense.registers)
+
+        merged = HyperLogLog()
+        for sketch in sketches:
+            merged |= sketch
+        self.assertEqual(merged.registers, expected.registers)
+
+    def test_merge_without_numpy(self):
+        first = make_sketch(f"C{i}" for i in range(3000))
+        second = make_sketch(f"C{i}" for i in range(2000, 6000))
+        expected = first.copy().merge(second)
+
+        with mock.patch.object(utils.sketches, "np", None):
+            merged = first.copy().merge(second)
+            self.assertEqual(merged.count(), expected.count())
+        self.assertEqual(merged.registers, expected.registers)
+
+    def test_round_trip(self):
+        for size in (0, 30, 5000):
+            with self.subTest(size=size):
+                sketch = make_sketch(f"C{i}" for i in range(size))
+                loaded = HyperLogLog.from_dict(sketch.to_dict())
+
+                self.assertEqual(loaded.to_dict(), sketch.to_dict())
+                self.assertEqual(loaded.count(), sketch.count())
+
+    def test_rejects_mismatched_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+
+
+if __name__ == "__main__":
+    unittest.main()
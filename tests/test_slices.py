@@ -0,0 +1,179 @@
+"""
+Tests for slice specs and that slice reports match aggregates over
+directly filtered rows
+
+Usage: python -m pytest tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_processor import SalesAggregate  # noqa: E402
+from utils.records import Transaction  # noqa: E402
+from utils.slices import (  # noqa: E402
+    aggregate_slices,
+    load_slices,
+    make_slice,
+    parse_slice,
+    region_slices,
+)
+
+from test_columnar import make_transactions  # noqa: E402
+
+SLICES = (
+    make_slice(),
+    make_slice(region="North"),
+    make_slice(name="big", min_amount=20000),
+    make_slice(region="West", max_amount=3000, start_date="2024-12-10"),
+    make_slice(start_date="2024-12-05", end_date="2024-12-12"),
+    make_slice(name="none", region="Nowhere"),
+)
+
+
+def select(rows, spec):
+    return [
+        tx
+        for tx in rows
+        if (not spec["region"] or tx["Region"] == spec["region"])
+        and (
+            spec["min_amount"] is None
+            or tx["Quantity"] * tx["UnitPrice"] >= spec["min_amount"]
+        )
+        and (
+            spec["max_amount"] is None
+            or tx["Quantity"] * tx["UnitPrice"] <= spec["max_amount"]
+        )
+        and (not spec["start_date"] or tx["Date"] >= spec["start_date"])
+        and (not spec["end_date"] or tx["Date"] <= spec["end_date"])
+    ]
+
+
+class ParseSliceTest(unittest.TestCase):
+    def test_parses_terms(self):
+        spec = parse_slice(
+            "region=North, min_amount=1000,max_amount=5e4,"
+            "start_date=2024-1-5,end_date=2024-12-31"
+        )
+
+        self.assertEqual(
+            spec,
+            {
+                "name": "North_amount_1000-50000_2024-01-05_to_2024-12-31",
+                "region": "North",
+                "min_amount": 1000.0,
+                "max_amount": 50000.0,
+                "start_date": "2024-01-05",
+                "end_date": "2024-12-31",
+            },
+        )
+
+    def test_empty_terms_are_unset(self):
+        spec = parse_slice("name=every thing,region=,start_date=")
+
+        self.assertEqual(spec, make_slice(name="every_thing"))
+        self.assertEqual(make_slice()["name"], "all")
+
+    def test_rejects_invalid_terms(self):
+        for text in (
+            "region",
+            "colour=red",
+            "min_amount=lots",
+            "start_date=2024-13-01",
+            "end_date=12/31/2024",
+            "start_date=2024-12-10,end_date=2024-12-09",
+            "min_amount=500,max_amount=100",
+        ):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_slice(text)
+
+    def test_single_day_range(self):
+        spec = parse_slice("start_date=2024-12-09,end_date=2024-12-09")
+        self.assertEqual(spec["start_date"], spec["end_date"])
+
+
+class LoadSlicesTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.filename = os.path.join(directory, "slices.json")
+
+    def load(self, entries):
+        with open(self.filename, "w", encoding="utf-8") as file:
+            json.dump(entries, file)
+        return load_slices(self.filename)
+
+    def test_loads_specs(self):
+        slices = self.load(
+            [{"region": "North"}, {"name": "big", "min_amount": 100000}]
+        )
+
+        self.assertEqual(
+            slices, [make_slice(region="North"), make_slice("big", min_amount=1e5)]
+        )
+
+    def test_rejects_unknown_keys_and_bad_ranges(self):
+        for entries in (
+            [{"region": "North", "colour": "red"}],
+            [{"start_date": "2024-02-30"}],
+            [{"start_date": "2024-12-02", "end_date": "2024-12-01"}],
+        ):
+            with self.subTest(entries=entries):
+                with self.assertRaises(ValueError):
+                    self.load(entries)
+
+
+class AggregateSlicesTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = make_transactions(2000)
+        for index, tx in enumerate(self.rows):
+            tx["API_Match"] = index % 4 != 0
+
+    def test_slices_match_filtered_rows(self):
+        records = [Transaction(**tx) for tx in make_transactions(2000)]
+
+        for rows in (self.rows, records):
+            results = aggregate_slices(rows, SLICES)
+            self.assertEqual(list(results), [spec["name"] for spec in SLICES])
+
+            for spec in SLICES:
+                with self.subTest(records=type(rows[0]), slice=spec["name"]):
+                    selected = select(rows, spec)
+                    aggregate, enrichment = results[spec["name"]]
+                    expected = SalesAggregate().update(selected)
+
+                    # Same rows in the same order, so rankings and ties match
+                    self.assertEqual(aggregate.to_dict(), expected.to_dict())
+                    matched = sum(1 for tx in selected if tx.get("API_Match"))
+                    self.assertEqual(
+                        enrichment,
+                        {"matched": matched, "failed": len(selected) - matched},
+                    )
+
+    def test_same_filters_share_an_aggregate(self):
+        slices = region_slices(["North", "South"]) + [
+            make_slice(name="north_again", region="North")
+        ]
+        results = aggregate_slices(self.rows, slices)
+
+        self.assertIs(results["North"][0], results["north_again"][0])
+
+    def test_unfiltered_aggregate_is_reused(self):
+        unfiltered = SalesAggregate().update(self.rows)
+        results = aggregate_slices(self.rows, SLICES[:2], unfiltered=unfiltered)
+
+        self.assertIs(results["all"][0], unfiltered)
+        self.assertEqual(results["all"][1]["matched"], 1500)
+
+    def test_duplicate_names_rejected(self):
+        with self.assertRaises(ValueError):
+            aggregate_slices(self.rows, [make_slice(), make_slice(name="all")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for the parsed-snapshot cache in utils/snapshot.py
+
+Usage: python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.snapshot  # noqa: E402
+from utils.snapshot import (  # noqa: E402
+    evict_snapshots,
+    load_snapshot,
+    load_transactions,
+    read_columns,
+    snapshot_path,
+)
+
+from test_columnar import make_transactions  # noqa: E402
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+
+def write_sales(filename, transactions):
+    fields = HEADER.split("|")
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(HEADER + "\n")
+        for tx in transactions:
+            file.write("|".join(str(tx[field]) for field in fields) + "\n")
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache_dir = os.path.join(self.directory, "snapshots")
+        self.filename = os.path.join(self.directory, "sales.txt")
+        self.rows = make_transactions(300)
+        write_sales(self.filename, self.rows)
+
+    def load(self, filename=None, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return load_transactions(
+                filename or self.filename, self.cache_dir, **options
+            )
+
+    def ids(self, transactions):
+        return [tx["TransactionID"] for tx in transactions]
+
+    def meta(self, filename=None):
+        path = snapshot_path(filename or self.filename, self.cache_dir)
+        return read_columns(path)[1]
+
+    def shift_mtime(self, filename, seconds):
+        stat = os.stat(filename)
+        mtime = stat.st_mtime_ns + seconds * 10**9
+        os.utime(filename, ns=(mtime, mtime))
+
+    def test_hit_matches_parse(self):
+        parsed = self.load()
+        cached = load_snapshot(self.filename, self.cache_dir)
+
+        self.assertIsNotNone(cached)
+        self.assertEqual(
+            [tx.to_dict() for tx in cached], [tx.to_dict() for tx in parsed]
+        )
+
+    def test_touched_file_rehashes_once(self):
+        self.load()
+        self.shift_mtime(self.filename, 5)
+
+        with mock.patch.object(
+            utils.snapshot, "content_hash", wraps=utils.snapshot.content_hash
+        ) as hashed:
+            self.assertEqual(self.ids(self.load()), self.ids(self.rows))
+            self.assertEqual(hashed.call_count, 1)
+            self.assertEqual(
+                self.meta()["mtime_ns"], os.stat(self.filename).st_mtime_ns
+            )
+
+            self.assertEqual(self.ids(self.load()), self.ids(self.rows))
+            self.assertEqual(hashed.call_count, 1)
+
+    def test_changed_content_invalidates(self):
+        self.load()
+
+        # Same size and mtime moved: only the hash can tell
+        changed = [dict(tx) for tx in self.rows]
+        changed[0]["TransactionID"], changed[1]["TransactionID"] = (
+            changed[1]["TransactionID"],
+            changed[0]["TransactionID"],
+        )
+        write_sales(self.filename, changed)
+        self.shift_mtime(self.filename, 5)
+        self.assertIsNone(load_snapshot(self.filename, self.cache_dir))
+        self.assertFalse(os.path.exists(snapshot_path(self.filename, self.cache_dir)))
+        self.assertEqual(self.ids(self.load()), self.ids(changed))
+
+        # A different size is stale without hashing
+        write_sales(self.filename, self.rows[:200])
+        with mock.patch.object(utils.snapshot, "content_hash") as hashed:
+            self.assertIsNone(load_snapshot(self.filename, self.cache_dir))
+            hashed.assert_not_called()
+        self.assertEqual(len(self.load()), 200)
+
+    def test_least_recently_used_evicted(self):
+        files = [os.path.join(self.directory, f"day{day}.txt") for day in range(3)]
+        for day, filename in enumerate(files):
+            write_sales(filename, self.rows[day * 100:(day + 1) * 100])
+            self.load(filename)
+        size = os.path.getsize(snapshot_path(files[0], self.cache_dir))
+
+        # Oldest use first: day2, then day0 (re-read below), then day1
+        for age, filename in ((30, files[2]), (20, files[0]), (10, files[1])):
+            path = snapshot_path(filename, self.cache_dir)
+            self.shift_mtime(path, -age)
+        self.load(files[0])
+
+        evict_snapshots(self.cache_dir, max_bytes=size * 2 + size // 2)
+
+        kept = [
+            os.path.exists(snapshot_path(filename, self.cache_dir)) for filename in files
+        ]
+        self.assertEqual(kept, [True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,27 +1,387 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils import columnar
+from utils.output import CACHE_DIR, DATA_DIR, append_lines, atomic_open, write_lines
+from utils.records import NO_MATCH, ProductEnrichment, Transaction
+from utils.snapshot import TRANSACTION_COLUMNS, read_columns, write_columns
 
 
 API_URL = "https://dummyjson.com/products"
 
+CATALOG_CACHE_FILE = os.path.join(CACHE_DIR, "product_catalog.json")
+CATALOG_TTL = 24 * 60 * 60  # seconds
+
+# Per-product lookups: responses kept across runs, least recently used first out
+PRODUCT_CACHE_FILE = os.path.join(CACHE_DIR, "product_lookup.json")
+PRODUCT_CACHE_SIZE = 5000
+
+# Product fields create_product_mapping() reads; the rest is not cached
+PRODUCT_FIELDS = ("id", "title", "category", "brand", "rating")
+
+PAGE_SIZE = 100
+FETCH_WORKERS = 4
+REQUEST_TIMEOUT = 10  # seconds, per request
+CATALOG_DEADLINE = 30  # seconds after a background fetch starts
+
+ENRICHED_DATA_FILE = os.path.join(DATA_DIR, "enriched_sales_data.txt")
+ENRICHED_COLUMNS_FILE = os.path.join(DATA_DIR, "enriched_sales_data.col")
+
+ENRICHED_HEADER = (
+    "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|"
+    "CustomerID|Region|API_Category|API_Brand|API_Rating|API_Match"
+)
+
+# Enrichment columns appended to the parsed-transaction layout
+ENRICHED_COLUMNS = TRANSACTION_COLUMNS + (
+    ("API_Category", "dict", None),
+    ("API_Brand", "dict", None),
+    ("API_Rating", "array", "d"),
+    ("API_Match", "array", "b"),
+)
+
+
+def load_catalog_cache(cache_file=CATALOG_CACHE_FILE):
+    """
+    Loads the on-disk product catalog cache
+    Returns: cache entry dict, or None if missing or unreadable
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as file:
+            cache = json.load(file)
+        return cache if "products" in cache else None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f" Ignoring unreadable catalog cache: {e}")
+        return None
+
+
+def save_catalog_cache(cache, cache_file=CATALOG_CACHE_FILE):
+    """
+    Writes the product catalog cache atomically
+    """
+    try:
+        with atomic_open(cache_file) as file:
+            json.dump(cache, file)
+    except OSError as e:
+        print(f" Failed to write catalog cache: {e}")
+
+
+def create_session(pool_size=FETCH_WORKERS):
+    """
+    Creates a keep-alive HTTP session whose connection pool fits the workers
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_remaining_pages(
+    session, api_url, total, first_page_size, workers=FETCH_WORKERS, timeout=REQUEST_TIMEOUT
+):
+    """
+    Fetches every page after the first concurrently
+    Returns: products of those pages, in catalog order
+    """
+    skips = list(range(first_page_size, total, first_page_size))
+    if not skips:
+        return []
+
+    def fetch_page(skip):
+        response = session.get(
+            api_url,
+            params={"limit": first_page_size, "skip": skip},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json().get("products", [])
+
+    # map() yields pages in submission order, whatever order they finish in
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages = list(executor.map(fetch_page, skips))
+
+    return [product for page in pages for product in page]
+
 
-def fetch_all_products():
+def fetch_all_products(
+    api_url=API_URL,
+    cache_file=CATALOG_CACHE_FILE,
+    ttl=CATALOG_TTL,
+    page_size=PAGE_SIZE,
+    workers=FETCH_WORKERS,
+    timeout=REQUEST_TIMEOUT,
+):
     """
     Fetches all products from DummyJSON API
+    The first page reports the catalog total; the remaining pages are then
+    fetched concurrently over one pooled keep-alive session
+    A fresh cached catalog is served without a request; a stale one is
+    revalidated with ETag/If-Modified-Since and kept if the API fails
+    Pass cache_file=None to always hit the API
     """
+    cache = load_catalog_cache(cache_file) if cache_file else None
+
+    if cache and time.time() - cache.get("fetched_at", 0) < ttl:
+        print(f" Using cached product catalog ({len(cache['products'])} products)")
+        return cache["products"]
+
+    headers = {}
+    if cache and cache.get("etag"):
+        headers["If-None-Match"] = cache["etag"]
+    if cache and cache.get("last_modified"):
+        headers["If-Modified-Since"] = cache["last_modified"]
+
+    session = create_session(workers)
     try:
-        response = requests.get(API_URL, params={"limit": 100}, timeout=10)
+        response = session.get(
+            api_url,
+            params={"limit": page_size, "skip": 0},
+            headers=headers,
+            timeout=timeout,
+        )
+
+        if response.status_code == 304 and cache:
+            print(" Product catalog not modified, using cached copy")
+            cache["fetched_at"] = time.time()
+            save_catalog_cache(cache, cache_file)
+            return cache["products"]
+
         response.raise_for_status()
 
         data = response.json()
         products = data.get("products", [])
 
+        # The API may cap the page size below what was asked for
+        if products:
+            products += fetch_remaining_pages(
+                session,
+                api_url,
+                data.get("total", len(products)),
+                len(products),
+                workers,
+                timeout,
+            )
+
         print(f" Successfully fetched {len(products)} products from API")
+
+        if cache_file:
+            save_catalog_cache(
+                {
+                    "fetched_at": time.time(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "products": products,
+                },
+                cache_file,
+            )
         return products
 
     except requests.exceptions.RequestException as e:
         print(f" API fetch failed: {e}")
+
+        if cache:
+            print(" Falling back to cached product catalog")
+            return cache["products"]
         return []
 
+    finally:
+        session.close()
+
+
+class ProductCache:
+    """
+    Size-bounded LRU cache of per-product API responses
+    Entries are {"fetched_at": seconds, "product": dict or None}; None
+    records an ID the API does not know, so it is not requested again
+    """
+
+    def __init__(self, max_entries=PRODUCT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, product_id):
+        entry = self.entries.get(product_id)
+        if entry is not None:
+            self.entries.move_to_end(product_id)
+        return entry
+
+    def put(self, product_id, product):
+        self.entries[product_id] = {"fetched_at": time.time(), "product": product}
+        self.entries.move_to_end(product_id)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @classmethod
+    def load(cls, cache_file=PRODUCT_CACHE_FILE, max_entries=PRODUCT_CACHE_SIZE):
+        """
+        Loads a saved cache, least recently used entry first
+        """
+        cache = cls(max_entries)
+        saved = load_catalog_cache(cache_file)
+        if saved:
+            for product_id, entry in saved["products"].items():
+                cache.entries[int(product_id)] = entry
+            while len(cache.entries) > max_entries:
+                cache.entries.popitem(last=False)
+        return cache
+
+    def save(self, cache_file=PRODUCT_CACHE_FILE):
+        save_catalog_cache({"products": self.entries}, cache_file)
+
+
+def fetch_products_by_id(
+    product_ids,
+    api_url=API_URL,
+    cache_file=PRODUCT_CACHE_FILE,
+    max_entries=PRODUCT_CACHE_SIZE,
+    ttl=CATALOG_TTL,
+    workers=FETCH_WORKERS,
+    timeout=REQUEST_TIMEOUT,
+):
+    """
+    Fetches only the products the given ProductIDs refer to
+    Each one not fresh in the LRU cache is requested from /products/{id},
+    at most `workers` at a time over one pooled session. A failed lookup
+    falls back to its stale cache entry, if any
+    Pass cache_file=None to skip the persistent cache
+    Returns: API-shaped product dicts, like fetch_all_products()
+    """
+    ids = sorted(
+        {number for number in map(catalog_id, product_ids) if number is not None}
+    )
+
+    if cache_file:
+        cache = ProductCache.load(cache_file, max_entries)
+    else:
+        cache = ProductCache(max_entries)
+    now = time.time()
+
+    found = {}
+    missing = []
+    for number in ids:
+        entry = cache.get(number)
+        if entry is not None and now - entry["fetched_at"] < ttl:
+            found[number] = entry["product"]
+        else:
+            missing.append(number)
+
+    if not missing:
+        print(f" Using cached product details ({len(ids)} products)")
+        if cache_file:
+            cache.save(cache_file)
+        return [found[number] for number in ids if found[number]]
+
+    session = create_session(workers)
+
+    def fetch_product(number):
+        response = session.get(f"{api_url}/{number}", timeout=timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        product = response.json()
+        return {field: product.get(field) for field in PRODUCT_FIELDS}
+
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (number, executor.submit(fetch_product, number)) for number in missing
+            ]
+
+            for number, future in futures:
+                try:
+                    product = future.result()
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    failed.append(e)
+                    entry = cache.get(number)
+                    if entry is not None:
+                        found[number] = entry["product"]
+                    continue
+
+                cache.put(number, product)
+                found[number] = product
+    finally:
+        session.close()
+
+    print(f" Fetched {len(missing) - len(failed)} of {len(missing)} products from API")
+    if failed:
+        print(f" {len(failed)} product lookups failed: {failed[-1]}")
+
+    if cache_file:
+        cache.save(cache_file)
+
+    return [found[number] for number in ids if found.get(number)]
+
+
+class CatalogFetch:
+    """
+    Runs fetch_all_products() on a background thread, or with `product_ids`
+    fetch_products_by_id() for just those products
+    Start it before reading the sales data and call result() at the
+    enrichment step, so network latency overlaps parsing. The thread is a
+    daemon: a fetch still running when the pipeline ends never delays exit
+    """
+
+    def __init__(self, product_ids=None, **options):
+        self.started = time.monotonic()
+        self._done = threading.Event()
+        self._products = []
+        self._error = None
+
+        thread = threading.Thread(
+            target=self._run,
+            args=(product_ids, options),
+            name="catalog-fetch",
+            daemon=True,
+        )
+        thread.start()
+
+    def _run(self, product_ids, options):
+        try:
+            if product_ids is None:
+                self._products = fetch_all_products(**options)
+            else:
+                self._products = fetch_products_by_id(product_ids, **options)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def result(self, deadline=CATALOG_DEADLINE):
+        """
+        Waits until `deadline` seconds after the fetch started (None: no limit)
+        Returns: the products, or [] if the fetch failed or is still running,
+        so the run continues with unenriched output instead of stalling
+        """
+        if deadline is None:
+            self._done.wait()
+        elif not self._done.wait(max(0, self.started + deadline - time.monotonic())):
+            print(f" Product catalog not ready after {deadline:g}s, continuing without it")
+            return []
+
+        if self._error is not None:
+            print(f" API fetch failed: {self._error}")
+            return []
+        return self._products
+
 
 def create_product_mapping(api_products):
     """
@@ -43,76 +403,234 @@ def create_product_mapping(api_products):
     return product_mapping
 
 
-def enrich_sales_data(transactions, product_mapping):
+def catalog_id(product_id):
     """
-    Enriches transaction data with API product information
+    Extracts the numeric catalog ID from a ProductID (P101 -> 101)
+    Returns: int, or None if the ProductID has no digits
     """
-    enriched_transactions = []
+    digits = "".join(filter(str.isdigit, product_id))
+    return int(digits) if digits else None
 
-    for tx in transactions:
-        enriched_tx = tx.copy()
 
-        enriched_tx["API_Category"] = None
-        enriched_tx["API_Brand"] = None
-        enriched_tx["API_Rating"] = None
-        enriched_tx["API_Match"] = False
+def plan_product_join(product_ids, product_mapping):
+    """
+    Resolves each distinct ProductID to its catalog entry once
+    Returns: (plan, misses) - plan maps every ProductID to the shared
+    ProductEnrichment for its rows (NO_MATCH on a miss); misses maps each
+    unmatched ProductID to the reason
+    """
+    plan = {}
+    misses = {}
+
+    for product_id in product_ids:
+        if product_id in plan:
+            continue
+
+        number = catalog_id(product_id)
+        api_data = product_mapping.get(number) if number is not None else None
+
+        if api_data is None:
+            plan[product_id] = NO_MATCH
+            misses[product_id] = (
+                "no numeric ID" if number is None else f"ID {number} not in catalog"
+            )
+            continue
+
+        plan[product_id] = ProductEnrichment(
+            api_data.get("category"), api_data.get("brand"), api_data.get("rating"), True
+        )
+
+    return plan, misses
+
+
+def report_join_misses(misses):
+    """
+    Prints the ProductIDs that found no catalog entry
+    """
+    if not misses:
+        return
+
+    print(f" No catalog match for {len(misses)} product ID(s):")
+    for product_id, reason in sorted(misses.items()):
+        print(f"   {product_id}: {reason}")
 
-        try:
-            # Extract numeric ID from ProductID (P101 -> 101)
-            product_id_str = "".join(filter(str.isdigit, tx["ProductID"]))
-            product_id = int(product_id_str)
 
-            if product_id in product_mapping:
-                api_data = product_mapping[product_id]
+def enrich_sales_data(
+    transactions,
+    product_mapping,
+    filename=ENRICHED_DATA_FILE,
+    compression=None,
+    columns_file=None,
+):
+    """
+    Enriches transaction data with API product information
+    The join is planned once per distinct ProductID, then applied to every
+    row. Transaction records are enriched in place with a reference to the
+    shared ProductEnrichment; dictionaries are copied as before
+    With `columns_file` set, a binary columnar copy is written as well;
+    with `filename=None` nothing is saved (see append_enriched_data())
+    """
+    if not isinstance(transactions, list):
+        transactions = list(transactions)
 
-                enriched_tx["API_Category"] = api_data["category"]
-                enriched_tx["API_Brand"] = api_data["brand"]
-                enriched_tx["API_Rating"] = api_data["rating"]
-                enriched_tx["API_Match"] = True
+    plan, misses = plan_product_join(
+        {tx["ProductID"] for tx in transactions}, product_mapping
+    )
+    report_join_misses(misses)
 
-        except Exception:
-            pass  # Gracefully ignore any enrichment errors
+    enriched_transactions = []
+    for tx in transactions:
+        enrichment = plan[tx["ProductID"]]
+
+        if isinstance(tx, Transaction):
+            tx.enrichment = enrichment
+            enriched_tx = tx
+        else:
+            enriched_tx = tx.copy()
+            enriched_tx["API_Category"] = enrichment.API_Category
+            enriched_tx["API_Brand"] = enrichment.API_Brand
+            enriched_tx["API_Rating"] = enrichment.API_Rating
+            enriched_tx["API_Match"] = enrichment.API_Match
 
         enriched_transactions.append(enriched_tx)
 
     # Save enriched data to file
-    save_enriched_data(enriched_transactions)
+    if filename:
+        save_enriched_data(enriched_transactions, filename, compression)
+    if columns_file:
+        save_enriched_columns(enriched_transactions, columns_file)
 
     return enriched_transactions
 
 
-def save_enriched_data(enriched_transactions, filename="C:/Users/xcite/Documents/sales-analytics-system/data/enriched_sales_data.txt"):
+def enrich_table(table, product_mapping):
     """
-    Saves enriched transactions back to file
+    Enriches a columnar TransactionTable without touching individual rows
+    Returns: (dict of API_* columns, misses)
     """
-    header = (
-        "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|"
-        "CustomerID|Region|API_Category|API_Brand|API_Rating|API_Match\n"
-    )
+    plan, misses = plan_product_join(table.product_ids, product_mapping)
+    report_join_misses(misses)
 
-    try:
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(header)
-
-            for tx in enriched_transactions:
-                row = [
-                    tx.get("TransactionID"),
-                    tx.get("Date"),
-                    tx.get("ProductID"),
-                    tx.get("ProductName"),
-                    str(tx.get("Quantity")),
-                    str(tx.get("UnitPrice")),
-                    tx.get("CustomerID"),
-                    tx.get("Region"),
-                    str(tx.get("API_Category")) if tx.get("API_Category") is not None else "",
-                    str(tx.get("API_Brand")) if tx.get("API_Brand") is not None else "",
-                    str(tx.get("API_Rating")) if tx.get("API_Rating") is not None else "",
-                    str(tx.get("API_Match")),
-                ]
-
-                file.write("|".join(row) + "\n")
+    enrichments = [plan[product_id] for product_id in table.product_ids]
+    return columnar.enrichment_columns(table, enrichments), misses
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _enriched_rows(enriched_transactions):
+    """
+    Yields the enriched file line of each transaction
+    The API_* part of a line is formatted once per shared ProductEnrichment
+    """
+    suffixes = {}
+
+    for tx in enriched_transactions:
+        if type(tx) is Transaction:
+            enrichment = tx.enrichment or NO_MATCH
+            suffix = suffixes.get(enrichment)
+            if suffix is None:
+                suffix = suffixes[enrichment] = "|".join((
+                    _text(enrichment.API_Category),
+                    _text(enrichment.API_Brand),
+                    _text(enrichment.API_Rating),
+                    str(enrichment.API_Match),
+                ))
+            yield (
+                f"{tx.TransactionID}|{tx.Date}|{tx.ProductID}|{tx.ProductName}|"
+                f"{tx.Quantity}|{tx.UnitPrice}|{tx.CustomerID}|{tx.Region}|{suffix}"
+            )
+            continue
 
+        yield "|".join((
+            tx.get("TransactionID"),
+            tx.get("Date"),
+            tx.get("ProductID"),
+            tx.get("ProductName"),
+            str(tx.get("Quantity")),
+            str(tx.get("UnitPrice")),
+            tx.get("CustomerID"),
+            tx.get("Region"),
+            _text(tx.get("API_Category")),
+            _text(tx.get("API_Brand")),
+            _text(tx.get("API_Rating")),
+            str(tx.get("API_Match")),
+        ))
+
+
+def save_enriched_data(
+    enriched_transactions, filename=ENRICHED_DATA_FILE, compression=None
+):
+    """
+    Saves enriched transactions back to file
+    Rows are written in large batches to a temporary file that replaces
+    `filename` once complete; a .gz or .xz name (or `compression`) compresses it
+    """
+    try:
+        lines = _enriched_rows(enriched_transactions)
+        write_lines(filename, itertools.chain((ENRICHED_HEADER,), lines), compression)
         print(f"Enriched data saved to {filename}")
 
-    except IOError as e:
+    except (OSError, ValueError) as e:
         print(f"Failed to write enriched data file: {e}")
+
+
+def append_enriched_data(
+    enriched_transactions, filename=ENRICHED_DATA_FILE, size=None
+):
+    """
+    Appends enriched transactions to the file, keeping the earlier rows
+    `size` is the value returned by the previous call; see append_lines()
+    Returns: the new file size, or `size` if the write failed
+    """
+    try:
+        size = append_lines(
+            filename, _enriched_rows(enriched_transactions), ENRICHED_HEADER, size
+        )
+        print(f"Enriched data appended to {filename}")
+    except (OSError, ValueError) as e:
+        print(f"Failed to append enriched data file: {e}")
+
+    return size
+
+
+def save_enriched_columns(enriched_transactions, filename=ENRICHED_COLUMNS_FILE):
+    """
+    Saves enriched transactions in the binary columnar snapshot format
+    Missing categories and brands are stored as "" and missing ratings as NaN
+    Read it back with load_enriched_columns()
+    """
+    records = all(type(tx) is Transaction for tx in enriched_transactions)
+
+    columns = []
+    for field, kind, typecode in ENRICHED_COLUMNS:
+        if records:
+            values = list(map(attrgetter(field), enriched_transactions))
+        else:
+            values = [tx.get(field) for tx in enriched_transactions]
+
+        if field == "API_Rating":
+            values = array("d", [math.nan if v is None else v for v in values])
+        elif kind == "array":
+            values = array(typecode, values)
+        else:
+            values = ["" if v is None else str(v) for v in values]
+
+        columns.append((field, kind, values))
+
+    try:
+        write_columns(filename, columns, {"rows": len(enriched_transactions)})
+        print(f"Enriched columns saved to {filename}")
+
+    except OSError as e:
+        print(f"Failed to write enriched columns file: {e}")
+
+
+def load_enriched_columns(filename=ENRICHED_COLUMNS_FILE):
+    """
+    Reads a file written by save_enriched_columns()
+    Returns: dict of column name -> array or list of strings
+    """
+    columns, _ = read_columns(filename)
+    return columns
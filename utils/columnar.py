@@ -0,0 +1,368 @@
+from datetime import date
+
+from utils.records import ENRICHMENT_FIELDS, Transaction, parse_day
+from utils.sketches import top_k
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the columnar path
+    np = None
+
+
+class TransactionTable:
+    """
+    Columnar, NumPy-backed store of parsed transactions
+    Numeric fields and dates are typed arrays; region, product and customer
+    are dictionary-encoded as integer codes into small lookup lists
+    """
+
+    def __init__(self, transactions=()):
+        if np is None:
+            raise ImportError("TransactionTable requires numpy")
+
+        transaction_ids = []
+        quantities = []
+        prices = []
+        days = []
+        region_codes = []
+        product_codes = []
+        product_id_codes = []
+        customer_codes = []
+
+        regions = {}
+        products = {}
+        product_ids = {}
+        customers = {}
+
+        for tx in transactions:
+            day = tx.day if type(tx) is Transaction else None
+            if day is None:
+                day = parse_day(tx["Date"])
+
+            transaction_ids.append(tx["TransactionID"])
+            quantities.append(tx["Quantity"])
+            prices.append(tx["UnitPrice"])
+            days.append(day)
+            region_codes.append(regions.setdefault(tx["Region"], len(regions)))
+            product_codes.append(products.setdefault(tx["ProductName"], len(products)))
+            product_id_codes.append(
+                product_ids.setdefault(tx["ProductID"], len(product_ids))
+            )
+            customer_codes.append(customers.setdefault(tx["CustomerID"], len(customers)))
+
+        self.transaction_ids = transaction_ids
+        self.quantity = np.array(quantities, dtype=np.int64)
+        self.unit_price = np.array(prices, dtype=np.float64)
+        self.amount = self.quantity * self.unit_price
+        self.day = np.array(days, dtype=np.int32)
+
+        self.region_codes = np.array(region_codes, dtype=np.int32)
+        self.product_codes = np.array(product_codes, dtype=np.int32)
+        self.product_id_codes = np.array(product_id_codes, dtype=np.int32)
+        self.customer_codes = np.array(customer_codes, dtype=np.int32)
+
+        # Lookup lists, in order of first appearance
+        self.regions = list(regions)
+        self.products = list(products)
+        self.product_ids = list(product_ids)
+        self.customers = list(customers)
+
+    def __len__(self):
+        return len(self.transaction_ids)
+
+    def to_transactions(self):
+        """
+        Converts the table back to the list-of-dictionaries form
+        """
+        dates = {}
+        transactions = []
+
+        for i in range(len(self)):
+            day = int(self.day[i])
+            if day not in dates:
+                dates[day] = date.fromordinal(day).isoformat()
+
+            transactions.append(
+                {
+                    "TransactionID": self.transaction_ids[i],
+                    "Date": dates[day],
+                    "ProductID": self.product_ids[self.product_id_codes[i]],
+                    "ProductName": self.products[self.product_codes[i]],
+                    "Quantity": int(self.quantity[i]),
+                    "UnitPrice": float(self.unit_price[i]),
+                    "CustomerID": self.customers[self.customer_codes[i]],
+                    "Region": self.regions[self.region_codes[i]],
+                }
+            )
+
+        return transactions
+
+
+def _group_sum(codes, weights, size):
+    """
+    Sums weights per integer group code
+    """
+    return np.bincount(codes, weights=weights, minlength=size)
+
+
+def _group_count(codes, size):
+    """
+    Counts rows per integer group code
+    """
+    return np.bincount(codes, minlength=size)
+
+
+def _distinct_pairs(left, right, right_size):
+    """
+    Returns the distinct (left, right) code pairs, sorted by left then right
+    """
+    keys = np.unique(left.astype(np.int64) * right_size + right)
+    return keys // right_size, keys % right_size
+
+
+def calculate_total_revenue(table):
+    """
+    Calculates total revenue from a TransactionTable
+    """
+    return round(float(table.amount.sum()), 2)
+
+
+def region_wise_sales(table):
+    """
+    Analyzes sales by region using group-by reductions
+    """
+    size = len(table.regions)
+    sales = _group_sum(table.region_codes, table.amount, size)
+    counts = _group_count(table.region_codes, size)
+    total_revenue = calculate_total_revenue(table)
+
+    result = {}
+    for code, region in enumerate(table.regions):
+        percentage = (sales[code] / total_revenue * 100) if total_revenue else 0
+
+        result[region] = {
+            "total_sales": round(float(sales[code]), 2),
+            "transaction_count": int(counts[code]),
+            "percentage": round(float(percentage), 2),
+        }
+
+    # Sort by total_sales descending
+    return dict(
+        sorted(result.items(), key=lambda x: x[1]["total_sales"], reverse=True)
+    )
+
+
+def _product_totals(table, rounded=True):
+    """
+    Returns per-product (name, quantity, revenue) tuples in first-seen order
+    """
+    size = len(table.products)
+    quantity = _group_sum(table.product_codes, table.quantity, size)
+    revenue = _group_sum(table.product_codes, table.amount, size).tolist()
+    if rounded:
+        revenue = [round(total, 2) for total in revenue]
+
+    return [
+        (name, int(quantity[code]), revenue[code])
+        for code, name in enumerate(table.products)
+    ]
+
+
+def top_selling_products(table, n=5):
+    """
+    Finds top n products by total quantity sold
+    """
+    # Bounded heap instead of sorting every product
+    return top_k(_product_totals(table), n, key=lambda x: x[1])
+
+
+def customer_analysis(table):
+    """
+    Analyzes customer purchase patterns using group-by reductions
+    """
+    size = len(table.customers)
+    spent = _group_sum(table.customer_codes, table.amount, size)
+    counts = _group_count(table.customer_codes, size)
+
+    # Distinct products per customer, grouped by customer code
+    bought = [[] for _ in range(size)]
+    customer_of, product_of = _distinct_pairs(
+        table.customer_codes, table.product_codes, max(len(table.products), 1)
+    )
+    for customer, product in zip(customer_of.tolist(), product_of.tolist()):
+        bought[customer].append(table.products[product])
+
+    result = {}
+    for code, customer in enumerate(table.customers):
+        count = int(counts[code])
+        total = float(spent[code])
+
+        result[customer] = {
+            "total_spent": round(total, 2),
+            "purchase_count": count,
+            "avg_order_value": round(total / count if count else 0, 2),
+            "products_bought": sorted(bought[code]),
+        }
+
+    # Sort by total_spent descending
+    return dict(
+        sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True)
+    )
+
+
+def daily_sales_trend(table):
+    """
+    Analyzes sales trends by date using group-by reductions
+    """
+    days, day_codes = np.unique(table.day, return_inverse=True)
+    size = len(days)
+    revenue = _group_sum(day_codes, table.amount, size)
+    counts = _group_count(day_codes, size)
+
+    day_of, _ = _distinct_pairs(
+        day_codes, table.customer_codes, max(len(table.customers), 1)
+    )
+    customers = _group_count(day_of, size)
+
+    # np.unique returns the days already sorted chronologically
+    result = {}
+    for code, day in enumerate(days.tolist()):
+        result[date.fromordinal(day).isoformat()] = {
+            "revenue": round(float(revenue[code]), 2),
+            "transaction_count": int(counts[code]),
+            "unique_customers": int(customers[code]),
+        }
+
+    return result
+
+
+def find_peak_sales_day(table):
+    """
+    Identifies the date with highest revenue
+    """
+    peak_date = None
+    peak_revenue = 0.0
+    peak_transactions = 0
+
+    for day, data in daily_sales_trend(table).items():
+        if data["revenue"] > peak_revenue:
+            peak_revenue = data["revenue"]
+            peak_transactions = data["transaction_count"]
+            peak_date = day
+
+    return peak_date, peak_revenue, peak_transactions
+
+
+def low_performing_products(table, threshold=10):
+    """
+    Identifies products with low sales
+    """
+    low_products = [p for p in _product_totals(table) if p[1] < threshold]
+
+    # Sort by quantity ascending
+    low_products.sort(key=lambda x: x[1])
+
+    return low_products
+
+
+def aggregate_table(table, aggregate):
+    """
+    Folds a TransactionTable into a SalesAggregate using group-by reductions
+    Each group is summed in row order, so the totals match folding the same
+    rows one at a time with SalesAggregate.update(); an approximate-customer
+    aggregate is offered each customer's total once instead of every row
+    Returns: the aggregate
+    """
+    if not len(table):
+        return aggregate
+
+    customers = table.customers
+    n_customers = len(customers)
+    new_distinct = aggregate._new_distinct
+
+    # Sequential, like the row-at-a-time total
+    aggregate.total_revenue = sum(table.amount.tolist(), aggregate.total_revenue)
+    aggregate.transaction_count += len(table)
+
+    size = len(table.regions)
+    sales = _group_sum(table.region_codes, table.amount, size).tolist()
+    counts = _group_count(table.region_codes, size).tolist()
+    for code, region in enumerate(table.regions):
+        data = aggregate.regions.get(region)
+        if data is None:
+            data = aggregate.regions[region] = [0.0, 0]
+            aggregate.region_customers[region] = new_distinct()
+        data[0] += sales[code]
+        data[1] += counts[code]
+
+    region_of, customer_of = _distinct_pairs(
+        table.region_codes, table.customer_codes, max(n_customers, 1)
+    )
+    for region, customer in zip(region_of.tolist(), customer_of.tolist()):
+        aggregate.region_customers[table.regions[region]].add(customers[customer])
+
+    for name, quantity, total in _product_totals(table, rounded=False):
+        data = aggregate.products.get(name)
+        if data is None:
+            data = aggregate.products[name] = [0, 0.0]
+        data[0] += quantity
+        data[1] += total
+
+    spent = _group_sum(table.customer_codes, table.amount, n_customers).tolist()
+    orders = _group_count(table.customer_codes, n_customers).tolist()
+    if aggregate.exact_customers:
+        bought = [set() for _ in range(n_customers)]
+        customer_of, product_of = _distinct_pairs(
+            table.customer_codes, table.product_codes, max(len(table.products), 1)
+        )
+        for customer, product in zip(customer_of.tolist(), product_of.tolist()):
+            bought[customer].add(table.products[product])
+
+        for code, customer in enumerate(customers):
+            data = aggregate.customers.get(customer)
+            if data is None:
+                data = aggregate.customers[customer] = [0.0, 0, set()]
+            data[0] += spent[code]
+            data[1] += orders[code]
+            data[2] |= bought[code]
+    else:
+        for code, customer in enumerate(customers):
+            aggregate.customer_spend.update(customer, spent[code])
+            aggregate.customer_orders.update(customer, orders[code])
+
+    days, day_codes = np.unique(table.day, return_inverse=True)
+    size = len(days)
+    revenue = _group_sum(day_codes, table.amount, size).tolist()
+    counts = _group_count(day_codes, size).tolist()
+    dates = [date.fromordinal(day).isoformat() for day in days.tolist()]
+    for code, day in enumerate(dates):
+        data = aggregate.daily.get(day)
+        if data is None:
+            data = aggregate.daily[day] = [0.0, 0, new_distinct()]
+        data[0] += revenue[code]
+        data[1] += counts[code]
+
+    day_of, customer_of = _distinct_pairs(
+        day_codes, table.customer_codes, max(n_customers, 1)
+    )
+    for day, customer in zip(day_of.tolist(), customer_of.tolist()):
+        aggregate.daily[dates[day]][2].add(customers[customer])
+
+    if aggregate.min_date is None or dates[0] < aggregate.min_date:
+        aggregate.min_date = dates[0]
+    if aggregate.max_date is None or dates[-1] > aggregate.max_date:
+        aggregate.max_date = dates[-1]
+    return aggregate
+
+
+def enrichment_columns(table, enrichments):
+    """
+    Expands one ProductEnrichment per ProductID code into per-row API_* columns
+    """
+    codes = table.product_id_codes
+    columns = {}
+    for field in ENRICHMENT_FIELDS:
+        values = [getattr(enrichment, field) for enrichment in enrichments]
+        dtype = bool if field == "API_Match" else object
+        columns[field] = np.array(values, dtype=dtype)[codes]
+    return columns
@@ -1,196 +1,925 @@
-from collections import defaultdict
-from datetime import datetime
+import json
+import os
+from bisect import bisect_left, bisect_right
+from operator import attrgetter, itemgetter
 
+from utils import columnar
+from utils.columnar import TransactionTable
+from utils.output import COMPRESSORS, OUTPUT_DIR, atomic_open, compression_for
+from utils.records import Transaction, parse_day
+from utils.sketches import CountMinSketch, HyperLogLog, SpaceSaving, top_k
 
-def calculate_total_revenue(transactions):
+# Pulls the fields the aggregate needs in one C-level call per row
+_REPORT_FIELDS = ("Quantity", "UnitPrice", "ProductName", "CustomerID", "Date", "Region")
+_record_fields = attrgetter(*_REPORT_FIELDS)
+_mapping_fields = itemgetter(*_REPORT_FIELDS)
+
+# Distinct-customer counting modes
+DISTINCT_MODES = ("exact", "hll")
+HLL_PRECISION = 12
+
+ROLLUP_FILE = os.path.join(OUTPUT_DIR, "sales_rollup.json.gz")
+
+
+class _DistinctCounting:
     """
-    Calculates total revenue from all transactions
+    Creates and serializes distinct-customer sets or HyperLogLog sketches
+    according to the `distinct` and `hll_precision` attributes
     """
-    total_revenue = 0.0
 
-    for tx in transactions:
-        total_revenue += tx["Quantity"] * tx["UnitPrice"]
+    def _new_distinct(self):
+        if self.distinct == "hll":
+            return HyperLogLog(self.hll_precision)
+        return set()
 
-    return round(total_revenue, 2)
+    def _distinct_to_dict(self, customers):
+        if self.distinct == "hll":
+            return customers.to_dict()
+        return sorted(customers)
 
+    def _distinct_from_dict(self, data):
+        if self.distinct == "hll":
+            return HyperLogLog.from_dict(data)
+        return set(data)
 
-def region_wise_sales(transactions):
+
+class SalesAggregate(_DistinctCounting):
     """
-    Analyzes sales by region
+    Accumulates every report metric in a single pass over transactions
+    The analysis functions below are views over its result
+
+    With customer_capacity set, customers are tracked approximately in
+    bounded memory: a Space-Saving summary of spend (top customers) and a
+    Count-Min sketch of order counts replace the per-customer dictionary
+
+    Unique customers per day and per region are exact sets by default; with
+    distinct="hll" they are HyperLogLog sketches of fixed size, which still
+    merge across shards and combine over days (e.g. weekly uniques)
     """
-    region_data = defaultdict(lambda: {"total_sales": 0.0, "transaction_count": 0})
 
-    total_revenue = calculate_total_revenue(transactions)
+    def __init__(
+        self, customer_capacity=None, distinct="exact", hll_precision=HLL_PRECISION
+    ):
+        if distinct not in DISTINCT_MODES:
+            raise ValueError(f"Unknown distinct mode: {distinct}")
+
+        self.customer_capacity = customer_capacity
+        self.distinct = distinct
+        self.hll_precision = hll_precision
+        self.total_revenue = 0.0
+        self.transaction_count = 0
+        self.min_date = None
+        self.max_date = None
+
+        # region -> [total_sales, transaction_count]
+        self.regions = {}
+        # product name -> [quantity, revenue]
+        self.products = {}
+        # customer -> [total_spent, purchase_count, products_bought]
+        self.customers = {}
+        # date -> [revenue, transaction_count, customers]
+        self.daily = {}
+        # region -> customers
+        self.region_customers = {}
+
+        self.customer_spend = None
+        self.customer_orders = None
+        if customer_capacity:
+            self.customer_spend = SpaceSaving(customer_capacity)
+            self.customer_orders = CountMinSketch()
+
+    @property
+    def exact_customers(self):
+        return self.customer_spend is None
+
+    def add(self, tx):
+        """
+        Folds a single transaction into the aggregate
+        """
+        self.update((tx,))
+
+    def update(self, transactions):
+        """
+        Folds an iterable of transactions into the aggregate
+        """
+        regions = self.regions
+        products = self.products
+        customers = self.customers
+        daily = self.daily
+        region_customers = self.region_customers
+        new_distinct = self._new_distinct
+        total_revenue = self.total_revenue
+        count = 0
+        min_date = self.min_date
+        max_date = self.max_date
+        exact_customers = self.exact_customers
+        customer_spend = self.customer_spend
+        customer_orders = self.customer_orders
+
+        for tx in transactions:
+            fields = _record_fields if type(tx) is Transaction else _mapping_fields
+            qty, price, name, customer, date, region = fields(tx)
+            revenue = qty * price
+
+            total_revenue += revenue
+            count += 1
+
+            region_data = regions.get(region)
+            if region_data is None:
+                region_data = regions[region] = [0.0, 0]
+                region_customers[region] = new_distinct()
+            region_data[0] += revenue
+            region_data[1] += 1
+            region_customers[region].add(customer)
+
+            product_data = products.get(name)
+            if product_data is None:
+                product_data = products[name] = [0, 0.0]
+            product_data[0] += qty
+            product_data[1] += revenue
+
+            if exact_customers:
+                customer_data = customers.get(customer)
+                if customer_data is None:
+                    customer_data = customers[customer] = [0.0, 0, set()]
+                customer_data[0] += revenue
+                customer_data[1] += 1
+                customer_data[2].add(name)
+            else:
+                customer_spend.update(customer, revenue)
+                customer_orders.update(customer)
+
+            day_data = daily.get(date)
+            if day_data is None:
+                day_data = daily[date] = [0.0, 0, new_distinct()]
+                if min_date is None or date < min_date:
+                    min_date = date
+                if max_date is None or date > max_date:
+                    max_date = date
+            day_data[0] += revenue
+            day_data[1] += 1
+            day_data[2].add(customer)
+
+        self.total_revenue = total_revenue
+        self.transaction_count += count
+        self.min_date = min_date
+        self.max_date = max_date
+        return self
+
+    def merge(self, other):
+        """
+        Folds another aggregate into this one
+        Merging is associative, so partial results can be combined in any grouping
+        """
+        if self.exact_customers != other.exact_customers:
+            raise ValueError("Cannot merge exact and approximate customer aggregates")
+        if (self.distinct, self.hll_precision) != (other.distinct, other.hll_precision):
+            raise ValueError("Cannot merge aggregates with different distinct modes")
+
+        if not self.exact_customers:
+            self.customer_spend.merge(other.customer_spend)
+            self.customer_orders.merge(other.customer_orders)
+
+        self.total_revenue += other.total_revenue
+        self.transaction_count += other.transaction_count
+
+        for date in (other.min_date, other.max_date):
+            if date is None:
+                continue
+            if self.min_date is None or date < self.min_date:
+                self.min_date = date
+            if self.max_date is None or date > self.max_date:
+                self.max_date = date
+
+        for key, (sales, count) in other.regions.items():
+            data = self.regions.setdefault(key, [0.0, 0])
+            data[0] += sales
+            data[1] += count
+
+        for key, (qty, revenue) in other.products.items():
+            data = self.products.setdefault(key, [0, 0.0])
+            data[0] += qty
+            data[1] += revenue
+
+        for key, (spent, count, names) in other.customers.items():
+            data = self.customers.setdefault(key, [0.0, 0, set()])
+            data[0] += spent
+            data[1] += count
+            data[2].update(names)
+
+        for key, (revenue, count, customers) in other.daily.items():
+            data = self.daily.get(key)
+            if data is None:
+                data = self.daily[key] = [0.0, 0, self._new_distinct()]
+            data[0] += revenue
+            data[1] += count
+            data[2] |= customers
+
+        for key, customers in other.region_customers.items():
+            data = self.region_customers.get(key)
+            if data is None:
+                data = self.region_customers[key] = self._new_distinct()
+            data |= customers
+
+        return self
+
+    def to_dict(self):
+        """
+        Serializes the aggregate to JSON-compatible data
+        """
+        return {
+            "customer_capacity": self.customer_capacity,
+            "distinct": self.distinct,
+            "hll_precision": self.hll_precision,
+            "customer_spend": self.customer_spend and self.customer_spend.to_dict(),
+            "customer_orders": self.customer_orders and self.customer_orders.to_dict(),
+            "total_revenue": self.total_revenue,
+            "transaction_count": self.transaction_count,
+            "min_date": self.min_date,
+            "max_date": self.max_date,
+            "regions": self.regions,
+            "products": self.products,
+            "customers": {
+                key: [spent, count, sorted(names)]
+                for key, (spent, count, names) in self.customers.items()
+            },
+            "daily": {
+                key: [revenue, count, self._distinct_to_dict(customers)]
+                for key, (revenue, count, customers) in self.daily.items()
+            },
+            "region_customers": {
+                key: self._distinct_to_dict(customers)
+                for key, customers in self.region_customers.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds an aggregate produced by to_dict()
+        """
+        aggregate = cls(
+            data.get("customer_capacity"),
+            data.get("distinct", "exact"),
+            data.get("hll_precision", HLL_PRECISION),
+        )
+        if data.get("customer_spend"):
+            aggregate.customer_spend = SpaceSaving.from_dict(data["customer_spend"])
+            aggregate.customer_orders = CountMinSketch.from_dict(data["customer_orders"])
+        aggregate.total_revenue = data["total_revenue"]
+        aggregate.transaction_count = data["transaction_count"]
+        aggregate.min_date = data["min_date"]
+        aggregate.max_date = data["max_date"]
+        aggregate.regions = {k: list(v) for k, v in data["regions"].items()}
+        aggregate.products = {k: list(v) for k, v in data["products"].items()}
+        aggregate.customers = {
+            key: [spent, count, set(names)]
+            for key, (spent, count, names) in data["customers"].items()
+        }
+        aggregate.daily = {
+            key: [revenue, count, aggregate._distinct_from_dict(customers)]
+            for key, (revenue, count, customers) in data["daily"].items()
+        }
+        aggregate.region_customers = {
+            key: aggregate._distinct_from_dict(customers)
+            for key, customers in data.get("region_customers", {}).items()
+        }
+        # Aggregates saved without per-region customers start those counts empty
+        for key in aggregate.regions:
+            aggregate.region_customers.setdefault(key, aggregate._new_distinct())
+        return aggregate
+
+    def calculate_total_revenue(self):
+        return round(self.total_revenue, 2)
+
+    def region_wise_sales(self):
+        total_revenue = self.calculate_total_revenue()
+
+        # Build final output with percentage
+        result = {}
+        for region, (sales, count) in self.regions.items():
+            percentage = (sales / total_revenue * 100) if total_revenue else 0
+
+            result[region] = {
+                "total_sales": round(sales, 2),
+                "transaction_count": count,
+                "percentage": round(percentage, 2),
+            }
+
+        # Sort by total_sales descending
+        return dict(
+            sorted(result.items(), key=lambda x: x[1]["total_sales"], reverse=True)
+        )
+
+    def top_selling_products(self, n=5):
+        products = (
+            (name, qty, round(revenue, 2))
+            for name, (qty, revenue) in self.products.items()
+        )
+
+        # Bounded heap instead of sorting every product
+        return top_k(products, n, key=lambda x: x[1])
+
+    def customer_analysis(self):
+        if not self.exact_customers:
+            raise ValueError("customer_analysis needs exact customer tracking")
 
-    for tx in transactions:
-        revenue = tx["Quantity"] * tx["UnitPrice"]
-        region = tx["Region"]
+        result = {}
+        for customer, (spent, count, names) in self.customers.items():
+            avg_order_value = spent / count if count else 0
 
-        region_data[region]["total_sales"] += revenue
-        region_data[region]["transaction_count"] += 1
+            result[customer] = {
+                "total_spent": round(spent, 2),
+                "purchase_count": count,
+                "avg_order_value": round(avg_order_value, 2),
+                "products_bought": sorted(names),
+            }
 
-    # Build final output with percentage
-    result = {}
-    for region, data in region_data.items():
-        percentage = (data["total_sales"] / total_revenue * 100) if total_revenue else 0
+        # Sort by total_spent descending
+        return dict(
+            sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True)
+        )
 
-        result[region] = {
-            "total_sales": round(data["total_sales"], 2),
-            "transaction_count": data["transaction_count"],
-            "percentage": round(percentage, 2),
+    def top_customers(self, n=5):
+        """
+        Returns: [(customer, stats)] for the n highest spenders
+        Approximate aggregates add "spent_error" and "orders_error" bounds
+        """
+        if self.exact_customers:
+            top = top_k(
+                self.customers.items(), n, key=lambda item: round(item[1][0], 2)
+            )
+            return [
+                (
+                    customer,
+                    {
+                        "total_spent": round(spent, 2),
+                        "purchase_count": count,
+                        "avg_order_value": round(spent / count if count else 0, 2),
+                        "products_bought": sorted(names),
+                    },
+                )
+                for customer, (spent, count, names) in top
+            ]
+
+        orders_error = round(self.customer_orders.error_bound())
+        result = []
+        for customer, spent, error in self.customer_spend.top(n):
+            count = self.customer_orders.estimate(customer)
+            result.append(
+                (
+                    customer,
+                    {
+                        "total_spent": round(spent, 2),
+                        "purchase_count": count,
+                        "avg_order_value": round(spent / count if count else 0, 2),
+                        "spent_error": round(error, 2),
+                        "orders_error": orders_error,
+                    },
+                )
+            )
+        return result
+
+    def daily_sales_trend(self):
+        # Sort chronologically
+        sorted_dates = sorted(self.daily, key=parse_day)
+
+        result = {}
+        for date in sorted_dates:
+            revenue, count, customers = self.daily[date]
+            result[date] = {
+                "revenue": round(revenue, 2),
+                "transaction_count": count,
+                "unique_customers": len(customers),
+            }
+
+        return result
+
+    def unique_customers(self, dates=None):
+        """
+        Counts distinct customers over the given dates (all dates by default)
+        In "hll" mode the daily sketches are merged, e.g. into weekly uniques
+        """
+        if dates is None:
+            dates = self.daily
+
+        union = self._new_distinct()
+        for date in dates:
+            data = self.daily.get(date)
+            if data is not None:
+                union |= data[2]
+
+        return len(union)
+
+    def region_unique_customers(self):
+        """
+        Returns: {region: distinct customer count}
+        """
+        return {
+            region: len(customers)
+            for region, customers in self.region_customers.items()
         }
 
-    # Sort by total_sales descending
-    result = dict(
-        sorted(result.items(), key=lambda x: x[1]["total_sales"], reverse=True)
-    )
+    def find_peak_sales_day(self):
+        peak_date = None
+        peak_revenue = 0.0
+        peak_transactions = 0
 
-    return result
+        for date, data in self.daily_sales_trend().items():
+            if data["revenue"] > peak_revenue:
+                peak_revenue = data["revenue"]
+                peak_transactions = data["transaction_count"]
+                peak_date = date
 
+        return peak_date, peak_revenue, peak_transactions
 
-def top_selling_products(transactions, n=5):
+    def low_performing_products(self, threshold=10):
+        low_products = [
+            (name, qty, round(revenue, 2))
+            for name, (qty, revenue) in self.products.items()
+            if qty < threshold
+        ]
+
+        # Sort by quantity ascending
+        low_products.sort(key=lambda x: x[1])
+
+        return low_products
+
+
+def _cube_mapping_fields(tx):
+    return _mapping_fields(tx) + (tx.get("API_Match"),)
+
+
+_cube_record_fields = attrgetter(*_REPORT_FIELDS, "API_Match")
+
+
+class RollupCube(_DistinctCounting):
     """
-    Finds top n products by total quantity sold
+    Date x region x product rollup of quantity, revenue, transaction count
+    and enrichment matches, plus unique customers per (date, region)
+
+    Every report section except the customer ranking can be rebuilt from it
+    for any region and date range with aggregate(); a query touches only the
+    cells of the dates in range, never the raw rows. Each cell also keeps the
+    position of its first row, so rebuilt regions and products come out in
+    the same first-seen order (and ties rank the same) as a pass over the rows
+    """
+
+    def __init__(self, distinct="exact", hll_precision=HLL_PRECISION):
+        if distinct not in DISTINCT_MODES:
+            raise ValueError(f"Unknown distinct mode: {distinct}")
+
+        self.distinct = distinct
+        self.hll_precision = hll_precision
+        # date -> {(region, product name): [quantity, revenue, count, matched, first]}
+        self.cells = {}
+        self.row_count = 0
+        # date -> {region: customers}
+        self.customers = {}
+        # Sorted dates and their day ordinals, rebuilt when a date is added
+        self._dates = None
+        self._days = None
+
+    def update(self, transactions):
+        """
+        Folds an iterable of transactions into the cube
+        """
+        cells = self.cells
+        customers = self.customers
+        new_distinct = self._new_distinct
+        position = self.row_count
+
+        for tx in transactions:
+            if type(tx) is Transaction:
+                fields = _cube_record_fields
+            else:
+                fields = _cube_mapping_fields
+            qty, price, name, customer, date, region, match = fields(tx)
+
+            day = cells.get(date)
+            if day is None:
+                day = cells[date] = {}
+                customers[date] = {}
+                self._dates = None
+
+            cell = day.get((region, name))
+            if cell is None:
+                cell = day[(region, name)] = [0, 0.0, 0, 0, position]
+            position += 1
+            cell[0] += qty
+            cell[1] += qty * price
+            cell[2] += 1
+            if match:
+                cell[3] += 1
+
+            seen = customers[date].get(region)
+            if seen is None:
+                seen = customers[date][region] = new_distinct()
+            seen.add(customer)
+
+        self.row_count = position
+        return self
+
+    def merge(self, other):
+        """
+        Folds another cube into this one, as if its rows came after ours
+        """
+        if (self.distinct, self.hll_precision) != (other.distinct, other.hll_precision):
+            raise ValueError("Cannot merge cubes with different distinct modes")
+
+        for date, other_day in other.cells.items():
+            day = self.cells.setdefault(date, {})
+            day_customers = self.customers.setdefault(date, {})
+
+            for key, (qty, revenue, count, matched, first) in other_day.items():
+                cell = day.get(key)
+                if cell is None:
+                    cell = day[key] = [0, 0.0, 0, 0, first + self.row_count]
+                cell[0] += qty
+                cell[1] += revenue
+                cell[2] += count
+                cell[3] += matched
+
+            for region, seen in other.customers[date].items():
+                data = day_customers.get(region)
+                if data is None:
+                    data = day_customers[region] = self._new_distinct()
+                data |= seen
+
+        self.row_count += other.row_count
+        self._dates = None
+        return self
+
+    def regions(self):
+        """
+        Returns the sorted regions held by the cube
+        """
+        return sorted({region for day in self.customers.values() for region in day})
+
+    def dates(self):
+        """
+        Returns the dates held by the cube in day order
+        """
+        if self._dates is None:
+            self._dates = sorted(self.cells, key=parse_day)
+            self._days = [parse_day(date) for date in self._dates]
+        return self._dates
+
+    def _dates_between(self, start_date=None, end_date=None):
+        # Bisect on day ordinals, so the range never depends on string order
+        dates = self.dates()
+        days = self._days
+        start = bisect_left(days, parse_day(start_date)) if start_date else 0
+        end = bisect_right(days, parse_day(end_date)) if end_date else len(days)
+        return dates[start:end]
+
+    def aggregate(self, region=None, start_date=None, end_date=None):
+        """
+        Rebuilds a SalesAggregate for one region (or all) and an inclusive
+        YYYY-MM-DD date range (or all dates) from the cube cells
+        Customer rankings are not kept in the cube, so `customers` stays empty
+        """
+        aggregate = SalesAggregate(
+            distinct=self.distinct, hll_precision=self.hll_precision
+        )
+        regions = {}
+        products = {}
+        region_customers = aggregate.region_customers
+        # region / product -> position of its first selected row
+        region_first = {}
+        product_first = {}
+
+        for date in self._dates_between(start_date, end_date):
+            day_revenue = 0.0
+            day_count = 0
+
+            for (cell_region, name), cell in self.cells[date].items():
+                if region and cell_region != region:
+                    continue
+                qty, revenue, count, _, first = cell
+
+                region_data = regions.get(cell_region)
+                if region_data is None:
+                    region_data = regions[cell_region] = [0.0, 0]
+                    region_first[cell_region] = first
+                elif first < region_first[cell_region]:
+                    region_first[cell_region] = first
+                region_data[0] += revenue
+                region_data[1] += count
+
+                product_data = products.get(name)
+                if product_data is None:
+                    product_data = products[name] = [0, 0.0]
+                    product_first[name] = first
+                elif first < product_first[name]:
+                    product_first[name] = first
+                product_data[0] += qty
+                product_data[1] += revenue
+
+                day_revenue += revenue
+                day_count += count
+
+            if not day_count:
+                continue
+
+            day_customers = self._new_distinct()
+            for cell_region, seen in self.customers[date].items():
+                if region and cell_region != region:
+                    continue
+                day_customers |= seen
+                data = region_customers.get(cell_region)
+                if data is None:
+                    data = region_customers[cell_region] = self._new_distinct()
+                data |= seen
+
+            aggregate.daily[date] = [day_revenue, day_count, day_customers]
+            aggregate.total_revenue += day_revenue
+            aggregate.transaction_count += day_count
+            if aggregate.min_date is None:
+                aggregate.min_date = date
+            aggregate.max_date = date
+
+        aggregate.regions = {
+            key: regions[key] for key in sorted(regions, key=region_first.get)
+        }
+        aggregate.products = {
+            key: products[key] for key in sorted(products, key=product_first.get)
+        }
+        return aggregate
+
+    def enrichment_summary(self, region=None, start_date=None, end_date=None):
+        """
+        Returns: {"matched": n, "failed": n} for the same selection as aggregate()
+        """
+        matched = total = 0
+        for date in self._dates_between(start_date, end_date):
+            for (cell_region, _), cell in self.cells[date].items():
+                if region and cell_region != region:
+                    continue
+                total += cell[2]
+                matched += cell[3]
+        return {"matched": matched, "failed": total - matched}
+
+    def to_dict(self):
+        """
+        Serializes the cube to JSON-compatible data
+        """
+        return {
+            "distinct": self.distinct,
+            "hll_precision": self.hll_precision,
+            "row_count": self.row_count,
+            "cells": {
+                date: [[region, name] + values for (region, name), values in day.items()]
+                for date, day in self.cells.items()
+            },
+            "customers": {
+                date: {
+                    region: self._distinct_to_dict(seen)
+                    for region, seen in day.items()
+                }
+                for date, day in self.customers.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a cube produced by to_dict()
+        """
+        cube = cls(
+            data.get("distinct", "exact"), data.get("hll_precision", HLL_PRECISION)
+        )
+        cube.row_count = data["row_count"]
+        cube.cells = {
+            date: {(row[0], row[1]): list(row[2:]) for row in rows}
+            for date, rows in data["cells"].items()
+        }
+        cube.customers = {
+            date: {
+                region: cube._distinct_from_dict(seen)
+                for region, seen in day.items()
+            }
+            for date, day in data["customers"].items()
+        }
+        return cube
+
+    def save(self, filename=ROLLUP_FILE):
+        """
+        Persists the cube as JSON, atomically; .gz and .xz names are compressed
+        """
+        with atomic_open(filename) as file:
+            json.dump(self.to_dict(), file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, filename=ROLLUP_FILE):
+        """
+        Loads a cube written by save()
+        """
+        opener = COMPRESSORS.get(compression_for(filename), open)
+        with opener(filename, "rt", encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+
+class RollupHistory:
+    """
+    Persisted rollup cubes, one per source file
+    Adding a file that is already held replaces its cube, or keeps it if the
+    file's size and mtime are unchanged, so reruns never double-count while
+    runs over new files extend the history; cube() merges them all
+    Customers are counted exactly by default; distinct="hll" keeps a long
+    history smaller at the cost of approximate counts
+    """
+
+    def __init__(self, distinct="exact", hll_precision=HLL_PRECISION):
+        if distinct not in DISTINCT_MODES:
+            raise ValueError(f"Unknown distinct mode: {distinct}")
+
+        self.distinct = distinct
+        self.hll_precision = hll_precision
+        # absolute path -> (fingerprint, RollupCube)
+        self.sources = {}
+
+    @staticmethod
+    def fingerprint(filename):
+        stat = os.stat(filename)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def add(self, filename, transactions, fingerprint=None):
+        """
+        Rolls up one source file's transactions
+        Returns: False if the file was already held unchanged
+        """
+        key = os.path.abspath(filename)
+        if fingerprint is None:
+            fingerprint = self.fingerprint(filename)
+
+        held = self.sources.get(key)
+        if held is not None and held[0] == fingerprint:
+            return False
+
+        cube = RollupCube(self.distinct, self.hll_precision).update(transactions)
+        self.sources[key] = (fingerprint, cube)
+        return True
+
+    def cube(self):
+        """
+        Returns: one RollupCube over every source, merged in sorted path order
+        """
+        cube = RollupCube(self.distinct, self.hll_precision)
+        for key in sorted(self.sources):
+            cube.merge(self.sources[key][1])
+        return cube
+
+    def to_dict(self):
+        return {
+            "distinct": self.distinct,
+            "hll_precision": self.hll_precision,
+            "sources": {
+                key: {"fingerprint": fingerprint, "cube": cube.to_dict()}
+                for key, (fingerprint, cube) in self.sources.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        history = cls(data["distinct"], data["hll_precision"])
+        history.sources = {
+            key: (entry["fingerprint"], RollupCube.from_dict(entry["cube"]))
+            for key, entry in data["sources"].items()
+        }
+        return history
+
+    def save(self, filename=ROLLUP_FILE):
+        """
+        Persists the history as JSON, atomically; .gz and .xz names are compressed
+        """
+        with atomic_open(filename) as file:
+            json.dump(self.to_dict(), file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, filename=ROLLUP_FILE, distinct=None):
+        """
+        Loads a history written by save()
+        Returns an empty history in the `distinct` mode (default "exact") if
+        there is none yet. A saved history counting customers another way
+        raises ValueError, as its cubes could not be merged with new ones
+        """
+        try:
+            opener = COMPRESSORS.get(compression_for(filename), open)
+            with opener(filename, "rt", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls(distinct or "exact")
+
+        if "sources" not in data:
+            raise ValueError(f"{filename} is not a rollup history; delete it to rebuild")
+
+        history = cls.from_dict(data)
+        if distinct and distinct != history.distinct:
+            raise ValueError(
+                f"{filename} counts customers with distinct={history.distinct}; "
+                f"delete it to rebuild with distinct={distinct}"
+            )
+        return history
+
+
+def aggregate_sales(transactions, customer_capacity=None, distinct="exact"):
+    """
+    Computes every report metric in one pass over the transactions
+    Returns: SalesAggregate
+    customer_capacity switches customers to bounded-memory approximate tracking
+    distinct="hll" counts unique customers with HyperLogLog sketches
+
+    The analysis functions below accept a transaction list, a prebuilt
+    SalesAggregate, a RollupCube, or a columnar TransactionTable for large
+    inputs
     """
-    product_data = defaultdict(lambda: {"quantity": 0, "revenue": 0.0})
+    if isinstance(transactions, SalesAggregate):
+        return transactions
+    if isinstance(transactions, RollupCube):
+        return transactions.aggregate()
 
-    for tx in transactions:
-        name = tx["ProductName"]
-        qty = tx["Quantity"]
-        revenue = qty * tx["UnitPrice"]
+    aggregate = SalesAggregate(customer_capacity, distinct)
+    if isinstance(transactions, TransactionTable):
+        return columnar.aggregate_table(transactions, aggregate)
+    return aggregate.update(transactions)
+
+
+def calculate_total_revenue(transactions):
+    """
+    Calculates total revenue from all transactions
+    """
+    if isinstance(transactions, TransactionTable):
+        return columnar.calculate_total_revenue(transactions)
+
+    return aggregate_sales(transactions).calculate_total_revenue()
+
+
+def region_wise_sales(transactions):
+    """
+    Analyzes sales by region
+    """
+    if isinstance(transactions, TransactionTable):
+        return columnar.region_wise_sales(transactions)
 
-        product_data[name]["quantity"] += qty
-        product_data[name]["revenue"] += revenue
+    return aggregate_sales(transactions).region_wise_sales()
 
-    # Convert to list of tuples
-    products = [
-        (name, data["quantity"], round(data["revenue"], 2))
-        for name, data in product_data.items()
-    ]
 
-    # Sort by total quantity descending
-    products.sort(key=lambda x: x[1], reverse=True)
+def top_selling_products(transactions, n=5):
+    """
+    Finds top n products by total quantity sold
+    """
+    if isinstance(transactions, TransactionTable):
+        return columnar.top_selling_products(transactions, n)
 
-    return products[:n]
+    return aggregate_sales(transactions).top_selling_products(n)
 
 
 def customer_analysis(transactions):
     """
     Analyzes customer purchase patterns
     """
-    customer_data = defaultdict(
-        lambda: {
-            "total_spent": 0.0,
-            "purchase_count": 0,
-            "products_bought": set(),
-        }
-    )
-
-    for tx in transactions:
-        customer = tx["CustomerID"]
-        amount = tx["Quantity"] * tx["UnitPrice"]
-
-        customer_data[customer]["total_spent"] += amount
-        customer_data[customer]["purchase_count"] += 1
-        customer_data[customer]["products_bought"].add(tx["ProductName"])
-
-    # Build final output
-    result = {}
-    for customer, data in customer_data.items():
-        avg_order_value = (
-            data["total_spent"] / data["purchase_count"]
-            if data["purchase_count"]
-            else 0
-        )
+    if isinstance(transactions, TransactionTable):
+        return columnar.customer_analysis(transactions)
 
-        result[customer] = {
-            "total_spent": round(data["total_spent"], 2),
-            "purchase_count": data["purchase_count"],
-            "avg_order_value": round(avg_order_value, 2),
-            "products_bought": sorted(list(data["products_bought"])),
-        }
+    return aggregate_sales(transactions).customer_analysis()
 
-    # Sort by total_spent descending
-    result = dict(
-        sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True)
-    )
 
-    return result
+def top_customers(transactions, n=5):
+    """
+    Finds the top n customers by total spent without ranking every customer
+    """
+    if isinstance(transactions, TransactionTable):
+        return list(columnar.customer_analysis(transactions).items())[:n]
+
+    return aggregate_sales(transactions).top_customers(n)
 
 
 def daily_sales_trend(transactions):
     """
     Analyzes sales trends by date
     """
-    daily_data = defaultdict(
-        lambda: {"revenue": 0.0, "transaction_count": 0, "customers": set()}
-    )
-
-    for tx in transactions:
-        date = tx["Date"]
-        revenue = tx["Quantity"] * tx["UnitPrice"]
-
-        daily_data[date]["revenue"] += revenue
-        daily_data[date]["transaction_count"] += 1
-        daily_data[date]["customers"].add(tx["CustomerID"])
-
-    # Sort chronologically
-    sorted_dates = sorted(
-        daily_data.keys(), key=lambda d: datetime.strptime(d, "%Y-%m-%d")
-    )
-
-    result = {}
-    for date in sorted_dates:
-        data = daily_data[date]
-        result[date] = {
-            "revenue": round(data["revenue"], 2),
-            "transaction_count": data["transaction_count"],
-            "unique_customers": len(data["customers"]),
-        }
+    if isinstance(transactions, TransactionTable):
+        return columnar.daily_sales_trend(transactions)
 
-    return result
+    return aggregate_sales(transactions).daily_sales_trend()
 
 
 def find_peak_sales_day(transactions):
     """
     Identifies the date with highest revenue
     """
-    daily_trend = daily_sales_trend(transactions)
-
-    peak_date = None
-    peak_revenue = 0.0
-    peak_transactions = 0
+    if isinstance(transactions, TransactionTable):
+        return columnar.find_peak_sales_day(transactions)
 
-    for date, data in daily_trend.items():
-        if data["revenue"] > peak_revenue:
-            peak_revenue = data["revenue"]
-            peak_transactions = data["transaction_count"]
-            peak_date = date
-
-    return peak_date, peak_revenue, peak_transactions
+    return aggregate_sales(transactions).find_peak_sales_day()
 
 
 def low_performing_products(transactions, threshold=10):
     """
     Identifies products with low sales
     """
-    product_data = defaultdict(lambda: {"quantity": 0, "revenue": 0.0})
-
-    for tx in transactions:
-        name = tx["ProductName"]
-        qty = tx["Quantity"]
-        revenue = qty * tx["UnitPrice"]
-
-        product_data[name]["quantity"] += qty
-        product_data[name]["revenue"] += revenue
-
-    low_products = [
-        (name, data["quantity"], round(data["revenue"], 2))
-        for name, data in product_data.items()
-        if data["quantity"] < threshold
-    ]
-
-    # Sort by quantity ascending
-    low_products.sort(key=lambda x: x[1])
+    if isinstance(transactions, TransactionTable):
+        return columnar.low_performing_products(transactions, threshold)
 
-    return low_products
+    return aggregate_sales(transactions).low_performing_products(threshold)
@@ -1,144 +1,449 @@
-def read_sales_data(filename):
+import bz2
+import codecs
+import gzip
+import lzma
+from operator import attrgetter, itemgetter
+
+from utils.records import Transaction, day_ordinal
+
+
+ENCODINGS = ["utf-8", "latin-1", "cp1252"]
+
+# Bytes inspected to pick an encoding, and the approximate size of each
+# batch of lines pulled from disk while streaming
+SAMPLE_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of each supported compressed input format, and its opener
+MAGIC_NUMBERS = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+DECOMPRESSORS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+# Why a row was dropped: the first two while parsing, the rest by validation
+REJECT_REASONS = (
+    "field_count",
+    "number_format",
+    "missing_field",
+    "quantity",
+    "unit_price",
+    "transaction_id",
+    "product_id",
+    "customer_id",
+    "region",
+)
+
+_VALIDATION_FIELDS = (
+    "Quantity", "UnitPrice", "TransactionID", "ProductID", "CustomerID", "Region"
+)
+_record_fields = attrgetter(*_VALIDATION_FIELDS)
+_mapping_fields = itemgetter(*_VALIDATION_FIELDS)
+
+
+def detect_compression(filename):
     """
-    Reads sales data from file handling encoding issues
-    Returns: list of raw lines (strings)
+    Detects a compressed file from its magic bytes, whatever its extension
+    Returns: "gzip", "bz2", "xz" or None for a plain file
+    """
+    with open(filename, "rb") as file:
+        head = file.read(max(len(magic) for magic, _ in MAGIC_NUMBERS))
+
+    for magic, compression in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+
+    return None
+
+
+def open_sales_file(filename):
+    """
+    Opens a sales file for binary reading
+    Compressed files are decompressed on the fly as they are read
+    """
+    compression = detect_compression(filename)
+    if compression:
+        return DECOMPRESSORS[compression](filename, "rb")
+    return open(filename, "rb")
+
+
+def iter_line_blocks(file, chunk_size=CHUNK_SIZE):
+    """
+    Yields blocks of whole lines read from a binary file in large chunks
+    The final block may lack a trailing newline
+    """
+    carry = b""
+
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+
+        data = carry + data
+        cut = data.rfind(b"\n") + 1
+        carry = data[cut:]
+        if cut:
+            yield data[:cut]
+
+    if carry:
+        yield carry
+
+
+def detect_encoding(filename, sample_size=SAMPLE_SIZE):
     """
-    encodings = ["utf-8", "latin-1", "cp1252"]
-    lines = []
+    Detects the file encoding from a sample of its first bytes
+    Compressed files are sampled after decompression
+    Returns: encoding name, or None if no supported encoding fits
+    """
+    with open_sales_file(filename) as file:
+        sample = file.read(sample_size)
+        at_eof = not file.read(1)
+
+    return _pick_encoding(sample, ENCODINGS, final=at_eof)
 
+
+def _pick_encoding(data, encodings, final=True):
+    """
+    Returns the first encoding that can decode the given bytes
+    """
     for enc in encodings:
         try:
-            with open(filename, "r", encoding=enc) as file:
-                lines = file.readlines()
-            break
+            # A multi-byte character may be cut at the end of a sample
+            codecs.getincrementaldecoder(enc)().decode(data, final=final)
+            return enc
         except UnicodeDecodeError:
             continue
-        except FileNotFoundError:
-            print(f" File not found: {filename}")
-            return []
 
-    if not lines:
+    return None
+
+
+def stream_sales_data(filename, chunk_size=CHUNK_SIZE):
+    """
+    Lazily yields cleaned sales lines, reading the file in bounded chunks
+    gzip, bz2 and xz files are decompressed chunk by chunk on the way
+    Skips the header and empty lines
+    """
+    try:
+        encoding = detect_encoding(filename)
+    except FileNotFoundError:
+        print(f" File not found: {filename}")
+        return
+
+    if encoding is None:
         print(" Unable to read file with supported encodings")
-        return []
+        return
+
+    with open_sales_file(filename) as file:
+        file.readline()  # skip header
+
+        for block in iter_line_blocks(file, chunk_size):
+            text, encoding = decode_chunk(block, encoding)
+            if text is None:
+                print(" Unable to read file with supported encodings")
+                return
+
+            yield from clean_lines(text)
+
 
-    # Remove header and empty lines
-    cleaned_lines = []
-    for line in lines[1:]:  # skip header
+def decode_chunk(chunk, encoding):
+    """
+    Decodes a chunk of whole lines
+    If the bytes do not fit the encoding, falls back to the next one that does
+    Returns: (text, encoding) - text is None if no supported encoding fits
+    """
+    try:
+        return chunk.decode(encoding), encoding
+    except UnicodeDecodeError:
+        # The sample looked fine but later bytes do not; fall back
+        # to the next encoding that fits for the rest of the file
+        fallbacks = ENCODINGS[ENCODINGS.index(encoding) + 1:]
+        encoding = _pick_encoding(chunk, fallbacks)
+        if encoding is None:
+            return None, None
+        return chunk.decode(encoding), encoding
+
+
+def clean_lines(text):
+    """
+    Yields the stripped, non-empty lines of a decoded chunk
+    """
+    for line in text.split("\n"):
         line = line.strip()
         if line:
-            cleaned_lines.append(line)
+            yield line
+
 
-    return cleaned_lines
+def stream_byte_range(filename, start, end, encoding, chunk_size=CHUNK_SIZE):
+    """
+    Yields the cleaned lines stored between two byte offsets
+    Both offsets must fall on line starts (or the end of the file)
+    """
+    with open(filename, "rb") as file:
+        file.seek(start)
+        position = start
+        carry = b""
+
+        while position < end:
+            data = file.read(min(chunk_size, end - position))
+            if not data:
+                break
+            position += len(data)
+
+            data = carry + data
+            cut = data.rfind(b"\n") + 1 if position < end else len(data)
+            carry = data[cut:]
+
+            text, encoding = decode_chunk(data[:cut], encoding)
+            if text is None:
+                return
+            yield from clean_lines(text)
+
+
+def read_sales_data(filename):
+    """
+    Reads sales data from file handling encoding issues
+    Plain, gzip, bz2 and xz files are all accepted
+    Returns: list of raw lines (strings)
+    """
+    return list(stream_sales_data(filename))
 
 
 def parse_transactions(raw_lines):
     """
-    Parses raw lines into clean list of dictionaries
+    Parses raw lines into clean list of Transaction records
+    Records support tx["Field"] access like the dictionaries they replace
+    Accepts any iterable of lines, including stream_sales_data()
     """
-    transactions = []
+    return list(iter_transactions(raw_lines))
+
+
+def iter_transactions(raw_lines, rejects=None):
+    """
+    Lazily parses raw lines into compact Transaction records
+    Repeated field values (dates, products, customers, regions) share one
+    string object across rows
+    Skipped rows are counted in `rejects` (reason -> count) if given
+    """
+    shared = {}.setdefault
 
     for line in raw_lines:
         parts = line.split("|")
 
         # Skip rows with incorrect field count
         if len(parts) != 8:
+            if rejects is not None:
+                rejects["field_count"] += 1
             continue
 
+        date = parts[1].strip()
+        product_id = parts[2].strip()
+        name = parts[3].replace(",", "").strip()
+        customer = parts[6].strip()
+        region = parts[7].strip()
+
         try:
-            transaction = {
-                "TransactionID": parts[0].strip(),
-                "Date": parts[1].strip(),
-                "ProductID": parts[2].strip(),
-                "ProductName": parts[3].replace(",", "").strip(),
-                "Quantity": int(parts[4].replace(",", "").strip()),
-                "UnitPrice": float(parts[5].replace(",", "").strip()),
-                "CustomerID": parts[6].strip(),
-                "Region": parts[7].strip()
-            }
-
-            transactions.append(transaction)
+            transaction = Transaction(
+                parts[0].strip(),
+                shared(date, date),
+                shared(product_id, product_id),
+                shared(name, name),
+                int(parts[4].replace(",", "").strip()),
+                float(parts[5].replace(",", "").strip()),
+                shared(customer, customer),
+                shared(region, region),
+            )
 
         except ValueError:
             # Skip rows with conversion issues
+            if rejects is not None:
+                rejects["number_format"] += 1
             continue
 
-    return transactions
+        yield transaction
 
 
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
+def _check_fields(qty, price, transaction_id, product_id, customer_id, region):
     """
-    Validates transactions and applies optional filters
+    Returns the first validation rule the field values break, or None
     """
-    valid_transactions = []
-    invalid_count = 0
+    if qty <= 0:
+        return "quantity"
+    if price <= 0:
+        return "unit_price"
+    if not transaction_id.startswith("T"):
+        return "transaction_id"
+    if not product_id.startswith("P"):
+        return "product_id"
+    if not customer_id.startswith("C"):
+        return "customer_id"
+    if not region:
+        return "region"
+    return None
 
-    # Validation
-    for tx in transactions:
-        try:
-            if (
-                tx["Quantity"] <= 0
-                or tx["UnitPrice"] <= 0
-                or not tx["TransactionID"].startswith("T")
-                or not tx["ProductID"].startswith("P")
-                or not tx["CustomerID"].startswith("C")
-                or not tx["Region"]
-            ):
-                invalid_count += 1
-                continue
 
-            valid_transactions.append(tx)
+def reject_reason(tx):
+    """
+    Returns the reason a parsed transaction fails validation, or None if valid
+    """
+    fields = _record_fields if type(tx) is Transaction else _mapping_fields
+    try:
+        return _check_fields(*fields(tx))
+    except KeyError:
+        return "missing_field"
 
-        except KeyError:
-            invalid_count += 1
 
-    total_input = len(transactions)
+def is_valid_transaction(tx):
+    """
+    Checks a parsed transaction against the validation rules
+    """
+    return reject_reason(tx) is None
 
-    # Display available regions
-    regions = sorted(set(tx["Region"] for tx in valid_transactions))
-    print(" Available Regions:", regions)
 
-    # Display transaction amount range
-    amounts = [tx["Quantity"] * tx["UnitPrice"] for tx in valid_transactions]
-    if amounts:
-        print(f" Transaction Amount Range: {min(amounts)} - {max(amounts)}")
+def new_filter_summary():
+    """
+    Returns the empty counters scan_transactions() fills in
+    "rejects" counts dropped rows per REJECT_REASONS entry, "regions" counts
+    valid rows per region, lowest/highest_amount span the valid rows and
+    first/last_date are their earliest and latest well-formed dates
+    """
+    return {
+        "total_input": 0,
+        "invalid": 0,
+        "filtered_by_region": 0,
+        "filtered_by_amount": 0,
+        "final_count": 0,
+        "rejects": dict.fromkeys(REJECT_REASONS, 0),
+        "regions": {},
+        "lowest_amount": None,
+        "highest_amount": None,
+        "first_date": None,
+        "last_date": None,
+    }
 
-    filtered_by_region = 0
-    filtered_by_amount = 0
 
-    # Apply region filter
-    if region:
-        before = len(valid_transactions)
-        valid_transactions = [
-            tx for tx in valid_transactions if tx["Region"] == region
-        ]
-        filtered_by_region = before - len(valid_transactions)
-        print(f" Records after region filter: {len(valid_transactions)}")
-
-    # Apply amount filter
-    if min_amount is not None or max_amount is not None:
-        before = len(valid_transactions)
-        filtered = []
+def scan_transactions(
+    transactions, region=None, min_amount=None, max_amount=None, summary=None
+):
+    """
+    Validates and filters transactions in a single pass, yielding survivors
+    Nothing but the surviving rows is kept; `summary` (see new_filter_summary)
+    is updated with reject counts and amount statistics as rows stream through
+    """
+    if summary is None:
+        summary = new_filter_summary()
+
+    rejects = summary["rejects"]
+    regions = summary["regions"]
+    lowest = summary["lowest_amount"]
+    highest = summary["highest_amount"]
+    first_date = summary["first_date"]
+    last_date = summary["last_date"]
+    first_day = day_ordinal(first_date) if first_date else None
+    last_day = day_ordinal(last_date) if last_date else None
+    total = invalid = by_region = by_amount = passed = 0
 
-        for tx in valid_transactions:
-            amount = tx["Quantity"] * tx["UnitPrice"]
+    try:
+        for tx in transactions:
+            total += 1
 
-            if min_amount is not None and amount < min_amount:
+            fields = _record_fields if type(tx) is Transaction else _mapping_fields
+            try:
+                values = fields(tx)
+                reason = _check_fields(*values)
+            except KeyError:
+                reason = "missing_field"
+
+            if reason is not None:
+                rejects[reason] += 1
+                invalid += 1
                 continue
-            if max_amount is not None and amount > max_amount:
+
+            tx_region = values[5]
+            amount = values[0] * values[1]
+
+            regions[tx_region] = regions.get(tx_region, 0) + 1
+            if lowest is None or amount < lowest:
+                lowest = amount
+            if highest is None or amount > highest:
+                highest = amount
+
+            if type(tx) is Transaction:
+                day = tx.day
+            else:
+                day = day_ordinal(tx.get("Date"))
+            if day is not None:
+                if first_day is None or day < first_day:
+                    first_day, first_date = day, tx["Date"]
+                if last_day is None or day > last_day:
+                    last_day, last_date = day, tx["Date"]
+
+            if region and tx_region != region:
+                by_region += 1
+                continue
+            if (min_amount is not None and amount < min_amount) or (
+                max_amount is not None and amount > max_amount
+            ):
+                by_amount += 1
                 continue
 
-            filtered.append(tx)
+            passed += 1
+            yield tx
 
-        valid_transactions = filtered
-        filtered_by_amount = before - len(valid_transactions)
-        print(f" Records after amount filter: {len(valid_transactions)}")
+    finally:
+        summary["total_input"] += total
+        summary["invalid"] += invalid
+        summary["filtered_by_region"] += by_region
+        summary["filtered_by_amount"] += by_amount
+        summary["final_count"] += passed
+        summary["lowest_amount"] = lowest
+        summary["highest_amount"] = highest
+        summary["first_date"] = first_date
+        summary["last_date"] = last_date
 
-    filter_summary = {
-        "total_input": total_input,
-        "invalid": invalid_count,
-        "filtered_by_region": filtered_by_region,
-        "filtered_by_amount": filtered_by_amount,
-        "final_count": len(valid_transactions),
-    }
 
-    return valid_transactions, invalid_count, filter_summary
+def load_valid_transactions(
+    filename, region=None, min_amount=None, max_amount=None, summary=None
+):
+    """
+    Reads, parses, validates and filters a sales file in one streaming pass
+    Only the surviving rows are materialized; rows dropped while parsing are
+    counted in summary["rejects"] but not in "total_input" or "invalid"
+    Returns: list of Transaction records
+    """
+    if summary is None:
+        summary = new_filter_summary()
+
+    transactions = iter_transactions(stream_sales_data(filename), summary["rejects"])
+    return list(scan_transactions(transactions, region, min_amount, max_amount, summary))
+
+
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
+    """
+    Validates transactions and applies optional filters
+    """
+    summary = new_filter_summary()
+    valid_transactions = list(
+        scan_transactions(transactions, region, min_amount, max_amount, summary)
+    )
+
+    # Display available regions
+    print(" Available Regions:", sorted(summary["regions"]))
+
+    # Display transaction amount range
+    lowest, highest = summary["lowest_amount"], summary["highest_amount"]
+    if lowest is not None:
+        print(f" Transaction Amount Range: {lowest} - {highest}")
+
+    if region:
+        valid_count = summary["total_input"] - summary["invalid"]
+        print(f" Records after region filter: {valid_count - summary['filtered_by_region']}")
+
+    if min_amount is not None or max_amount is not None:
+        print(f" Records after amount filter: {len(valid_transactions)}")
+
+    return valid_transactions, summary["invalid"], summary
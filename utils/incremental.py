@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+
+from utils.data_processor import SalesAggregate
+from utils.file_handler import (
+    detect_compression,
+    detect_encoding,
+    iter_transactions,
+    new_filter_summary,
+    scan_transactions,
+    stream_byte_range,
+)
+from utils.output import OUTPUT_DIR, atomic_open
+
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "sales_checkpoint.json")
+
+# Bytes hashed at the start and at the end of the processed prefix
+FINGERPRINT_WINDOW = 64 * 1024
+
+
+def file_fingerprint(filename, offset):
+    """
+    Fingerprints the first `offset` bytes of a file
+    Hashes a window at the start and one just before the offset, so the
+    cost does not grow with the size of the history
+    """
+    digest = hashlib.sha256(str(offset).encode())
+
+    with open(filename, "rb") as file:
+        digest.update(file.read(min(FINGERPRINT_WINDOW, offset)))
+
+        tail = max(0, offset - FINGERPRINT_WINDOW)
+        file.seek(tail)
+        digest.update(file.read(offset - tail))
+
+    return digest.hexdigest()
+
+
+def _last_line_end(filename, size):
+    """
+    Returns the offset just past the last newline in the file
+    A trailing line still being written is left for the next run
+    """
+    with open(filename, "rb") as file:
+        position = size
+
+        while position > 0:
+            start = max(0, position - FINGERPRINT_WINDOW)
+            file.seek(start)
+            block = file.read(position - start)
+
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            position = start
+
+    return 0
+
+
+def _header_end(filename):
+    with open(filename, "rb") as file:
+        file.readline()
+        return file.tell()
+
+
+def load_checkpoint(checkpoint_file=CHECKPOINT_FILE):
+    """
+    Loads a saved checkpoint
+    Returns: checkpoint dict, or None if missing or unreadable
+    """
+    try:
+        with open(checkpoint_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f" Ignoring unreadable checkpoint: {e}")
+        return None
+
+
+def save_checkpoint(state, checkpoint_file=CHECKPOINT_FILE):
+    """
+    Persists the state returned by incremental_update()
+    Written to a temporary file first so a crash never leaves a torn checkpoint
+    """
+    checkpoint = {
+        "source": os.path.abspath(state["source"]),
+        "offset": state["offset"],
+        "fingerprint": file_fingerprint(state["source"], state["offset"]),
+        "encoding": state["encoding"],
+        "invalid": state["invalid"],
+        "aggregate": state["aggregate"].to_dict(),
+        "extra": state["extra"],
+    }
+
+    with atomic_open(checkpoint_file) as file:
+        json.dump(checkpoint, file)
+
+
+def _resume_offset(filename, checkpoint, size):
+    """
+    Returns the checkpoint offset if the file still starts with the data it covers
+    """
+    if not checkpoint:
+        return None
+    if checkpoint.get("source") != os.path.abspath(filename):
+        return None
+
+    offset = checkpoint.get("offset", 0)
+    if offset > size:
+        return None
+    if file_fingerprint(filename, offset) != checkpoint.get("fingerprint"):
+        return None
+
+    return offset
+
+
+def incremental_update(
+    filename, checkpoint_file=CHECKPOINT_FILE, customer_capacity=None, distinct="exact"
+):
+    """
+    Folds only the lines appended since the last checkpoint into the saved state
+    Falls back to a full rebuild if the already-processed prefix changed, or
+    if the checkpoint tracks customers with another `customer_capacity` or
+    `distinct` mode (see SalesAggregate)
+
+    Returns: state dict with the updated "aggregate", the validated
+    "new_transactions", the running "invalid" count and an "extra" dict
+    callers may use for their own running totals. Pass it to
+    save_checkpoint() once the run has succeeded.
+    """
+    if detect_compression(filename):
+        raise ValueError("Incremental mode needs an uncompressed, append-only file")
+
+    size = os.path.getsize(filename)
+    checkpoint = load_checkpoint(checkpoint_file)
+    offset = _resume_offset(filename, checkpoint, size)
+
+    if offset is not None:
+        saved = checkpoint["aggregate"]
+        if (saved.get("customer_capacity"), saved.get("distinct", "exact")) != (
+            customer_capacity,
+            distinct,
+        ):
+            print(" Customer tracking options changed since last checkpoint, rebuilding")
+            offset = checkpoint = None
+
+    if offset is None:
+        if checkpoint:
+            print(" Sales file changed since last checkpoint, rebuilding")
+        encoding = detect_encoding(filename)
+        if encoding is None:
+            raise ValueError("Unable to read file with supported encodings")
+
+        offset = _header_end(filename)
+        aggregate = SalesAggregate(customer_capacity, distinct)
+        invalid = 0
+        extra = {}
+    else:
+        encoding = checkpoint["encoding"]
+        aggregate = SalesAggregate.from_dict(checkpoint["aggregate"])
+        invalid = checkpoint["invalid"]
+        extra = checkpoint.get("extra", {})
+
+    end = max(offset, _last_line_end(filename, size))
+
+    summary = new_filter_summary()
+    lines = stream_byte_range(filename, offset, end, encoding)
+    new_transactions = list(scan_transactions(iter_transactions(lines), summary=summary))
+    invalid += summary["invalid"]
+
+    aggregate.update(new_transactions)
+
+    return {
+        "source": filename,
+        "offset": end,
+        "encoding": encoding,
+        "invalid": invalid,
+        "aggregate": aggregate,
+        "new_transactions": new_transactions,
+        "extra": extra,
+    }
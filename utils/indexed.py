@@ -0,0 +1,206 @@
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+from utils.data_processor import SalesAggregate
+from utils.records import Transaction, day_ordinal, parse_day
+
+# Query keyword -> transaction field for the equality indexes
+INDEXED_FIELDS = {
+    "region": "Region",
+    "date": "Date",
+    "customer": "CustomerID",
+    "product": "ProductName",
+}
+
+
+def _amount(tx):
+    return tx["Quantity"] * tx["UnitPrice"]
+
+
+def _day(tx):
+    return tx.day if type(tx) is Transaction else day_ordinal(tx["Date"])
+
+
+def _within(value, low, high):
+    if value is None:
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+class IndexedDataset:
+    """
+    Validated transactions with secondary indexes for repeated slicing
+    Equality indexes on region, date, customer and product map each value to
+    the ascending row positions holding it; sorted amount and day-ordinal
+    indexes answer amount and date ranges with bisect. Each index is built
+    once, on first use, so a query costs time proportional to its most
+    selective predicate
+    """
+
+    def __init__(self, transactions):
+        self.transactions = list(transactions)
+        self._indexes = {}
+        # range name -> (sorted keys, row positions in the same order)
+        self._ranges = {}
+        self._aggregates = {}
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def index(self, name):
+        """
+        Returns: {value: [row positions]} for one of INDEXED_FIELDS
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            field = INDEXED_FIELDS[name]
+            index = {}
+            for position, tx in enumerate(self.transactions):
+                value = tx[field]
+                rows = index.get(value)
+                if rows is None:
+                    index[value] = [position]
+                else:
+                    rows.append(position)
+            self._indexes[name] = index
+        return index
+
+    def values(self, name):
+        """
+        Returns the sorted distinct values of an indexed field
+        """
+        return sorted(self.index(name))
+
+    def _range_index(self, name):
+        """
+        Returns: (sorted keys, row positions) for "amount" or "day"
+        Rows with a malformed date are left out of the day index
+        """
+        index = self._ranges.get(name)
+        if index is None:
+            key = _amount if name == "amount" else _day
+            pairs = sorted(
+                (
+                    (value, position)
+                    for position, value in enumerate(map(key, self.transactions))
+                    if value is not None
+                ),
+                key=itemgetter(0),
+            )
+            index = self._ranges[name] = (
+                [value for value, _ in pairs],
+                [position for _, position in pairs],
+            )
+        return index
+
+    def amount_range(self):
+        """
+        Returns: (lowest, highest) transaction amount, or (None, None) if empty
+        """
+        amounts, _ = self._range_index("amount")
+        if not amounts:
+            return None, None
+        return amounts[0], amounts[-1]
+
+    def _range_positions(self, name, low, high):
+        keys, rows = self._range_index(name)
+        start = 0 if low is None else bisect_left(keys, low)
+        end = len(keys) if high is None else bisect_right(keys, high)
+        return rows[start:end]
+
+    def positions(
+        self,
+        region=None,
+        min_amount=None,
+        max_amount=None,
+        date=None,
+        customer=None,
+        product=None,
+        start_date=None,
+        end_date=None,
+    ):
+        """
+        Returns: ascending row positions matching every given filter
+        Amount bounds are inclusive, as in validate_and_filter(), and so is
+        the YYYY-MM-DD start_date / end_date range
+        """
+        equal = {
+            name: value
+            for name, value in (
+                ("region", region),
+                ("date", date),
+                ("customer", customer),
+                ("product", product),
+            )
+            if value
+        }
+        # range name -> (low, high) for the bounded ranges
+        ranges = {}
+        if min_amount is not None or max_amount is not None:
+            ranges["amount"] = (min_amount, max_amount)
+        if start_date or end_date:
+            ranges["day"] = (
+                parse_day(start_date) if start_date else None,
+                parse_day(end_date) if end_date else None,
+            )
+
+        if not equal and not ranges:
+            return list(range(len(self.transactions)))
+
+        # Start from the smallest candidate list and check the rest per row
+        candidates = [
+            (self.index(name).get(value, []), name) for name, value in equal.items()
+        ]
+        candidates += [
+            (self._range_positions(name, low, high), name)
+            for name, (low, high) in ranges.items()
+        ]
+
+        rows, chosen = min(candidates, key=lambda item: len(item[0]))
+        if chosen in ranges:
+            rows = sorted(rows)
+
+        checks = [
+            (INDEXED_FIELDS[name], value)
+            for name, value in equal.items()
+            if name != chosen
+        ]
+        range_checks = [
+            (_amount if name == "amount" else _day, low, high)
+            for name, (low, high) in ranges.items()
+            if name != chosen
+        ]
+        if not checks and not range_checks:
+            return list(rows)
+
+        transactions = self.transactions
+        result = []
+        for position in rows:
+            tx = transactions[position]
+            if any(tx[field] != value for field, value in checks):
+                continue
+            if any(not _within(key(tx), low, high) for key, low, high in range_checks):
+                continue
+            result.append(position)
+
+        return result
+
+    def query(self, **filters):
+        """
+        Returns the matching transactions in their original order
+        Accepts the keyword filters of positions()
+        """
+        transactions = self.transactions
+        return [transactions[position] for position in self.positions(**filters)]
+
+    def aggregate(self, **filters):
+        """
+        Returns: SalesAggregate over the matching transactions
+        Results are cached per filter combination, so re-running a slice is free
+        """
+        key = tuple(sorted((name, value) for name, value in filters.items() if value is not None))
+        aggregate = self._aggregates.get(key)
+        if aggregate is None:
+            aggregate = SalesAggregate().update(self.query(**filters))
+            self._aggregates[key] = aggregate
+        return aggregate
@@ -0,0 +1,210 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.output import OUTPUT_DIR, atomic_open
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+METRICS_DIR = os.path.join(OUTPUT_DIR, "metrics")
+
+# Overwritten by every run, so a Prometheus textfile collector scraping it
+# sees one fixed set of series
+PROMETHEUS_FILE = "sales_pipeline.prom"
+
+# Per-run JSON files kept in the metrics directory; older ones are deleted
+KEEP_RUNS = 100
+
+# Callables run with every finished stage record, for every run
+_hooks = []
+
+
+def register_hook(hook):
+    """
+    Registers a callable run with each stage record as stages finish
+    Hooks see every RunMetrics created afterwards, including main.main()'s
+    """
+    _hooks.append(hook)
+    return hook
+
+
+def unregister_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def peak_rss_bytes():
+    """
+    Returns the peak resident set size of this process, or None if unknown
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RunMetrics:
+    """
+    Collects wall time, CPU time, memory and throughput for each pipeline stage
+    """
+
+    def __init__(self, run_id=None, trace_memory=False, hooks=()):
+        self.run_id = run_id or (
+            f'{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}_{os.getpid()}'
+        )
+        self.started = time.time()
+        self.trace_memory = trace_memory
+        self.hooks = list(hooks)
+        self.stages = []
+        self.status = "running"
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Measures the enclosed block as one stage
+        Set record["rows"] inside the block to report throughput
+        A failing stage is recorded with its error and the exception re-raised
+        """
+        record = {"stage": name, "rows": rows, "status": "ok"}
+
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+            self.status = "failed"
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            record["wall_s"] = round(wall, 6)
+            record["cpu_s"] = round(time.process_time() - cpu_start, 6)
+            record["peak_rss_bytes"] = peak_rss_bytes()
+
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["traced_delta_bytes"] = current - memory_before
+                record["traced_peak_bytes"] = peak - memory_before
+            if tracing:
+                tracemalloc.stop()
+
+            rows = record["rows"]
+            record["rows_per_s"] = round(rows / wall, 1) if rows and wall else None
+
+            self.stages.append(record)
+            for hook in self.hooks + _hooks:
+                try:
+                    hook(record)
+                except Exception as e:
+                    print(f" Metrics hook failed: {e}")
+
+    def finish(self, status="ok"):
+        if self.status == "running":
+            self.status = status
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "status": self.status,
+            "wall_s": round(sum(s["wall_s"] for s in self.stages), 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": self.stages,
+        }
+
+    def to_prometheus(self, prefix="sales_pipeline"):
+        """
+        Renders the run in the Prometheus text exposition format
+        """
+        gauges = [
+            ("stage_wall_seconds", "wall_s", "Wall-clock time per stage"),
+            ("stage_cpu_seconds", "cpu_s", "CPU time per stage"),
+            ("stage_rows", "rows", "Rows handled per stage"),
+            ("stage_rows_per_second", "rows_per_s", "Stage throughput"),
+            ("stage_peak_rss_bytes", "peak_rss_bytes", "Process peak RSS after stage"),
+            ("stage_traced_delta_bytes", "traced_delta_bytes", "Traced memory change"),
+            ("stage_traced_peak_bytes", "traced_peak_bytes", "Traced peak over stage start"),
+        ]
+
+        lines = []
+        for metric, key, help_text in gauges:
+            samples = [s for s in self.stages if s.get(key) is not None]
+            if not samples:
+                continue
+
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for s in samples:
+                labels = f'stage="{s["stage"]}",status="{s["status"]}"'
+                lines.append(f"{prefix}_{metric}{{{labels}}} {s[key]}")
+
+        lines.append(f"# HELP {prefix}_run_success Whether the last run completed")
+        lines.append(f"# TYPE {prefix}_run_success gauge")
+        lines.append(f"{prefix}_run_success {int(self.status == 'ok')}")
+        lines.append(f"# HELP {prefix}_run_started_seconds Start time of the last run")
+        lines.append(f"# TYPE {prefix}_run_started_seconds gauge")
+        lines.append(f"{prefix}_run_started_seconds {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, metrics_dir=METRICS_DIR, keep=KEEP_RUNS):
+        """
+        Writes run_<id>.json and rewrites PROMETHEUS_FILE in metrics_dir,
+        both atomically, then deletes all but the `keep` newest run files
+        The Prometheus file only ever holds the last run, without a run id
+        label, so its series do not grow with every run
+        Returns: (json_path, prometheus_path)
+        """
+        json_path = os.path.join(metrics_dir, f"run_{self.run_id}.json")
+        prom_path = os.path.join(metrics_dir, PROMETHEUS_FILE)
+
+        with atomic_open(json_path) as file:
+            json.dump(self.to_dict(), file, indent=2)
+        with atomic_open(prom_path) as file:
+            file.write(self.to_prometheus())
+
+        prune_runs(metrics_dir, keep)
+        return json_path, prom_path
+
+
+def prune_runs(metrics_dir=METRICS_DIR, keep=KEEP_RUNS):
+    """
+    Deletes all but the `keep` newest run_<id>.json files, and the
+    run_<id>.prom files earlier versions wrote for every run
+    Run ids start with their timestamp, so name order is run order
+    Returns: number of files deleted
+    """
+    try:
+        names = os.listdir(metrics_dir)
+    except FileNotFoundError:
+        return 0
+
+    runs = sorted(n for n in names if n.startswith("run_") and n.endswith(".json"))
+    stale = runs[:-keep] if keep else runs
+    stale += [n for n in names if n.startswith("run_") and n.endswith(".prom")]
+
+    deleted = 0
+    for name in stale:
+        try:
+            os.remove(os.path.join(metrics_dir, name))
+            deleted += 1
+        except OSError:
+            pass
+    return deleted
@@ -0,0 +1,139 @@
+import gzip
+import lzma
+import os
+import tempfile
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+
+REPORT_FILE = os.path.join(OUTPUT_DIR, "sales_report.txt")
+
+# Rows serialized per write() call
+BATCH_SIZE = 10000
+
+# Compression name -> opener; also picked from the file extension
+COMPRESSORS = {
+    "gzip": gzip.open,
+    "xz": lzma.open,
+}
+EXTENSIONS = {".gz": "gzip", ".xz": "xz"}
+
+# Read once: the process umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def compression_for(path, compression=None):
+    """
+    Returns the compression to use for a path
+    An explicit `compression` wins; otherwise .gz and .xz select gzip and xz
+    """
+    if compression is None:
+        return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return compression
+
+
+@contextmanager
+def atomic_open(path, mode="w", compression=None, encoding="utf-8"):
+    """
+    Opens a temporary file next to `path` and renames it over `path` on success
+    Readers never see a partially written file; on error the temporary file
+    is removed and any existing file is left as it was. Each call gets its
+    own temporary name, so concurrent writers never share one
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    os.close(fd)
+    # mkstemp creates the file owner-only; give it the usual permissions
+    os.chmod(temp_path, 0o666 & ~_UMASK)
+    compression = compression_for(path, compression)
+    binary = "b" in mode
+
+    try:
+        if compression:
+            opener = COMPRESSORS[compression]
+            file = opener(temp_path, mode if binary else "wt", encoding=None if binary else encoding)
+        else:
+            file = open(temp_path, mode, encoding=None if binary else encoding)
+
+        with file:
+            yield file
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    os.replace(temp_path, path)
+
+
+def write_text(path, text, compression=None):
+    """
+    Writes a whole text document in one call, atomically
+    """
+    with atomic_open(path, compression=compression) as file:
+        file.write(text)
+
+
+def write_lines(path, lines, compression=None, batch_size=BATCH_SIZE):
+    """
+    Writes an iterable of lines (without newlines) atomically
+    Lines are joined into batches, so each write() carries many rows
+    Returns: number of lines written
+    """
+    with atomic_open(path, compression=compression) as file:
+        return _write_batches(file, lines, batch_size)
+
+
+def append_lines(path, lines, header=None, size=None, batch_size=BATCH_SIZE):
+    """
+    Appends lines (without newlines) to a text file, keeping what it holds
+    `size` is the length returned by the previous call: anything written
+    after it (by a run that failed before recording it) is truncated first.
+    With no `size`, or a file shorter than it, the file is started over
+    with `header`. A .gz or .xz file gets one compressed member per call
+    Returns: size of the file afterwards
+    """
+    current = os.path.getsize(path) if os.path.exists(path) else None
+
+    if size is None or current is None or current < size:
+        with atomic_open(path) as file:
+            if header is not None:
+                file.write(header + "\n")
+    elif current > size:
+        os.truncate(path, size)
+
+    compression = compression_for(path)
+    opener = COMPRESSORS[compression] if compression else open
+    with opener(path, "at", encoding="utf-8") as file:
+        _write_batches(file, lines, batch_size)
+
+    return os.path.getsize(path)
+
+
+def _write_batches(file, lines, batch_size):
+    count = 0
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            file.write("\n".join(batch) + "\n")
+            count += len(batch)
+            batch.clear()
+
+    if batch:
+        file.write("\n".join(batch) + "\n")
+        count += len(batch)
+
+    return count
@@ -0,0 +1,340 @@
+import fnmatch
+import glob
+import itertools
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.data_processor import SalesAggregate
+from utils.file_handler import (
+    detect_compression,
+    detect_encoding,
+    iter_transactions,
+    new_filter_summary,
+    scan_transactions,
+    stream_byte_range,
+    stream_sales_data,
+)
+from utils.snapshot import load_transactions
+
+# Never sales input when found through a directory or glob: the enriched
+# copies the pipeline writes into data/, and leftovers of interrupted
+# atomic writes
+SKIPPED_INPUTS = ("enriched_sales_data.*", "*.tmp")
+
+
+def _is_input(path):
+    name = os.path.basename(path)
+    if name.startswith("."):
+        return False
+    if any(fnmatch.fnmatch(name, pattern) for pattern in SKIPPED_INPUTS):
+        return False
+    return os.path.isfile(path)
+
+
+def expand_inputs(source):
+    """
+    Resolves a file, a directory or a glob pattern (or a list of them) to
+    the sales files it names; directories and globs skip hidden files and
+    those matching SKIPPED_INPUTS, while a file named outright is kept
+    Returns: sorted, de-duplicated paths, so the order inputs are given in
+    never changes the results
+    """
+    items = [source] if isinstance(source, str) else list(source)
+    files = set()
+
+    for item in items:
+        if os.path.isdir(item):
+            matches = [os.path.join(item, name) for name in os.listdir(item)]
+        elif any(char in item for char in "*?["):
+            matches = glob.glob(item)
+        else:
+            # Kept even if missing, so the loader reports it
+            files.add(os.path.normpath(item))
+            continue
+
+        files.update(os.path.normpath(path) for path in matches if _is_input(path))
+
+    return sorted(files)
+
+
+def _load_file(filename):
+    """
+    Loads one file quietly in a worker
+    Returns: (transactions, parse reject counts)
+    """
+    rejects = {}
+    return load_transactions(filename, quiet=True, rejects=rejects), rejects
+
+
+def load_sales_files(source, workers=None, rejects=None):
+    """
+    Parses every file named by `source` (see expand_inputs) into one dataset
+    Files are parsed concurrently in a process pool, each with its own header
+    and snapshot cache entry, and concatenated in sorted path order
+    Rows dropped while parsing are counted in `rejects` (reason -> count)
+    Returns: list of Transaction records
+    """
+    parts = load_sales_parts(source, workers, rejects)
+    if len(parts) == 1:
+        return parts[0][1]
+    return list(itertools.chain.from_iterable(part for _, part in parts))
+
+
+def load_sales_parts(source, workers=None, rejects=None):
+    """
+    Like load_sales_files(), but keeps each file's rows apart
+    Returns: list of (filename, transactions) in sorted path order
+    """
+    files = expand_inputs(source)
+    if not files:
+        print(f" No sales files match: {source}")
+        return []
+
+    if len(files) == 1:
+        return [(files[0], load_transactions(files[0], rejects=rejects))]
+
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    if workers == 1:
+        results = list(map(_load_file, files))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_load_file, files))
+
+    if rejects is not None:
+        for _, file_rejects in results:
+            for reason, count in file_rejects.items():
+                rejects[reason] = rejects.get(reason, 0) + count
+
+    print(f" Loaded {len(files)} files")
+    return [(filename, part) for filename, (part, _) in zip(files, results)]
+
+
+def split_file(filename, shards):
+    """
+    Splits the data rows of a file into byte ranges aligned to line starts
+    Returns: list of (start, end) offsets, header excluded
+    """
+    size = os.path.getsize(filename)
+
+    with open(filename, "rb") as file:
+        file.readline()  # skip header
+        first = file.tell()
+        bounds = [first]
+
+        for i in range(1, shards):
+            target = first + (size - first) * i // shards
+            if target <= bounds[-1]:
+                continue
+
+            # Move to the start of the line containing the target byte
+            # (or the target itself if it already starts a line)
+            file.seek(target - 1)
+            file.readline()
+            position = file.tell()
+
+            if bounds[-1] < position < size:
+                bounds.append(position)
+
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _compact_partial(aggregate):
+    """
+    Shrinks a shard's SalesAggregate for the trip back to the parent
+    Each customer and product name is sent once: per-customer product sets
+    become bitmasks over the product order, and exact customer sets per day
+    and region become arrays of indexes into the returned name list
+    Returns: (aggregate, customer names); see _expand_partial()
+    """
+    products = {name: index for index, name in enumerate(aggregate.products)}
+    customers = {name: index for index, name in enumerate(aggregate.customers)}
+
+    def codes(seen):
+        if not isinstance(seen, set):
+            return seen  # HyperLogLog sketches are already fixed-size
+        return array(
+            "i", [customers.setdefault(name, len(customers)) for name in seen]
+        )
+
+    for data in aggregate.customers.values():
+        mask = 0
+        for name in data[2]:
+            mask |= 1 << products[name]
+        data[2] = mask
+    for data in aggregate.daily.values():
+        data[2] = codes(data[2])
+    for region, seen in aggregate.region_customers.items():
+        aggregate.region_customers[region] = codes(seen)
+
+    return aggregate, list(customers)
+
+
+def _expand_partial(aggregate, customers):
+    """
+    Restores the sets a partial from _compact_partial() was sent without
+    """
+    products = list(aggregate.products)
+
+    def names(seen):
+        if not isinstance(seen, array):
+            return seen
+        return {customers[index] for index in seen}
+
+    for data in aggregate.customers.values():
+        mask = data[2]
+        data[2] = {
+            products[index] for index in range(mask.bit_length()) if mask >> index & 1
+        }
+    for data in aggregate.daily.values():
+        data[2] = names(data[2])
+    for region, seen in aggregate.region_customers.items():
+        aggregate.region_customers[region] = names(seen)
+
+    return aggregate
+
+
+def aggregate_shard(task):
+    """
+    Parses, validates and aggregates one shard of the file
+    A shard without offsets covers the whole file
+    Returns: compact partial SalesAggregate for the shard (see
+    _compact_partial) plus its invalid row count
+    """
+    (
+        filename,
+        start,
+        end,
+        encoding,
+        region,
+        min_amount,
+        max_amount,
+        distinct,
+        customer_capacity,
+    ) = task
+
+    summary = new_filter_summary()
+    if start is None:
+        lines = stream_sales_data(filename)
+    else:
+        lines = stream_byte_range(filename, start, end, encoding)
+    accepted = scan_transactions(
+        iter_transactions(lines), region, min_amount, max_amount, summary
+    )
+
+    aggregate = SalesAggregate(customer_capacity, distinct).update(accepted)
+    return _compact_partial(aggregate), summary["invalid"]
+
+
+def aggregate_chunk(task):
+    """
+    Aggregates one chunk of already validated rows in a worker
+    Returns: compact partial SalesAggregate (see _compact_partial)
+    """
+    transactions, distinct, customer_capacity = task
+    aggregate = SalesAggregate(customer_capacity, distinct).update(transactions)
+    return _compact_partial(aggregate)
+
+
+def aggregate_rows(transactions, workers=None, distinct="exact", customer_capacity=None):
+    """
+    Aggregates rows that are already loaded across a process pool
+    The rows are split into one contiguous chunk per worker and the partials
+    are merged in chunk order, so the result matches aggregate_sales() on
+    the whole list; nothing is read or parsed again
+    Returns: SalesAggregate
+    """
+    workers = min(workers or os.cpu_count() or 1, len(transactions))
+    if workers <= 1:
+        return SalesAggregate(customer_capacity, distinct).update(transactions)
+
+    size = math.ceil(len(transactions) / workers)
+    tasks = [
+        (transactions[start:start + size], distinct, customer_capacity)
+        for start in range(0, len(transactions), size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        partials = list(executor.map(aggregate_chunk, tasks))
+
+    aggregate = SalesAggregate(customer_capacity, distinct)
+    for partial in partials:
+        aggregate.merge(_expand_partial(*partial))
+    return aggregate
+
+
+def parallel_aggregate(
+    source,
+    workers=None,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    distinct="exact",
+    customer_capacity=None,
+):
+    """
+    Parses and aggregates sales files across a process pool
+    `source` is a file, directory or glob (see expand_inputs). Large files
+    are split into shards in proportion to their size; each shard returns a
+    compact partial SalesAggregate, and partials are merged in file and
+    shard order, so first-seen order (and with it ranking ties) matches a
+    single pass over the rows
+    distinct="hll" counts unique customers with mergeable HyperLogLog sketches
+    Returns: (SalesAggregate, invalid_count)
+    """
+    workers = workers or os.cpu_count() or 1
+
+    # filename -> encoding for the readable files
+    encodings = {}
+    for filename in expand_inputs(source):
+        try:
+            encoding = detect_encoding(filename)
+        except FileNotFoundError:
+            print(f" File not found: {filename}")
+            continue
+
+        if encoding is None:
+            print(" Unable to read file with supported encodings")
+            continue
+        encodings[filename] = encoding
+
+    total_size = sum(os.path.getsize(filename) for filename in encodings) or 1
+
+    tasks = []
+    for filename, encoding in encodings.items():
+        # A compressed stream cannot be entered at a byte offset, so it is one shard
+        if detect_compression(filename):
+            shards = [(None, None)]
+        else:
+            count = math.ceil(workers * os.path.getsize(filename) / total_size)
+            shards = split_file(filename, max(1, count))
+
+        tasks += [
+            (
+                filename,
+                start,
+                end,
+                encoding,
+                region,
+                min_amount,
+                max_amount,
+                distinct,
+                customer_capacity,
+            )
+            for start, end in shards
+        ]
+
+    if workers == 1 or len(tasks) <= 1:
+        results = map(aggregate_shard, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(aggregate_shard, tasks))
+
+    aggregate = SalesAggregate(customer_capacity, distinct)
+    invalid = 0
+    for partial, shard_invalid in results:
+        aggregate.merge(_expand_partial(*partial))
+        invalid += shard_invalid
+
+    return aggregate, invalid
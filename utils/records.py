@@ -0,0 +1,149 @@
+from datetime import datetime
+from functools import lru_cache
+
+TRANSACTION_FIELDS = (
+    "TransactionID",
+    "Date",
+    "ProductID",
+    "ProductName",
+    "Quantity",
+    "UnitPrice",
+    "CustomerID",
+    "Region",
+)
+
+ENRICHMENT_FIELDS = ("API_Category", "API_Brand", "API_Rating", "API_Match")
+
+_KEYS = frozenset(TRANSACTION_FIELDS + ENRICHMENT_FIELDS)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_day(date):
+    """
+    Returns the integer day ordinal of a YYYY-MM-DD date string
+    Memoized per distinct string, so each date is parsed once
+    Raises ValueError for a malformed date
+    """
+    return datetime.strptime(date, DATE_FORMAT).toordinal()
+
+
+def day_ordinal(date):
+    """
+    Like parse_day(), but returns None for a malformed date
+    """
+    try:
+        return parse_day(date)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProductEnrichment:
+    """
+    API product details shared by every transaction of the same product
+    """
+
+    __slots__ = ENRICHMENT_FIELDS
+
+    def __init__(self, category=None, brand=None, rating=None, match=False):
+        self.API_Category = category
+        self.API_Brand = brand
+        self.API_Rating = rating
+        self.API_Match = match
+
+    def __repr__(self):
+        return (
+            f"ProductEnrichment({self.API_Category!r}, {self.API_Brand!r}, "
+            f"{self.API_Rating!r}, {self.API_Match!r})"
+        )
+
+
+# Shared by every transaction whose product is not in the API catalog
+NO_MATCH = ProductEnrichment()
+
+
+def _enrichment_field(name):
+    def getter(self):
+        if self.enrichment is None:
+            return False if name == "API_Match" else None
+        return getattr(self.enrichment, name)
+
+    return property(getter)
+
+
+class Transaction:
+    """
+    Compact parsed transaction record
+    Fields are slots named like the dictionary keys, and tx["Field"] / tx.get()
+    keep working, so code written for dictionaries accepts records unchanged.
+    Enrichment is a reference to a shared ProductEnrichment, not a copy
+    `day` is the integer day ordinal of Date (None if Date is malformed)
+    """
+
+    __slots__ = TRANSACTION_FIELDS + ("enrichment", "day")
+
+    def __init__(
+        self,
+        TransactionID,
+        Date,
+        ProductID,
+        ProductName,
+        Quantity,
+        UnitPrice,
+        CustomerID,
+        Region,
+        enrichment=None,
+    ):
+        self.TransactionID = TransactionID
+        self.Date = Date
+        self.ProductID = ProductID
+        self.ProductName = ProductName
+        self.Quantity = Quantity
+        self.UnitPrice = UnitPrice
+        self.CustomerID = CustomerID
+        self.Region = Region
+        self.enrichment = enrichment
+        self.day = day_ordinal(Date)
+
+    def __reduce__(self):
+        # Pickle as constructor arguments: smaller and faster than slot state
+        # when records are shipped back from worker processes
+        return (
+            Transaction,
+            tuple(getattr(self, field) for field in TRANSACTION_FIELDS)
+            + (self.enrichment,),
+        )
+
+    API_Category = _enrichment_field("API_Category")
+    API_Brand = _enrichment_field("API_Brand")
+    API_Rating = _enrichment_field("API_Rating")
+    API_Match = _enrichment_field("API_Match")
+
+    def keys(self):
+        if self.enrichment is None:
+            return TRANSACTION_FIELDS
+        return TRANSACTION_FIELDS + ENRICHMENT_FIELDS
+
+    def __getitem__(self, key):
+        if key not in _KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """
+        Converts the record to the dictionary form
+        """
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __repr__(self):
+        return f"Transaction({self.to_dict()!r})"
@@ -0,0 +1,324 @@
+import hashlib
+import heapq
+import math
+
+try:
+    import numpy as np
+except ImportError:  # HyperLogLog falls back to pure-Python register loops
+    np = None
+
+
+def top_k(items, k, key):
+    """
+    Exact top-k with a bounded heap instead of a full sort
+    Same result (and tie order) as sorted(items, key=key, reverse=True)[:k]
+    """
+    return heapq.nlargest(k, items, key=key)
+
+
+def _hash_indexes(key, depth, width):
+    """
+    Returns `depth` table positions for a key
+    Uses blake2b rather than hash() so positions agree across processes
+    """
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=4 * depth).digest()
+    return [
+        int.from_bytes(digest[4 * row:4 * row + 4], "little") % width
+        for row in range(depth)
+    ]
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary over at most `capacity` keys
+
+    Every reported count overestimates the true weight of its key by at most
+    that key's `error`, and every error is at most total / capacity, so any
+    key heavier than total / capacity is guaranteed to be tracked
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self.counters = {}  # key -> [count, error]
+        self._heap = []  # one (count, key) entry per key; counts may be stale
+
+    def update(self, key, weight=1):
+        self.total += weight
+
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0]
+            heapq.heappush(self._heap, (weight, key))
+            return
+
+        # Replace the smallest counter; the new key inherits its count as error
+        floor, evicted = self._pop_min()
+        del self.counters[evicted]
+        self.counters[key] = [floor + weight, floor]
+        heapq.heappush(self._heap, (floor + weight, key))
+
+    def _pop_min(self):
+        heap = self._heap
+        while True:
+            count, key = heapq.heappop(heap)
+            current = self.counters[key][0]
+            if current == count:
+                return count, key
+            # Entry went stale when the key was incremented; requeue it
+            heapq.heappush(heap, (current, key))
+
+    def max_error(self):
+        """
+        Upper bound on the overestimate of any reported count
+        """
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def top(self, n):
+        """
+        Returns: [(key, estimated_count, error)] for the n heaviest keys
+        """
+        return [
+            (key, count, error)
+            for key, (count, error) in top_k(
+                self.counters.items(), n, key=lambda item: item[1][0]
+            )
+        ]
+
+    def merge(self, other):
+        """
+        Folds another summary into this one, keeping the `capacity` heaviest keys
+        A key missing from a full summary may still have weighed up to that
+        summary's max_error(), so that amount is added to its count and error
+        """
+        floor = self.max_error()
+        other_floor = other.max_error()
+        merged = {}
+
+        keys = list(self.counters)
+        keys += [key for key in other.counters if key not in self.counters]
+
+        for key in keys:
+            count, error = self.counters.get(key, (floor, floor))
+            other_count, other_error = other.counters.get(key, (other_floor, other_floor))
+            merged[key] = [count + other_count, error + other_error]
+
+        self.total += other.total
+        self.counters = dict(
+            top_k(merged.items(), self.capacity, key=lambda item: item[1][0])
+        )
+        self._rebuild_heap()
+        return self
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "total": self.total, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["capacity"])
+        summary.total = data["total"]
+        summary.counters = {key: list(value) for key, value in data["counters"].items()}
+        summary._rebuild_heap()
+        return summary
+
+    def _rebuild_heap(self):
+        self._heap = [(count, key) for key, (count, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch for approximate per-key totals in fixed memory
+
+    estimate(key) never underestimates; with probability 1 - e^-depth it
+    overestimates by at most error_bound() = e / width * total
+    """
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = [[0] * width for _ in range(depth)]
+
+    def update(self, key, weight=1):
+        self.total += weight
+        for row, index in zip(self.table, _hash_indexes(key, self.depth, self.width)):
+            row[index] += weight
+
+    def estimate(self, key):
+        return min(
+            row[index]
+            for row, index in zip(self.table, _hash_indexes(key, self.depth, self.width))
+        )
+
+    def error_bound(self):
+        return math.e / self.width * self.total
+
+    def confidence(self):
+        return 1 - math.exp(-self.depth)
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different shapes")
+
+        self.total += other.total
+        for row, other_row in zip(self.table, other.table):
+            for index, value in enumerate(other_row):
+                if value:
+                    row[index] += value
+        return self
+
+    def to_dict(self):
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "table": self.table,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["width"], data["depth"])
+        sketch.total = data["total"]
+        sketch.table = [list(row) for row in data["table"]]
+        return sketch
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter in 2^precision bytes
+    Relative standard error is about 1.04 / sqrt(2^precision) (1.6% at 12)
+    Sketches built with the same precision merge by register-wise max, so
+    daily or per-shard sketches combine into exact-union estimates
+
+    A small sketch stays sparse, keeping only its non-zero registers, until
+    more than 1/SPARSE_RATIO of them are set; its count is the same as the
+    dense registers would give, and merging it costs one step per entry
+    """
+
+    SPARSE_RATIO = 32
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+
+        self.precision = precision
+        # register index -> rank while sparse, None once dense
+        self.sparse = {}
+        self.registers = None
+
+    def _densify(self):
+        registers = bytearray(1 << self.precision)
+        for index, rank in self.sparse.items():
+            registers[index] = rank
+        self.registers = registers
+        self.sparse = None
+
+    def _check_sparse(self):
+        if len(self.sparse) * self.SPARSE_RATIO > 1 << self.precision:
+            self._densify()
+
+    def add(self, value):
+        hashed = int.from_bytes(
+            hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+
+        sparse = self.sparse
+        if sparse is None:
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+        elif rank > sparse.get(index, 0):
+            sparse[index] = rank
+            self._check_sparse()
+
+    def count(self):
+        m = 1 << self.precision
+
+        if self.sparse is not None:
+            # Few registers set: the dense estimate would use linear counting too
+            return m * math.log(m / (m - len(self.sparse)))
+
+        alpha = 0.7213 / (1 + 1.079 / m)
+        if np is not None:
+            registers = np.frombuffer(self.registers, dtype=np.uint8)
+            harmonic = float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+        else:
+            harmonic = sum(2.0 ** -r for r in self.registers)
+        estimate = alpha * m * m / harmonic
+
+        # Small-range correction (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return estimate
+
+    def __len__(self):
+        return int(round(self.count()))
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+
+        if other.sparse is not None:
+            if self.sparse is not None:
+                target = self.sparse
+                for index, rank in other.sparse.items():
+                    if rank > target.get(index, 0):
+                        target[index] = rank
+                self._check_sparse()
+            else:
+                registers = self.registers
+                for index, rank in other.sparse.items():
+                    if rank > registers[index]:
+                        registers[index] = rank
+            return self
+
+        if self.sparse is not None:
+            self._densify()
+        if np is not None:
+            # Element-wise max written straight into our registers
+            mine = np.frombuffer(self.registers, dtype=np.uint8)
+            np.maximum(mine, np.frombuffer(other.registers, dtype=np.uint8), out=mine)
+        else:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def __ior__(self, other):
+        return self.merge(other)
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        if self.sparse is None:
+            sketch.sparse = None
+            sketch.registers = bytearray(self.registers)
+        else:
+            sketch.sparse = dict(self.sparse)
+        return sketch
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def to_dict(self):
+        if self.sparse is not None:
+            return {"precision": self.precision, "sparse": sorted(self.sparse.items())}
+        return {"precision": self.precision, "registers": self.registers.hex()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["precision"])
+        if "sparse" in data:
+            sketch.sparse = {index: rank for index, rank in data["sparse"]}
+        else:
+            sketch.sparse = None
+            sketch.registers = bytearray.fromhex(data["registers"])
+        return sketch
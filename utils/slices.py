@@ -0,0 +1,176 @@
+import json
+import re
+from datetime import date
+
+from utils.data_processor import SalesAggregate
+from utils.indexed import IndexedDataset
+from utils.records import Transaction, parse_day
+
+# Keys a slice spec may set; every filter is optional
+SLICE_KEYS = ("name", "region", "min_amount", "max_amount", "start_date", "end_date")
+
+
+def _amount(value, key):
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid slice {key}: {value!r}") from None
+
+
+def _date(value, key):
+    """
+    Returns: the date in ISO form, or None if not given
+    """
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromordinal(parse_day(str(value))).isoformat()
+    except ValueError:
+        raise ValueError(
+            f"Invalid slice {key} (expected YYYY-MM-DD): {value!r}"
+        ) from None
+
+
+def make_slice(
+    name=None,
+    region=None,
+    min_amount=None,
+    max_amount=None,
+    start_date=None,
+    end_date=None,
+):
+    """
+    Returns a slice spec dict
+    Amount bounds and the YYYY-MM-DD date range are inclusive; a slice
+    without filters covers every transaction. Dates are normalized to ISO
+    form (so "2024-1-5" becomes "2024-01-05")
+    Raises ValueError for a malformed amount or date, or a reversed range
+    """
+    min_amount = _amount(min_amount, "min_amount")
+    max_amount = _amount(max_amount, "max_amount")
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise ValueError(
+            f"Slice min_amount {min_amount:g} is above max_amount {max_amount:g}"
+        )
+
+    start_date = _date(start_date, "start_date")
+    end_date = _date(end_date, "end_date")
+    if start_date and end_date and parse_day(start_date) > parse_day(end_date):
+        raise ValueError(f"Slice start_date {start_date} is after end_date {end_date}")
+
+    if name is None:
+        parts = []
+        if region:
+            parts.append(region)
+        if min_amount is not None or max_amount is not None:
+            low = "min" if min_amount is None else f"{min_amount:g}"
+            high = "max" if max_amount is None else f"{max_amount:g}"
+            parts.append(f"amount_{low}-{high}")
+        if start_date or end_date:
+            parts.append(f"{start_date or 'start'}_to_{end_date or 'end'}")
+        name = "_".join(parts) or "all"
+
+    return {
+        "name": re.sub(r"[^\w.-]+", "_", str(name)),
+        "region": region or None,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def parse_slice(text):
+    """
+    Parses a command-line slice such as "region=North,min_amount=1000"
+    """
+    spec = {}
+    for item in text.split(","):
+        key, sep, value = item.partition("=")
+        key = key.strip()
+        if not sep or key not in SLICE_KEYS:
+            raise ValueError(f"Invalid slice term: {item!r}")
+        spec[key] = value.strip()
+
+    return make_slice(**spec)
+
+
+def load_slices(filename):
+    """
+    Loads a JSON list of slice specs, e.g.
+    [{"region": "North"}, {"name": "big", "min_amount": 100000}]
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        entries = json.load(file)
+
+    slices = []
+    for entry in entries:
+        unknown = set(entry) - set(SLICE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown slice keys: {', '.join(sorted(unknown))}")
+        slices.append(make_slice(**entry))
+
+    return slices
+
+
+def region_slices(regions):
+    """
+    Returns one slice per region
+    """
+    return [make_slice(region=region) for region in sorted(regions)]
+
+
+def _count_matched(transactions):
+    return sum(
+        1
+        for tx in transactions
+        if (tx.API_Match if type(tx) is Transaction else tx.get("API_Match"))
+    )
+
+
+def aggregate_slices(
+    transactions, slices, distinct="exact", customer_capacity=None, unfiltered=None
+):
+    """
+    Aggregates every slice of the transactions
+    Slices are answered from an IndexedDataset, so each one only visits the
+    rows of its most selective filter: a region, or an amount or day range
+    found by bisection. Rows keep their input order within a slice, so
+    rankings and ties match a direct aggregate, and slices with the same
+    filters share one aggregate (treat it as read-only)
+    `distinct` and `customer_capacity` are passed to every SalesAggregate
+    `unfiltered`, a SalesAggregate over every row built elsewhere (e.g. by
+    utils.parallel.aggregate_rows), serves the unfiltered slice instead
+    Returns: {name: (SalesAggregate, enrichment_summary)}
+    """
+    names = [spec["name"] for spec in slices]
+    if len(set(names)) != len(names):
+        raise ValueError("Slice names must be unique")
+
+    dataset = IndexedDataset(transactions)
+    # filter values -> (SalesAggregate, matched)
+    shared = {}
+
+    result = {}
+    for spec in slices:
+        filters = {key: spec[key] for key in SLICE_KEYS if key != "name"}
+        key = tuple(filters.values())
+
+        if key not in shared:
+            if unfiltered is not None and all(value is None for value in key):
+                rows = dataset.transactions
+                aggregate = unfiltered
+            else:
+                rows = dataset.query(**filters)
+                aggregate = SalesAggregate(customer_capacity, distinct).update(rows)
+            shared[key] = (aggregate, _count_matched(rows))
+
+        aggregate, matched = shared[key]
+        result[spec["name"]] = (
+            aggregate,
+            {"matched": matched, "failed": aggregate.transaction_count - matched},
+        )
+
+    return result
@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+from utils.mmap_parser import parse_transactions_mmap
+from utils.output import CACHE_DIR, atomic_open
+from utils.records import Transaction
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+SNAPSHOT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Rows the parser drops; their counts are kept in the snapshot meta
+PARSE_REJECTS = ("field_count", "number_format")
+
+MAGIC = b"SALESCOL"
+VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+# Column layout of a parsed-transactions snapshot: (field, kind, typecode)
+TRANSACTION_COLUMNS = (
+    ("TransactionID", "text", None),
+    ("Date", "dict", None),
+    ("ProductID", "dict", None),
+    ("ProductName", "dict", None),
+    ("Quantity", "array", "q"),
+    ("UnitPrice", "array", "d"),
+    ("CustomerID", "dict", None),
+    ("Region", "dict", None),
+)
+
+
+# =========================
+# COLUMNAR FILE FORMAT
+# =========================
+
+def write_columns(path, columns, meta=None):
+    """
+    Writes columns to a compact binary file
+    `columns` is a list of (name, kind, data):
+      "array" - an array.array, stored as raw machine values
+      "dict"  - a list of strings, stored as uint32 codes plus a value table
+      "text"  - a list of strings without newlines, stored as one UTF-8 blob
+    Written to a temporary file and renamed, so readers never see a partial file
+    """
+    blobs = []
+    layout = []
+
+    for name, kind, data in columns:
+        entry = {"name": name, "kind": kind}
+
+        if kind == "array":
+            entry["typecode"] = data.typecode
+            blob = data.tobytes()
+        elif kind == "dict":
+            codes = {}
+            blob = array("I", [codes.setdefault(v, len(codes)) for v in data]).tobytes()
+            entry["values"] = list(codes)
+        elif kind == "text":
+            blob = "\n".join(data).encode("utf-8")
+            entry["count"] = len(data)
+        else:
+            raise ValueError(f"Unknown column kind: {kind}")
+
+        entry["length"] = len(blob)
+        layout.append(entry)
+        blobs.append(blob)
+
+    header = {"byteorder": sys.byteorder, "columns": layout, "meta": meta or {}}
+    _write_file(path, header, blobs)
+
+
+def _write_file(path, header, blobs):
+    header = json.dumps(header).encode("utf-8")
+
+    with atomic_open(path, "wb") as file:
+        file.write(MAGIC + struct.pack("<BI", VERSION, len(header)))
+        file.write(header)
+        for blob in blobs:
+            file.write(blob)
+
+
+def rewrite_meta(path, meta):
+    """
+    Replaces the meta of a file written by write_columns()
+    The column data is copied as stored, without decoding it
+    """
+    with open(path, "rb") as file:
+        header = read_header(file)
+        data = file.read()
+
+    header["meta"] = meta
+    _write_file(path, header, [data])
+
+
+def read_header(file):
+    """
+    Reads the header of a columnar file
+    Returns: header dict, with the file positioned at the first column
+    """
+    prefix = file.read(len(MAGIC) + 5)
+    if len(prefix) < len(MAGIC) + 5 or not prefix.startswith(MAGIC):
+        raise ValueError("Not a columnar snapshot file")
+
+    version, header_length = struct.unpack("<BI", prefix[len(MAGIC):])
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+
+    return json.loads(file.read(header_length))
+
+
+def read_columns(path):
+    """
+    Reads a file written by write_columns()
+    Returns: (columns dict of name -> array or list of strings, meta dict)
+    """
+    with open(path, "rb") as file:
+        header = read_header(file)
+        data = memoryview(file.read())
+
+    swap = header["byteorder"] != sys.byteorder
+    columns = {}
+    position = 0
+
+    for entry in header["columns"]:
+        blob = data[position:position + entry["length"]]
+        position += entry["length"]
+
+        if entry["kind"] == "array":
+            values = array(entry["typecode"])
+            values.frombytes(blob)
+            if swap:
+                values.byteswap()
+        elif entry["kind"] == "dict":
+            codes = array("I")
+            codes.frombytes(blob)
+            if swap:
+                codes.byteswap()
+            table = entry["values"]
+            values = [table[code] for code in codes]
+        else:
+            text = bytes(blob).decode("utf-8")
+            values = text.split("\n") if entry["count"] else []
+
+        columns[entry["name"]] = values
+
+    return columns, header["meta"]
+
+
+# =========================
+# PARSED-SNAPSHOT CACHE
+# =========================
+
+def content_hash(filename):
+    """
+    Hashes the full contents of a file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def snapshot_path(filename, cache_dir=SNAPSHOT_DIR):
+    """
+    Returns the snapshot location for a source file
+    """
+    key = hashlib.blake2b(os.path.abspath(filename).encode(), digest_size=16)
+    return os.path.join(cache_dir, key.hexdigest() + ".snap")
+
+
+def _is_fresh(filename, fingerprint):
+    """
+    Checks a snapshot fingerprint against the source file
+    Size and mtime are checked first; the content hash is only recomputed
+    when the size matches but the mtime moved. If the content still
+    matches, the fingerprint takes the new mtime, for the caller to save
+    """
+    stat = os.stat(filename)
+
+    if fingerprint.get("size") != stat.st_size:
+        return False
+    if fingerprint.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    if fingerprint.get("content_hash") != content_hash(filename):
+        return False
+
+    fingerprint["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+
+def file_fingerprint(filename):
+    """
+    Returns the size, mtime and content hash that key a snapshot
+    """
+    stat = os.stat(filename)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "content_hash": content_hash(filename),
+    }
+
+
+def evict_snapshots(cache_dir=SNAPSHOT_DIR, max_bytes=SNAPSHOT_MAX_BYTES):
+    """
+    Deletes least recently used snapshots until the cache fits in max_bytes
+    """
+    try:
+        entries = [
+            entry for entry in os.scandir(cache_dir)
+            if entry.is_file() and entry.name.endswith(".snap")
+        ]
+    except FileNotFoundError:
+        return
+
+    # (mtime, size, path); another loader may remove a stale entry meanwhile
+    snapshots = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        snapshots.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+    # Snapshots are touched on every hit, so mtime tracks last use
+    snapshots.sort(reverse=True)
+
+    total = 0
+    for _, size, path in snapshots:
+        total += size
+        if total > max_bytes:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def save_snapshot(
+    filename, transactions, cache_dir=SNAPSHOT_DIR, fingerprint=None, rejects=None
+):
+    """
+    Persists parsed transactions as a columnar snapshot of the source file
+    `rejects` holds the counts of rows dropped while parsing
+    """
+    if fingerprint is None:
+        fingerprint = file_fingerprint(filename)
+    meta = dict(fingerprint, rejects=dict(rejects or {}))
+
+    columns = [
+        (
+            field,
+            kind,
+            array(typecode, [tx[field] for tx in transactions])
+            if kind == "array"
+            else [tx[field] for tx in transactions],
+        )
+        for field, kind, typecode in TRANSACTION_COLUMNS
+    ]
+
+    write_columns(snapshot_path(filename, cache_dir), columns, meta)
+
+
+def load_snapshot(filename, cache_dir=SNAPSHOT_DIR, rejects=None):
+    """
+    Loads the parsed transactions of a file from its snapshot
+    The saved parse reject counts are added to `rejects` if given
+    Returns: list of Transaction records, or None if missing or stale
+    A stale snapshot (or one saved without reject counts) is deleted
+    """
+    path = snapshot_path(filename, cache_dir)
+
+    try:
+        with open(path, "rb") as file:
+            fingerprint = read_header(file)["meta"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f" Ignoring unreadable snapshot: {e}")
+        return None
+
+    mtime_ns = fingerprint.get("mtime_ns")
+    if "rejects" not in fingerprint or not _is_fresh(filename, fingerprint):
+        os.remove(path)
+        return None
+
+    columns, _ = read_columns(path)
+    if fingerprint["mtime_ns"] != mtime_ns:
+        # Touched but unchanged: save the new mtime so later runs skip the hash
+        try:
+            rewrite_meta(path, fingerprint)
+        except OSError as e:
+            print(f" Failed to update snapshot: {e}")
+    os.utime(path)  # mark as recently used
+
+    if rejects is not None:
+        _add_counts(rejects, fingerprint["rejects"])
+
+    return [
+        Transaction(*fields)
+        for fields in zip(*(columns[field] for field, _, _ in TRANSACTION_COLUMNS))
+    ]
+
+
+def _add_counts(total, counts):
+    for reason, count in counts.items():
+        total[reason] = total.get(reason, 0) + count
+
+
+def load_transactions(
+    filename,
+    cache_dir=SNAPSHOT_DIR,
+    max_bytes=SNAPSHOT_MAX_BYTES,
+    quiet=False,
+    rejects=None,
+):
+    """
+    Returns the parsed transactions of a sales file
+    Served from a fresh snapshot when one exists; otherwise the file is
+    parsed and a new snapshot is written. `quiet` only silences snapshot hits
+    Rows dropped while parsing are counted in `rejects` (reason -> count)
+    either way
+    """
+    if not os.path.exists(filename):
+        print(f" File not found: {filename}")
+        return []
+
+    transactions = load_snapshot(filename, cache_dir, rejects)
+    if transactions is not None:
+        if not quiet:
+            print(f" Loaded {len(transactions)} records from snapshot")
+        return transactions
+
+    # Fingerprint before parsing, so a file changed mid-parse is seen as stale
+    fingerprint = file_fingerprint(filename)
+    parse_rejects = dict.fromkeys(PARSE_REJECTS, 0)
+    transactions = parse_transactions_mmap(filename, rejects=parse_rejects)
+    if rejects is not None:
+        _add_counts(rejects, parse_rejects)
+
+    try:
+        save_snapshot(filename, transactions, cache_dir, fingerprint, parse_rejects)
+        evict_snapshots(cache_dir, max_bytes)
+    except OSError as e:
+        print(f" Failed to write snapshot: {e}")
+
+    return transactions